@@ -0,0 +1,267 @@
+import asyncio
+import threading
+import queue
+import logging
+from TCPMessageHandler import TCPMessageHandler
+from MessageFramer import create_framer, FramingError
+
+
+class SharedEventLoop:
+    """
+    共享asyncio事件循环 - 所有链路共用一个事件循环线程
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, name="AsyncIOLoop"):
+        """
+        创建并启动事件循环线程
+
+        Args:
+            name: 线程名称
+        """
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+        self.logger = logging.getLogger(name)
+
+    @classmethod
+    def get(cls):
+        """获取进程内共享的事件循环（首次调用时启动）"""
+        with cls._instance_lock:
+            if cls._instance is None or not cls._instance.thread.is_alive():
+                cls._instance = cls()
+            return cls._instance
+
+    def _run(self):
+        """事件循环线程函数"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def in_loop_thread(self):
+        """当前是否在事件循环线程中"""
+        return threading.current_thread() is self.thread
+
+    def run_coroutine(self, coro, timeout=None):
+        """
+        在事件循环中运行协程并等待结果（不能在事件循环线程中调用）
+
+        Args:
+            coro: 协程对象
+            timeout: 等待超时时间（秒）
+
+        Returns:
+            协程返回值
+
+        Raises:
+            TimeoutError: 超时（协程已被取消）
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            # 超时后取消协程，避免它在后台继续运行
+            future.cancel()
+            raise
+
+    def call_soon(self, callback, *args):
+        """线程安全地将回调投递到事件循环"""
+        if self.in_loop_thread():
+            return self.loop.call_soon(callback, *args)
+        return self.loop.call_soon_threadsafe(callback, *args)
+
+
+class _LinkProtocol(asyncio.BufferedProtocol):
+    """
+    链路协议对象，把asyncio传输层事件转交给处理器
+
+    使用BufferedProtocol：传输层直接recv_into到处理器分帧器的缓冲区，
+    不为每次接收分配bytes对象。
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def connection_made(self, transport):
+        self.handler._on_connection_made(transport)
+
+    def get_buffer(self, sizehint):
+        return self.handler.framer.get_buffer()
+
+    def buffer_updated(self, nbytes):
+        self.handler._on_data_received(nbytes)
+
+    def connection_lost(self, exc):
+        self.handler._on_connection_lost(exc)
+
+
+class AsyncTCPMessageHandler(TCPMessageHandler):
+    """
+    基于asyncio的TCP消息处理器
+
+    与TCPMessageHandler保持相同的send_message / _process_received_data约定，
+    但不为每条链路创建线程：所有链路的收发都在共享事件循环线程中完成，
+    _process_received_data也在该线程中调用，回调中不应执行耗时操作。
+
+    收到的消息是分帧器缓冲区的memoryview切片（不复制），只在
+    _process_received_data调用期间有效，需要保留时应复制为bytes。
+    """
+
+    def __init__(self, host, port, name="TCPHandler", framing="json",
+                 connect_timeout=5.0, event_loop=None):
+        """
+        初始化异步消息处理器
+
+        Args:
+            host: 目标主机
+            port: 目标端口
+            name: 处理器名称，用于日志标识
+            framing: 分帧方式
+            connect_timeout: 连接超时时间（秒）
+            event_loop: 共享事件循环，None表示使用进程内默认的共享事件循环
+        """
+        super().__init__(host, port, name, framing)
+        # 消息在事件循环线程中同步处理完毕，可以直接使用缓冲区切片
+        self.framer = create_framer(framing, message_views=True)
+        self.connect_timeout = connect_timeout
+        self.event_loop = event_loop
+        self.transport = None
+        self.flush_scheduled = False
+
+    def start(self):
+        """连接目标机（阻塞直到连接成功或失败）"""
+        if self.running:
+            self.logger.warning(f"{self.name} 已经启动")
+            return False
+
+        if self.event_loop is None:
+            self.event_loop = SharedEventLoop.get()
+
+        if self.event_loop.in_loop_thread():
+            self.logger.error(f"{self.name} 不能在事件循环线程中同步启动，请使用start_async()")
+            return False
+
+        try:
+            return self.event_loop.run_coroutine(self.start_async(), self.connect_timeout + 1.0)
+        except Exception as e:
+            self.logger.error(f"{self.name} 启动失败: {e}")
+            return False
+
+    async def start_async(self):
+        """在事件循环中连接目标机"""
+        loop = asyncio.get_running_loop()
+        try:
+            self.logger.info(f"正在连接到服务器 {self.host}:{self.port}")
+            await asyncio.wait_for(
+                loop.create_connection(lambda: _LinkProtocol(self), self.host, self.port),
+                self.connect_timeout
+            )
+        except asyncio.TimeoutError:
+            self.logger.error(f"{self.name} 连接服务器超时（{self.connect_timeout}秒）")
+            return False
+        except ConnectionRefusedError:
+            self.logger.error(f"{self.name} 连接被服务器拒绝，请检查服务器是否运行")
+            return False
+        except OSError as e:
+            self.logger.error(f"{self.name} 连接失败: {e}")
+            return False
+
+        self.logger.info(f"{self.name} 启动成功")
+        return True
+
+    def stop(self):
+        """停止消息处理器"""
+        if not self.running:
+            return
+
+        self.running = False
+        transport = self.transport
+        self.transport = None
+        if transport is not None:
+            self.event_loop.call_soon(transport.close)
+
+        self.framer.reset()
+        while True:
+            try:
+                self.send_queue.get_nowait()
+            except queue.Empty:
+                break
+
+        self.logger.info(f"{self.name} 已停止")
+
+    def send_message(self, message):
+        """
+        发送消息（放入发送队列，由事件循环批量写出）
+
+        Args:
+            message: 要发送的消息（字符串或字节）
+        """
+        if not self.running:
+            self.logger.warning(f"{self.name} 未运行，无法发送消息")
+            return False
+
+        self.send_queue.put(message)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.event_loop.call_soon(self._flush_send_queue)
+        return True
+
+    def is_connected(self):
+        """检查是否连接"""
+        transport = self.transport
+        return self.running and transport is not None and not transport.is_closing()
+
+    def _flush_send_queue(self):
+        """将发送队列中的全部消息合并后一次写入传输层"""
+        self.flush_scheduled = False
+        chunks = []
+        while True:
+            try:
+                chunks.append(self.framer.encode(self.send_queue.get_nowait()))
+            except queue.Empty:
+                break
+
+        if chunks and self.transport is not None:
+            self.transport.write(b''.join(chunks))
+            self.logger.debug(f"{self.name} 发送 {len(chunks)} 条消息")
+
+    def _on_connection_made(self, transport):
+        """连接建立"""
+        self.transport = transport
+        self.running = True
+
+    def _on_data_received(self, nbytes):
+        """
+        收到数据（已由recv_into写入分帧器缓冲区）：分帧后逐条交给_process_received_data处理
+
+        Args:
+            nbytes: recv_into写入的字节数
+        """
+        try:
+            messages = self.framer.commit(nbytes)
+        except FramingError as e:
+            self.logger.error(f"{self.name} 分帧失败，已丢弃缓冲数据: {e}")
+            return
+
+        for message in messages:
+            try:
+                self._process_received_data(message)
+            except Exception as e:
+                self.logger.error(f"{self.name} 处理数据异常: {e}")
+
+    def _on_connection_lost(self, exc):
+        """连接断开"""
+        if exc:
+            self.logger.error(f"{self.name} 连接异常断开: {exc}")
+        elif self.running:
+            self.logger.info(f"{self.name} 连接已关闭")
+        self.transport = None
+        self.running = False
+
+    def __del__(self):
+        """析构函数"""
+        try:
+            self.stop()
+        except Exception:
+            pass
@@ -0,0 +1,448 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import logging
+import threading
+from collections import deque
+from SimulatedTarget import SimulatedTarget
+
+
+def percentile(values, p):
+    """计算百分位数（p取0~100）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def memory_usage():
+    """当前进程常驻内存（字节）"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == 'darwin' else usage * 1024
+
+
+class BenchmarkResult:
+    """单个测试阶段的结果：吞吐量、延迟分布、每条消息CPU时间和内存增长"""
+
+    def __init__(self, name):
+        self.name = name
+        self.messages = 0
+        self.latencies = []  # 秒
+        self.note = ""
+        self._start()
+
+    def _start(self):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.mem_start = memory_usage()
+
+    def finish(self):
+        """结束计时"""
+        self.elapsed = time.perf_counter() - self.wall_start
+        self.cpu = time.process_time() - self.cpu_start
+        self.mem_end = memory_usage()
+        return self
+
+    def report(self):
+        """格式化结果行"""
+        rate = self.messages / self.elapsed if self.elapsed > 0 else 0.0
+        cpu_us = self.cpu / self.messages * 1e6 if self.messages else 0.0
+        line = (f"{self.name:<22} {self.messages:>9} msgs {rate:>11.1f} msg/s "
+                f"cpu {cpu_us:>8.1f} us/msg  mem {(self.mem_end - self.mem_start) / 1024:>+9.0f} KiB")
+        if self.latencies:
+            line += (f"  p50 {percentile(self.latencies, 50) * 1000:>7.3f} ms"
+                     f"  p99 {percentile(self.latencies, 99) * 1000:>7.3f} ms")
+        if self.note:
+            line += f"  ({self.note})"
+        return line
+
+
+def sample_message(target):
+    """模拟目标机的一条变量应答（字符串）"""
+    return json.dumps(target.build_vars_ack())
+
+
+def sample_frame(target, status_format="json"):
+    """模拟目标机的一条变量应答（线路上的字节，不含分帧信息）"""
+    if status_format == "binary":
+        values, timestamp_ms = target.sample()
+        return target.binary_codec().encode(values, timestamp_ms)
+    return sample_message(target).encode('utf-8')
+
+
+def wait_binary_schema(handler, names, timeout=2.0):
+    """发送Schema握手并等待处理器切换到二进制变量帧"""
+    if not handler.request_binary_schema(names):
+        raise RuntimeError("二进制变量帧需要length分帧")
+    end_time = time.perf_counter() + timeout
+    while handler.codec is None:
+        if time.perf_counter() > end_time:
+            raise RuntimeError("Schema握手超时")
+        time.sleep(0.01)
+
+
+def bench_tcp_client(target, duration):
+    """TCPClient同步往返：发送QueryVars并等待应答（recv_into直接写入分帧器缓冲区）"""
+    from TCPClient import TCPClient
+    from MessageFramer import create_framer
+
+    client = TCPClient('127.0.0.1', target.status_port)
+    if not client.connect():
+        raise RuntimeError("TCPClient连接失败")
+
+    framer = create_framer(target.framing)
+    query = framer.encode(json.dumps({"cmd": "QueryVars", "count": len(target.var_names)}))
+    result = BenchmarkResult("tcp_client")
+    end_time = time.perf_counter() + duration
+    try:
+        while time.perf_counter() < end_time:
+            sent_at = time.perf_counter()
+            client.send(query)
+            messages = []
+            while not messages:
+                with framer.get_buffer() as buffer:
+                    nbytes = client.receive_into(buffer, timeout=1.0)
+                if not nbytes:
+                    raise RuntimeError("等待应答超时")
+                messages = framer.commit(nbytes)
+            result.latencies.append(time.perf_counter() - sent_at)
+            result.messages += len(messages)
+    finally:
+        client.disconnect()
+    return result.finish()
+
+
+def bench_handler(target, duration, backend="thread", window=64, status_format="json"):
+    """状态链路处理器：保持window个未完成查询的流水线，测量查询到回调的延迟"""
+    from SimulatorMessageHandler import StatusMessageHandler, AsyncStatusMessageHandler
+
+    handler_class = AsyncStatusMessageHandler if backend == "asyncio" else StatusMessageHandler
+    query = json.dumps({"cmd": "QueryVars", "count": len(target.var_names)})
+    send_times = deque()
+    result = BenchmarkResult(f"handler_{backend}")
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def on_variable_data(data):
+        now = time.perf_counter()
+        with lock:
+            if send_times:
+                result.latencies.append(now - send_times.popleft())
+            result.messages += 1
+            if done.is_set():
+                return
+            send_times.append(time.perf_counter())
+        handler.send_message(query)
+
+    handler = handler_class('127.0.0.1', target.status_port,
+                            variable_callback=on_variable_data, framing=target.framing)
+    if not handler.start():
+        raise RuntimeError("处理器连接失败")
+    if status_format == "binary":
+        try:
+            wait_binary_schema(handler, target.var_names)
+        except RuntimeError:
+            handler.stop()
+            raise
+
+    result._start()
+    with lock:
+        for _ in range(window):
+            send_times.append(time.perf_counter())
+            handler.send_message(query)
+
+    time.sleep(duration)
+    done.set()
+    result.finish()
+    handler.stop()
+    result.note = f"window={window}, {status_format}"
+    return result
+
+
+def bench_stream(target, duration, stream_rate=1000.0, status_format="json"):
+    """订阅推送：Subscribe后由目标机持续推送，延迟为目标机采样时间到回调的时间"""
+    from SimulatorMessageHandler import AsyncStatusMessageHandler
+
+    result = BenchmarkResult("stream")
+    acks = []
+
+    def on_variable_data(data):
+        if result.messages or acks:
+            result.latencies.append(time.time() - data['time'] / 1000.0)
+        result.messages += 1
+
+    handler = AsyncStatusMessageHandler('127.0.0.1', target.status_port, variable_callback=on_variable_data,
+                                        framing=target.framing, ack_callback=acks.append)
+    if not handler.start():
+        raise RuntimeError("处理器连接失败")
+    try:
+        if status_format == "binary":
+            wait_binary_schema(handler, target.var_names)
+
+        dropped = target.stats['stream_dropped']
+        handler.send_message(json.dumps({"cmd": "Subscribe", "vars": target.var_names, "rate": stream_rate}))
+        end_time = time.perf_counter() + 2.0
+        while not acks:
+            if time.perf_counter() > end_time:
+                raise RuntimeError("等待订阅确认超时")
+            time.sleep(0.01)
+        if acks[0].get('ack') != 'OK':
+            raise RuntimeError(f"订阅失败: {acks[0]}")
+
+        result.messages = 0
+        result.latencies.clear()
+        result._start()
+        time.sleep(duration)
+        result.finish()
+        handler.send_message(json.dumps({"cmd": "Unsubscribe"}))
+        result.note = (f"rate={acks[0].get('rate'):g}Hz, {status_format}, "
+                       f"target dropped {target.stats['stream_dropped'] - dropped}")
+    finally:
+        handler.stop()
+    return result
+
+
+def bench_parse(target, duration, status_format="json"):
+    """StatusMessageHandler解析（分帧后的完整消息 -> 变量字典）"""
+    from SimulatorMessageHandler import StatusMessageHandler
+
+    handler = StatusMessageHandler('127.0.0.1', target.status_port)
+    if status_format == "binary":
+        parse = target.binary_codec().decode
+        message = sample_frame(target, status_format)
+    else:
+        parse = handler._parse_variable_data
+        message = sample_message(target)
+
+    result = BenchmarkResult("parse")
+    end_time = time.perf_counter() + duration
+    while time.perf_counter() < end_time:
+        for _ in range(1000):
+            parse(message)
+        result.messages += 1000
+    result.note = f"{status_format}, {len(message)} bytes"
+    return result.finish()
+
+
+def bench_decoders(target, duration):
+    """
+    各数据格式解码器的解析吞吐量（JSON按每个可用的解析库分别测试）
+
+    Returns:
+        list: 每种格式一个BenchmarkResult
+    """
+    from VarDecoder import JSON_BACKENDS, create_decoder
+
+    values, timestamp_ms = target.sample()
+    json_message = sample_message(target).encode('utf-8')
+    kv_message = ''.join(f"{name}={value};" for name, value in values.items()).encode('utf-8')
+    codec = target.binary_codec()
+
+    cases = [(f"decode_json_{backend}", create_decoder('json', backend=backend), json_message)
+             for backend in JSON_BACKENDS]
+    cases.append(("decode_kv", create_decoder('kv'), kv_message))
+    cases.append(("decode_binary", create_decoder('binary', codec=codec), codec.encode(values, timestamp_ms)))
+
+    results = []
+    for name, decoder, message in cases:
+        decode = decoder.decode
+        result = BenchmarkResult(name)
+        end_time = time.perf_counter() + duration / len(cases)
+        while time.perf_counter() < end_time:
+            for _ in range(1000):
+                decode(message)
+            result.messages += 1000
+        result.note = f"{len(message)} bytes"
+        results.append(result.finish())
+    return results
+
+
+def bench_recorder(target, duration):
+    """变量记录器：record调用吞吐量（写入在后台线程完成）"""
+    from DataRecorder import VariableRecorder
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        recorder = VariableRecorder(os.path.join(tmp_dir, "bench.csv"), target.variables)
+        recorder.start()
+        result = BenchmarkResult("recorder")
+        end_time = time.perf_counter() + duration
+        while time.perf_counter() < end_time:
+            vars_dict, _ = target.sample()
+            for _ in range(100):
+                recorder.record(vars_dict, "2024-01-01 00:00:00")
+            result.messages += 100
+        recorder.stop()
+        return result.finish()
+
+
+def bench_history(target, duration, capacity=100000, max_points=600):
+    """
+    波形历史金字塔：环形缓冲循环覆盖后按屏幕宽度取点的查询吞吐量
+
+    先与保留的原始采样逐个比较，检查查询结果不包含已淘汰的采样，
+    并且保留了范围内的最小值和最大值。
+    """
+    import random
+    from WaveformHistory import MinMaxHistory
+
+    rng = random.Random(1)
+    history = MinMaxHistory(capacity)
+    values = [rng.gauss(0.0, 1.0) for _ in range(int(capacity * 2.5))]
+    for index, value in enumerate(values):
+        history.append(index * 0.001, value)
+
+    first = history.first_index()
+    for _ in range(200):
+        start = rng.randint(first, len(values) - 1)
+        end = rng.randint(start, len(values) - 1)
+        xs, ys = history.query(max_points, start * 0.001, end * 0.001)
+        kept = values[start:end + 1]
+        if (len(xs) > max(max_points, len(kept)) or min(xs) < start * 0.001 or
+                max(ys) != max(kept) or min(ys) != min(kept)):
+            raise RuntimeError(f"查询结果与保留的采样不一致: 范围[{start}, {end}]")
+
+    result = BenchmarkResult("history_query")
+    end_time = time.perf_counter() + duration
+    while time.perf_counter() < end_time:
+        for _ in range(10):
+            history.query(max_points)
+        result.messages += 10
+    result.note = f"{len(history)} samples wrapped, {max_points} points, wraparound check OK"
+    return result.finish()
+
+
+def bench_gui(target, duration, query_interval=0.01, status_format="json"):
+    """
+    界面端到端：模拟目标机 -> 会话 -> 批量投递 -> 表格/记录器/波形窗口
+
+    延迟为目标机采样时间到该批次在界面中处理完毕的时间（同一台机器上时钟一致）
+    """
+    import tkinter as tk
+
+    work_dir = tempfile.mkdtemp(prefix="hw_bench_")
+    old_cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        with open("watch_variables.json", "w", encoding="utf-8") as f:
+            json.dump(target.variables, f, ensure_ascii=False)
+
+        from main import HardwareSimulator
+
+        root = tk.Tk()
+        root.withdraw()
+        app = HardwareSimulator(root)
+
+        result = BenchmarkResult("gui_end_to_end")
+        original_batch_handler = app._handle_variable_batch_ui
+
+        def timed_batch_handler(batch):
+            original_batch_handler(batch)
+            root.update_idletasks()
+            now = time.time()
+            for _, info in batch:
+                timestamp_ms = info.get('time')
+                if timestamp_ms:
+                    result.latencies.append(now - timestamp_ms / 1000.0)
+            result.messages += len(batch)
+
+        app.sample_bridge.batch_callback = timed_batch_handler
+
+        app.session = app.session_manager.open_session(
+            '127.0.0.1', app.watch_variables,
+            ctrl_port=target.ctrl_port, status_port=target.status_port, framing=target.framing,
+            status_format=status_format, query_interval=query_interval,
+            message_callback=app.on_system_message, variable_callback=app.on_variable_data)
+        if not (app.session.ctrl_ok and app.session.status_ok):
+            raise RuntimeError("会话连接失败")
+        app.ctrl_handler = app.session.ctrl_handler
+        app.status_handler = app.session.status_handler
+        app.is_connected = True
+
+        # 打开第一个变量的波形窗口
+        if app.watch_variables:
+            app.on_waveform_click_new(app.watch_variables[0].get("variable"))
+
+        result._start()
+        app.session.start_polling(query_interval)
+        end_time = time.perf_counter() + duration
+        while time.perf_counter() < end_time:
+            root.update()
+            time.sleep(0.001)
+        result.finish()
+
+        app._disconnect_connections()
+        app.on_close()
+        result.note = f"query_interval={query_interval}s"
+        return result
+    finally:
+        os.chdir(old_cwd)
+
+
+STAGES = {
+    'tcp_client': lambda target, args: bench_tcp_client(target, args.duration),
+    'handler_thread': lambda target, args: bench_handler(target, args.duration, "thread", args.window,
+                                                         args.status_format),
+    'handler_asyncio': lambda target, args: bench_handler(target, args.duration, "asyncio", args.window,
+                                                          args.status_format),
+    'stream': lambda target, args: bench_stream(target, args.duration, args.stream_rate, args.status_format),
+    'parse': lambda target, args: bench_parse(target, args.duration, args.status_format),
+    'decoders': lambda target, args: bench_decoders(target, args.duration),
+    'recorder': lambda target, args: bench_recorder(target, args.duration),
+    'history': lambda target, args: bench_history(target, args.duration),
+    'gui': lambda target, args: bench_gui(target, args.duration, args.query_interval, args.status_format),
+}
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="硬件仿真系统 - 吞吐量与延迟基准测试")
+    parser.add_argument("--stages", default="tcp_client,handler_thread,handler_asyncio,stream,parse,decoders,recorder,history,gui",
+                        help=f"测试阶段（逗号分隔）: {','.join(STAGES)}")
+    parser.add_argument("--duration", type=float, default=5.0, help="每个阶段的运行时长（秒）")
+    parser.add_argument("--vars", type=int, default=50, help="变量数量")
+    parser.add_argument("--rate", type=float, default=1000.0, help="模拟目标机采样率（Hz）")
+    parser.add_argument("--payload-size", type=int, default=0, help="变量应答附加填充字节数")
+    parser.add_argument("--framing", default="json", choices=["json", "newline", "length"], help="分帧方式")
+    parser.add_argument("--status-format", default="json", choices=["json", "binary"],
+                        help="状态链路变量格式（binary需要length分帧）")
+    parser.add_argument("--window", type=int, default=64, help="处理器阶段的未完成查询数")
+    parser.add_argument("--stream-rate", type=float, default=1000.0, help="订阅阶段请求的推送频率（Hz）")
+    parser.add_argument("--query-interval", type=float, default=0.01, help="界面阶段的查询间隔（秒）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO)
+
+    target = SimulatedTarget('127.0.0.1', 0, 0, var_count=args.vars, sample_rate=args.rate,
+                             payload_size=args.payload_size, framing=args.framing).start()
+    print(f"模拟目标机: {args.vars}个变量, 应答 {len(sample_frame(target, args.status_format))} 字节, "
+          f"分帧方式 {args.framing}, 变量格式 {args.status_format}")
+    print("注: 模拟目标机运行在同一进程中，网络阶段的CPU时间包含目标机一侧的开销")
+
+    for stage in args.stages.split(','):
+        stage = stage.strip()
+        if stage not in STAGES:
+            print(f"{stage:<22} 未知的测试阶段")
+            continue
+        try:
+            results = STAGES[stage](target, args)
+            for result in results if isinstance(results, list) else [results]:
+                print(result.report(), flush=True)
+        except Exception as e:
+            print(f"{stage:<22} 跳过: {type(e).__name__}: {e}", flush=True)
+
+    target.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,482 @@
+import os
+import csv
+import queue
+import threading
+import logging
+from datetime import datetime
+from VariableIndex import VariableIndex
+
+
+# Excel文件路径 -> 导出锁：同一工作簿的"读取-追加-保存-清空日志"必须串行执行，
+# 否则并发导出会互相覆盖保存结果，已清空日志的数据将永久丢失
+_workbook_locks = {}
+_workbook_locks_guard = threading.Lock()
+
+
+def workbook_lock(excel_file):
+    """获取指定Excel文件的导出锁（进程内所有记录器共用）"""
+    path = os.path.normcase(os.path.abspath(excel_file))
+    with _workbook_locks_guard:
+        lock = _workbook_locks.get(path)
+        if lock is None:
+            lock = _workbook_locks[path] = threading.Lock()
+        return lock
+
+
+class RecorderWriter:
+    """
+    记录器写入线程：批量取出数据行并追加到各记录器的日志文件
+
+    一个写入线程可以由多个记录器共享（例如多目标机会话），
+    记录器数量增加时不会增加线程数量。
+    """
+
+    _STOP = object()  # 停止写入线程的哨兵
+
+    def __init__(self, name="RecorderWriter", batch_size=200, flush_interval=1.0):
+        """
+        初始化写入线程
+
+        Args:
+            name: 名称，用于线程名和日志标识
+            batch_size: 每批最多写入的行数
+            flush_interval: 最长刷新间隔（秒）
+        """
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # 待写入队列：(记录器, 数据行)
+        self.row_queue = queue.Queue()
+
+        # 线程控制
+        self.writer_thread = None
+        self.running = False
+
+        self.logger = logging.getLogger(name)
+
+    def start(self):
+        """启动写入线程"""
+        if self.running:
+            return False
+
+        self.running = True
+        self.writer_thread = threading.Thread(
+            target=self._writer_thread_func,
+            name=self.name,
+            daemon=True
+        )
+        self.writer_thread.start()
+        return True
+
+    def stop(self):
+        """停止写入线程，剩余数据全部落盘"""
+        if not self.running:
+            return
+
+        self.running = False
+        self.row_queue.put(self._STOP)
+        if self.writer_thread:
+            self.writer_thread.join()
+            self.writer_thread = None
+
+    def submit(self, recorder, row):
+        """将数据行放入写入队列"""
+        self.row_queue.put((recorder, row))
+
+    def flush(self, timeout=None):
+        """
+        等待队列中已有的数据全部写入文件
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            bool: 是否在超时前完成
+        """
+        if not self.running:
+            return True
+
+        done = threading.Event()
+        self.row_queue.put(done)
+        return done.wait(timeout)
+
+    def _writer_thread_func(self):
+        """写入线程函数：批量取出队列中的数据行，按记录器分组追加到日志文件"""
+        self.logger.info(f"{self.name} 写入线程启动")
+
+        stopping = False
+        while not stopping:
+            try:
+                item = self.row_queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batches = {}
+            waiters = []
+            count = 0
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    recorder, row = item
+                    batches.setdefault(recorder, []).append(row)
+                    count += 1
+
+                if stopping or count >= self.batch_size:
+                    break
+                try:
+                    item = self.row_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            for recorder, rows in batches.items():
+                recorder._write_rows(rows)
+
+            for waiter in waiters:
+                waiter.set()
+
+        self.logger.info(f"{self.name} 写入线程退出")
+
+
+class StreamRecorder:
+    """
+    流式数据记录器基类：数据行以追加方式写入CSV日志文件，
+    由后台写入线程按批次落盘，每行的写入代价与已记录行数无关
+    """
+
+    def __init__(self, journal_file, headers, name="Recorder",
+                 batch_size=200, flush_interval=1.0, writer=None, durable=False):
+        """
+        初始化流式记录器
+
+        Args:
+            journal_file: CSV日志文件路径
+            headers: 表头列表
+            name: 记录器名称，用于日志标识
+            batch_size: 每批最多写入的行数
+            flush_interval: 最长刷新间隔（秒）
+            writer: 共享的RecorderWriter，None表示使用独立的写入线程
+            durable: 每批写入后是否flush并fsync到磁盘
+        """
+        self.journal_file = journal_file
+        self.headers = list(headers)
+        self.name = name
+        self.durable = durable
+
+        # 写入线程（独立或共享）
+        self.own_writer = writer is None
+        self.writer = writer or RecorderWriter(f"{name}_Writer", batch_size, flush_interval)
+
+        self.running = False
+        self.record_count = 0
+
+        # 日志文件访问锁（写入线程与导出操作互斥）
+        self.file_lock = threading.Lock()
+
+        self.logger = logging.getLogger(name)
+
+    def start(self):
+        """写入表头并启动写入线程"""
+        if self.running:
+            return False
+
+        with self.file_lock:
+            self._write_header()
+
+        self.running = True
+        if self.own_writer or not self.writer.running:
+            self.writer.start()
+        self.logger.info(f"{self.name} 启动成功: {self.journal_file}")
+        return True
+
+    def stop(self):
+        """停止记录，剩余数据全部落盘"""
+        if not self.running:
+            return
+
+        self.running = False
+        if self.own_writer:
+            self.writer.stop()
+        else:
+            self.writer.flush()
+
+        self.logger.info(f"{self.name} 已停止")
+
+    def append(self, row):
+        """
+        追加一行数据（只放入队列，不阻塞调用线程）
+
+        Args:
+            row: 数据行（列表）
+
+        Returns:
+            int: 本行编号
+        """
+        self.record_count += 1
+        self.writer.submit(self, row)
+        return self.record_count
+
+    def flush(self, timeout=None):
+        """
+        等待队列中已有的数据全部写入文件
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            bool: 是否在超时前完成
+        """
+        return self.writer.flush(timeout)
+
+    def has_pending_rows(self):
+        """日志文件中是否有尚未导出的数据行"""
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8', newline='') as f:
+                f.readline()  # 跳过表头
+                return bool(f.readline())
+        except FileNotFoundError:
+            return False
+
+    def read_rows(self):
+        """
+        逐行读取日志文件中的数据（不含表头）
+
+        Yields:
+            tuple: (表头, 数据行)
+        """
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                headers = next(reader, None)
+                if headers is None:
+                    return
+                for row in reader:
+                    if row:
+                        yield headers, row
+        except FileNotFoundError:
+            return
+
+    def export_to_excel(self, excel_file, sheet_name):
+        """
+        将日志中的数据行一次性追加到Excel工作表，成功后清空日志
+
+        Args:
+            excel_file: Excel文件路径
+            sheet_name: 工作表名称
+
+        Returns:
+            int: 导出的行数
+        """
+        from openpyxl import Workbook, load_workbook
+
+        self.flush()
+
+        with workbook_lock(excel_file), self.file_lock:
+            if os.path.exists(excel_file):
+                workbook = load_workbook(excel_file)
+            else:
+                workbook = Workbook()
+                workbook.remove(workbook.active)
+
+            if sheet_name in workbook.sheetnames:
+                worksheet = workbook[sheet_name]
+            else:
+                worksheet = workbook.create_sheet(sheet_name)
+                worksheet.append(self.headers)
+
+            # 按工作表表头对齐列，日志与表头不一致时按列名映射
+            sheet_headers = [cell.value for cell in worksheet[1]]
+            exported = 0
+            for headers, row in self.read_rows():
+                values = dict(zip(headers, row))
+                cells = [self._convert_cell(header, values.get(header, ""))
+                         for header in sheet_headers]
+                worksheet.append(cells)
+                self._format_row(worksheet, worksheet.max_row, sheet_headers)
+                exported += 1
+
+            if exported:
+                workbook.save(excel_file)
+
+            # 清空日志，只保留表头
+            self._write_header(truncate=True)
+
+        self.logger.info(f"{self.name} 已导出 {exported} 行到 {excel_file} [{sheet_name}]")
+        return exported
+
+    def _convert_cell(self, header, value):
+        """将日志中的文本值转换为Excel单元格值（子类可重写）"""
+        return value
+
+    def _format_row(self, worksheet, row_index, sheet_headers):
+        """设置导出行的单元格格式（子类可重写）"""
+        pass
+
+    def _write_header(self, truncate=False):
+        """写入表头（文件不存在、为空或要求清空时）"""
+        if not truncate and os.path.exists(self.journal_file) \
+                and os.path.getsize(self.journal_file) > 0:
+            return
+
+        with open(self.journal_file, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerow(self.headers)
+
+    def _write_rows(self, rows):
+        """追加一批数据行到日志文件（在写入线程中调用）"""
+        try:
+            with self.file_lock:
+                with open(self.journal_file, 'a', encoding='utf-8', newline='') as f:
+                    csv.writer(f).writerows(rows)
+                    if self.durable:
+                        f.flush()
+                        os.fsync(f.fileno())
+        except Exception as e:
+            self.logger.error(f"{self.name} 写入日志文件失败: {e}")
+
+
+class VariableRecorder(StreamRecorder):
+    """观察变量记录器 - 对应Excel中的'观察变量'工作表"""
+
+    SHEET_NAME = '观察变量'
+
+    def __init__(self, journal_file, watch_variables, **kwargs):
+        """
+        初始化观察变量记录器
+
+        Args:
+            journal_file: CSV日志文件路径
+            watch_variables: 监视变量列表（来自watch_variables.json）
+        """
+        # 变量名 -> 列槽位，记录时按收到的变量直接定位列
+        self.index = VariableIndex(watch_variables)
+        self.var_names = self.index.names
+        self.var_types = dict(zip(self.index.names, self.index.types))
+        headers = ["编号"] + self.var_names + ["时间"]
+
+        kwargs.setdefault("name", "VariableRecorder")
+        super().__init__(journal_file, headers, **kwargs)
+
+    def record(self, vars_data, timestamp=None):
+        """
+        记录一次变量采样
+
+        Args:
+            vars_data: 变量名到变量值的字典
+            timestamp: 时间字符串，None表示使用当前时间
+
+        Returns:
+            int: 本行编号
+        """
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        values = [""] * len(self.var_names)
+        for var_name, var_value in vars_data.items():
+            slot = self.index.get(var_name)
+            if slot is None or var_value is None or var_value == "":
+                continue
+            try:
+                num_value = float(var_value)
+                if self.index.types[slot] == "int":
+                    var_value = int(num_value)
+                else:
+                    # 浮点数保留3位小数
+                    var_value = round(num_value, 3)
+            except (ValueError, TypeError):
+                var_value = str(var_value)
+            values[slot] = var_value
+
+        row = [self.record_count + 1]
+        row.extend(values)
+        row.append(timestamp)
+
+        return self.append(row)
+
+    def export_to_excel(self, excel_file, sheet_name=SHEET_NAME):
+        return super().export_to_excel(excel_file, sheet_name)
+
+    def _convert_cell(self, header, value):
+        if value == "":
+            return value
+        try:
+            if header == "编号":
+                return int(value)
+            var_type = self.var_types.get(header)
+            if var_type == "int":
+                return int(float(value))
+            if var_type is not None:
+                return round(float(value), 3)
+        except (ValueError, TypeError):
+            pass
+        return value
+
+    def _format_row(self, worksheet, row_index, sheet_headers):
+        for col, header in enumerate(sheet_headers, 1):
+            var_type = self.var_types.get(header)
+            if var_type is None:
+                continue
+            worksheet.cell(row=row_index, column=col).number_format = \
+                '0' if var_type == "int" else '0.000'
+
+
+class ParameterRecorder(StreamRecorder):
+    """输入参数记录器 - 对应Excel中的'输入参数'工作表"""
+
+    SHEET_NAME = '输入参数'
+
+    def __init__(self, journal_file, input_params, **kwargs):
+        """
+        初始化输入参数记录器
+
+        Args:
+            journal_file: CSV日志文件路径
+            input_params: 输入参数列表（来自input_params.json）
+        """
+        headers = ["编号"]
+        for param in input_params:
+            headers.append(param.get("param", ""))
+        headers.append("时间")
+
+        self.param_names = headers[1:-1]
+        kwargs.setdefault("name", "ParameterRecorder")
+        # 参数下发频率低，每行立即落盘：使用独立的写入线程（共享写入线程按批写入），
+        # 每批一行并fsync
+        kwargs["writer"] = None
+        kwargs["batch_size"] = 1
+        kwargs["durable"] = True
+        super().__init__(journal_file, headers, **kwargs)
+
+    def record(self, params_data, timestamp=None):
+        """
+        记录一次参数
+
+        Args:
+            params_data: 参数名到参数值的字典
+            timestamp: 时间字符串或标记（如"初始参数"），None表示使用当前时间
+
+        Returns:
+            int: 本行编号
+        """
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        row = [self.record_count + 1]
+        for param_name in self.param_names:
+            row.append(params_data.get(param_name, ""))
+        row.append(timestamp)
+
+        return self.append(row)
+
+    def export_to_excel(self, excel_file, sheet_name=SHEET_NAME):
+        return super().export_to_excel(excel_file, sheet_name)
+
+    def _convert_cell(self, header, value):
+        if header == "编号" and value != "":
+            try:
+                return int(value)
+            except ValueError:
+                pass
+        return value
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import argparse
+import logging
+import threading
+from SessionManager import SessionManager
+from DataRecorder import VariableRecorder, ParameterRecorder
+
+
+def load_json_file(filename):
+    """加载JSON文件，如果文件不存在则返回空列表"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logging.warning(f"文件 {filename} 不存在")
+        return []
+    except json.JSONDecodeError as e:
+        logging.error(f"文件 {filename} JSON格式错误: {e}")
+        return []
+
+
+class HeadlessSimulator:
+    """
+    无界面仿真引擎 - 不依赖Tk，运行与界面相同的控制/状态链路协议
+
+    连接目标机、心跳、变量轮询、参数下发和数据记录全部在会话管理器的
+    共享事件循环中完成，可用于脚本、夜间回归和长时间浸泡测试。
+    """
+
+    def __init__(self, target, input_params, watch_variables,
+                 ctrl_port=9001, status_port=9000, framing="json", status_format="json",
+                 query_interval=1.0, acquisition="poll", stream_rate=10.0,
+                 heartbeat_interval=5.0, heartbeat_timeout=20.0,
+                 use_heartbeat=True, data_record_file="仿真数据记录.xlsx", save_data=True):
+        """
+        初始化无界面仿真引擎
+
+        Args:
+            target: 目标机地址
+            input_params: 输入参数列表（input_params.json格式）
+            watch_variables: 监视变量列表（watch_variables.json格式）
+            ctrl_port: 控制链路端口
+            status_port: 状态链路端口
+            framing: 分帧方式
+            status_format: 状态链路变量格式，"json"或"binary"
+            query_interval: 变量查询间隔（秒）
+            acquisition: 变量采集方式，"poll"轮询或"stream"订阅推送
+            stream_rate: 订阅推送的期望频率（Hz）
+            heartbeat_interval: 心跳发送间隔（秒）
+            heartbeat_timeout: 心跳超时时间（秒）
+            use_heartbeat: 是否使用心跳机制
+            data_record_file: 数据记录Excel文件
+            save_data: 是否记录数据
+        """
+        self.target = target
+        self.input_params = input_params
+        self.watch_variables = watch_variables
+        self.ctrl_port = ctrl_port
+        self.status_port = status_port
+        self.framing = framing
+        self.status_format = status_format
+        self.query_interval = query_interval
+        self.acquisition = acquisition
+        self.stream_rate = stream_rate
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.use_heartbeat = use_heartbeat
+        self.data_record_file = data_record_file
+        self.save_data = save_data
+
+        self.session_manager = SessionManager()
+        self.session = None
+        self.stop_event = threading.Event()
+
+        # 数据记录（日志文件与界面版本相同，可以由界面合并到Excel）
+        self.param_recorder = None
+        self.var_recorder = None
+        if save_data:
+            base_name = os.path.splitext(data_record_file)[0]
+            self.param_recorder = ParameterRecorder(f"{base_name}_输入参数.csv", input_params)
+            self.var_recorder = VariableRecorder(f"{base_name}_观察变量.csv", watch_variables)
+
+        self.logger = logging.getLogger("Headless")
+
+    def connect(self):
+        """
+        连接目标机
+
+        Returns:
+            bool: 两条链路是否都连接成功
+        """
+        self.logger.info(f"正在连接目标机 {self.target} (控制链路{self.ctrl_port}, 状态链路{self.status_port})")
+        self.session = self.session_manager.open_session(
+            self.target, self.watch_variables,
+            ctrl_port=self.ctrl_port,
+            status_port=self.status_port,
+            framing=self.framing,
+            status_format=self.status_format,
+            heartbeat_interval=self.heartbeat_interval,
+            heartbeat_timeout=self.heartbeat_timeout,
+            query_interval=self.query_interval,
+            acquisition=self.acquisition,
+            stream_rate=self.stream_rate,
+            status_callback=self._on_session_status,
+            recorder=self.var_recorder
+        )
+
+        if not (self.session.ctrl_ok and self.session.status_ok):
+            self.logger.error(f"连接失败: 控制链路={'成功' if self.session.ctrl_ok else '失败'}, "
+                              f"状态链路={'成功' if self.session.status_ok else '失败'}")
+            self.session = None
+            return False
+
+        self.logger.info(f"已连接到目标机: {self.target}")
+        if self.param_recorder:
+            self.param_recorder.start()
+        if self.use_heartbeat:
+            self.session.start_heartbeat()
+        return True
+
+    def current_params(self):
+        """当前全部参数的字典"""
+        return {param.get("param", ""): param.get("val", "") for param in self.input_params}
+
+    def send_parameters(self, params=None):
+        """
+        下发参数并记录
+
+        Args:
+            params: 参数名到参数值的字典，None表示发送全部参数
+        """
+        if params is None:
+            params = self.current_params()
+
+        if not self.session or not self.session.send_parameters(params):
+            self.logger.error("参数发送失败")
+            return False
+
+        self.logger.info(f"参数消息已发送 ({len(params)}个参数)")
+        if self.param_recorder:
+            count = self.param_recorder.record(self.current_params())
+            self.logger.info(f"已记录参数数据，编号: {count}")
+        return True
+
+    def run(self, duration=None, report_interval=10.0):
+        """
+        运行模型：记录初始参数并采集变量（轮询或订阅），直到时长结束、心跳超时或被中断
+
+        Args:
+            duration: 运行时长（秒），None表示一直运行
+            report_interval: 统计信息输出间隔（秒）
+        """
+        if self.param_recorder:
+            self.param_recorder.record(self.current_params(), "初始参数")
+            self.logger.info("已记录初始参数")
+
+        self.logger.info("模型开始运行")
+        self.session.start_acquisition(self.query_interval, self.stream_rate)
+
+        start_time = time.time()
+        last_report_time = start_time
+        last_count = 0
+        try:
+            while not self.stop_event.is_set():
+                remaining = None if duration is None else start_time + duration - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+
+                wait_time = report_interval if remaining is None else min(report_interval, remaining)
+                if self.stop_event.wait(wait_time):
+                    break
+
+                now = time.time()
+                count = self.session.sample_count
+                rate = (count - last_count) / (now - last_report_time)
+                self.logger.info(f"运行 {now - start_time:.0f}s，已接收 {count} 组变量数据 ({rate:.1f}/s)")
+                last_report_time, last_count = now, count
+
+        except KeyboardInterrupt:
+            self.logger.info("收到中断信号")
+
+        self.session.stop_acquisition()
+        self.logger.info(f"模型停止运行，共接收 {self.session.sample_count} 组变量数据")
+
+    def stop(self, export=True):
+        """
+        断开连接，停止记录器并导出Excel
+
+        Args:
+            export: 是否将记录数据导出到Excel（需要openpyxl）
+        """
+        self.stop_event.set()
+        self.session_manager.close_all()
+        self.session = None
+
+        for recorder in (self.param_recorder, self.var_recorder):
+            if recorder is None:
+                continue
+            recorder.stop()
+            if export:
+                try:
+                    count = recorder.export_to_excel(self.data_record_file)
+                    self.logger.info(f"已导出{recorder.SHEET_NAME}数据: {count}行")
+                except ImportError:
+                    self.logger.warning(f"未安装openpyxl，{recorder.SHEET_NAME}数据保留在 {recorder.journal_file}")
+                except Exception as e:
+                    self.logger.error(f"导出{recorder.SHEET_NAME}数据失败: {e}")
+
+    def _on_session_status(self, session, is_online):
+        """会话离线时结束运行"""
+        if not is_online:
+            self.logger.error("目标机离线，停止运行")
+            self.stop_event.set()
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="硬件仿真系统 - 无界面运行")
+    parser.add_argument("--target", default="192.168.3.173", help="目标机地址")
+    parser.add_argument("--ctrl-port", type=int, default=9001, help="控制链路端口")
+    parser.add_argument("--status-port", type=int, default=9000, help="状态链路端口")
+    parser.add_argument("--framing", default="json", choices=["json", "newline", "length"], help="分帧方式")
+    parser.add_argument("--status-format", default="json", choices=["json", "binary"],
+                        help="状态链路变量格式（binary需要length分帧）")
+    parser.add_argument("--params", default="input_params.json", help="输入参数文件")
+    parser.add_argument("--watch", default="watch_variables.json", help="监视变量文件")
+    parser.add_argument("--duration", type=float, default=None, help="运行时长（秒），默认一直运行")
+    parser.add_argument("--query-interval", type=float, default=1.0, help="变量查询间隔（秒）")
+    parser.add_argument("--acquisition", default="poll", choices=["poll", "stream"],
+                        help="变量采集方式：poll轮询，stream订阅推送（目标机不支持时回退到轮询）")
+    parser.add_argument("--stream-rate", type=float, default=10.0, help="订阅推送的期望频率（Hz）")
+    parser.add_argument("--no-heartbeat", action="store_true", help="不使用心跳机制")
+    parser.add_argument("--send-params", action="store_true", help="运行前下发全部参数")
+    parser.add_argument("--record-file", default="仿真数据记录.xlsx", help="数据记录Excel文件")
+    parser.add_argument("--no-record", action="store_true", help="不记录数据")
+    parser.add_argument("--no-export", action="store_true", help="结束时不导出Excel，只保留CSV日志")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="统计信息输出间隔（秒）")
+    parser.add_argument("--log-level", default="INFO", help="日志级别")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    simulator = HeadlessSimulator(
+        args.target,
+        load_json_file(args.params),
+        load_json_file(args.watch),
+        ctrl_port=args.ctrl_port,
+        status_port=args.status_port,
+        framing=args.framing,
+        status_format=args.status_format,
+        query_interval=args.query_interval,
+        acquisition=args.acquisition,
+        stream_rate=args.stream_rate,
+        use_heartbeat=not args.no_heartbeat,
+        data_record_file=args.record_file,
+        save_data=not args.no_record
+    )
+
+    if not simulator.connect():
+        simulator.stop(export=False)
+        return 1
+
+    try:
+        if args.send_params:
+            simulator.send_parameters()
+        simulator.run(args.duration, args.report_interval)
+    finally:
+        simulator.stop(export=not args.no_export)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
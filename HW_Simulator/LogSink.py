@@ -0,0 +1,191 @@
+import os
+import time
+import logging
+import logging.handlers
+from datetime import datetime
+from collections import deque
+import tkinter as tk
+
+
+# 日志级别（数值越大越重要）
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+
+class LogSink:
+    """
+    界面日志缓冲输出 - 任意线程写入，UI线程按节拍批量追加到日志文本框
+
+    write()只把日志放入deque（线程安全、不加锁、不触碰Tk控件），UI节拍
+    一次性插入积压的全部日志并滚动到末尾。界面只保留最近max_lines条日志
+    （环形缓冲），按级别过滤显示；完整历史写入滚动日志文件，可通过search()
+    逐行检索而不加载到文本框。
+    """
+
+    def __init__(self, root, text_widget, tick_hz=10, max_lines=2000,
+                 log_file=None, max_bytes=10 * 1024 * 1024, backup_count=5):
+        """
+        初始化日志输出
+
+        Args:
+            root: Tk根窗口
+            text_widget: 日志文本框
+            tick_hz: UI节拍频率（Hz）
+            max_lines: 文本框最多保留的行数
+            log_file: 镜像日志文件路径，None表示不写文件
+            max_bytes: 单个日志文件最大字节数，超出后滚动
+            backup_count: 保留的历史日志文件数量
+        """
+        self.root = root
+        self.text_widget = text_widget
+        self.tick_ms = max(1, int(1000 / tick_hz))
+        self.max_lines = max_lines
+        self.records = deque()  # 待输出的日志：(时间, 级别, 消息)
+        self.history = deque(maxlen=max_lines)  # 最近的日志（环形缓冲），切换级别时重新显示
+        self.min_level = LEVELS["DEBUG"]
+
+        self.after_id = None
+        self.running = False
+
+        # 滚动日志文件镜像（在UI节拍中批量写入）
+        self.log_file = log_file
+        self.backup_count = backup_count
+        self.file_handler = None
+        if log_file:
+            self.file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            self.file_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def start(self):
+        """启动UI节拍"""
+        if self.running:
+            return
+        self.running = True
+        self.after_id = self.root.after(self.tick_ms, self._tick)
+
+    def stop(self):
+        """停止UI节拍，积压的日志写入文件后关闭文件"""
+        self.running = False
+        if self.after_id is not None:
+            try:
+                self.root.after_cancel(self.after_id)
+            except Exception:
+                pass
+            self.after_id = None
+
+        records = self.drain()
+        if self.file_handler:
+            self._write_file(records)
+            self.file_handler.close()
+            self.file_handler = None
+
+    def write(self, message, level="INFO"):
+        """
+        写入一条日志（可在任意线程调用）
+
+        Args:
+            message: 日志内容
+            level: 日志级别
+        """
+        self.records.append((time.time(), level, message))
+
+    def drain(self):
+        """取出当前积压的全部日志"""
+        records = self.records
+        return [records.popleft() for _ in range(len(records))]
+
+    def flush(self):
+        """立即把积压的日志输出到文本框和文件（UI线程调用）"""
+        records = self.drain()
+        if not records:
+            return
+
+        self._write_file(records)
+        self.history.extend(records)
+
+        # 一个批次超过最大行数时只显示最新的部分
+        self._insert(records[-self.max_lines:])
+
+    def set_level(self, level):
+        """
+        设置显示的最低日志级别，并按环形缓冲中的日志重新显示（UI线程调用）
+
+        Args:
+            level: 日志级别名称（DEBUG/INFO/WARNING/ERROR）
+        """
+        self.min_level = LEVELS.get(level, LEVELS["DEBUG"])
+        self.flush()
+        self.text_widget.delete('1.0', tk.END)
+        self._insert(self.history)
+
+    def search(self, pattern, max_results=1000):
+        """
+        在日志文件（包括已滚动的历史文件）中逐行检索
+
+        Args:
+            pattern: 检索的文字（不区分大小写）
+            max_results: 最多返回的行数（保留最新的部分）
+
+        Returns:
+            list: 匹配的日志行（从旧到新）
+        """
+        if not self.log_file:
+            return []
+
+        pattern = pattern.lower()
+        results = deque(maxlen=max_results)
+
+        # 从最旧的滚动文件到当前文件依次读取
+        files = [f"{self.log_file}.{i}" for i in range(self.backup_count, 0, -1)]
+        files.append(self.log_file)
+        for filename in files:
+            if not os.path.exists(filename):
+                continue
+            try:
+                with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+                    for line in f:
+                        if pattern in line.lower():
+                            results.append(line.rstrip('\n'))
+            except OSError:
+                continue
+
+        return list(results)
+
+    def _insert(self, records):
+        """把通过级别过滤的日志追加到文本框，超过最大行数时删除最旧的行"""
+        min_level = self.min_level
+        text = "".join(f"[{datetime.fromtimestamp(created).strftime('%H:%M:%S')}] {message}\n"
+                       for created, level, message in records
+                       if LEVELS.get(level, LEVELS["INFO"]) >= min_level)
+        if not text:
+            return
+
+        widget = self.text_widget
+        widget.insert(tk.END, text)
+
+        line_count = int(widget.index('end-1c').split('.')[0])
+        if line_count > self.max_lines:
+            widget.delete('1.0', f'{line_count - self.max_lines + 1}.0')
+
+        widget.see(tk.END)
+
+    def _write_file(self, records):
+        """批量写入镜像日志文件"""
+        if not self.file_handler or not records:
+            return
+        lines = "\n".join(
+            f"{datetime.fromtimestamp(created).strftime('%Y-%m-%d %H:%M:%S')} [{level}] {message}"
+            for created, level, message in records)
+        self.file_handler.emit(logging.makeLogRecord({'msg': lines, 'levelname': "INFO"}))
+
+    def _tick(self):
+        """UI节拍：批量输出积压的日志"""
+        if not self.running:
+            return
+
+        try:
+            self.flush()
+        except tk.TclError:
+            pass
+        finally:
+            if self.running:
+                self.after_id = self.root.after(self.tick_ms, self._tick)
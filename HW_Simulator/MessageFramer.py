@@ -0,0 +1,328 @@
+import re
+import struct
+
+
+class FramingError(ValueError):
+    """分帧错误（消息超长或长度字段非法）"""
+    pass
+
+
+class MessageFramer:
+    """
+    消息分帧器基类：将TCP字节流重组为完整消息
+
+    使用可复用的接收缓冲区（bytearray），新数据直接拷贝到缓冲区尾部，
+    已解析的数据只移动读指针，不做逐块拼接。一次feed可以产出多条消息，
+    跨多次recv的消息会保留在缓冲区中直到完整。
+
+    也可以用get_buffer/commit让socket.recv_into直接写入缓冲区尾部，
+    省去每次recv产生的bytes对象和再拷贝进缓冲区的一次复制。
+    """
+
+    def __init__(self, initial_size=4096, max_message_size=16 * 1024 * 1024,
+                 max_recv_size=256 * 1024, message_views=False):
+        """
+        初始化分帧器
+
+        Args:
+            initial_size: 接收缓冲区初始大小，也是recv_into的初始接收大小（字节）
+            max_message_size: 单条消息最大长度（字节）
+            max_recv_size: recv_into接收大小的上限，每次读满时接收大小加倍直到此上限（字节）
+            message_views: 为True时消息以缓冲区的memoryview切片返回（不复制），
+                只在下一次feed/get_buffer之前有效，调用方必须同步处理完毕
+        """
+        self.max_message_size = max_message_size
+        self.buffer = bytearray(initial_size)
+        self.start = 0  # 未解析数据起始位置
+        self.end = 0  # 已写入数据结束位置
+        self.recv_size = initial_size  # 下一次recv_into的接收大小（自适应）
+        self.max_recv_size = max(initial_size, max_recv_size)
+        self.message_views = message_views
+
+    def feed(self, data):
+        """
+        写入接收到的数据并取出所有完整消息
+
+        Args:
+            data: 接收到的数据（bytes/bytearray/memoryview）
+
+        Returns:
+            list: 完整消息列表（bytes，message_views为True时为memoryview）
+        """
+        size = len(data)
+        if size:
+            self._reserve(size)
+            self.buffer[self.end:self.end + size] = data
+        return self._commit(size)
+
+    def get_buffer(self, size=None):
+        """
+        获取缓冲区尾部的可写空间，供socket.recv_into直接写入，写入后调用commit
+
+        Args:
+            size: 需要的字节数，None表示使用自适应的接收大小
+
+        Returns:
+            memoryview: 可写的缓冲区切片（commit之前应释放）
+        """
+        size = size or self.recv_size
+        self._reserve(size)
+        return memoryview(self.buffer)[self.end:self.end + size]
+
+    def commit(self, nbytes):
+        """
+        确认recv_into写入了nbytes字节，并取出所有完整消息
+
+        一次读满接收大小说明socket中还有积压数据，下一次接收大小加倍。
+
+        Args:
+            nbytes: 实际写入的字节数
+
+        Returns:
+            list: 完整消息列表
+        """
+        if nbytes >= self.recv_size and self.recv_size < self.max_recv_size:
+            self.recv_size = min(self.recv_size * 2, self.max_recv_size)
+        return self._commit(nbytes)
+
+    def _commit(self, nbytes):
+        """写指针前移nbytes并取出完整消息"""
+        self.end += nbytes
+        messages = self._extract()
+
+        # 数据全部解析完毕时直接复位读写指针
+        if self.start == self.end:
+            self._shift(self.start)
+
+        if self.end - self.start > self.max_message_size:
+            pending = self.end - self.start
+            self.reset()
+            raise FramingError(f"消息长度超过上限: {pending} > {self.max_message_size}")
+
+        return messages
+
+    def encode(self, message):
+        """
+        将待发送消息编码为带分帧信息的字节
+
+        Args:
+            message: 消息（字符串或字节）
+
+        Returns:
+            bytes: 编码后的数据
+        """
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        return message
+
+    def pending_bytes(self):
+        """缓冲区中尚未组成完整消息的字节数"""
+        return self.end - self.start
+
+    def reset(self):
+        """清空缓冲区"""
+        self._shift(self.start)
+        self.start = 0
+        self.end = 0
+
+    def _reserve(self, size):
+        """确保缓冲区尾部至少有size字节空闲空间"""
+        if self.end + size <= len(self.buffer):
+            return
+
+        # 先把未解析数据移动到缓冲区头部
+        pending = self.end - self.start
+        if self.start > 0:
+            if pending:
+                self.buffer[:pending] = self.buffer[self.start:self.end]
+            self._shift(self.start)
+            self.start = 0
+            self.end = pending
+
+        # 空间仍不足时按倍数扩容（换用新的缓冲区而不是原地扩展，
+        # 仍被memoryview引用的旧缓冲区不能改变大小）
+        if self.end + size > len(self.buffer):
+            new_size = len(self.buffer)
+            while self.end + size > new_size:
+                new_size *= 2
+            buffer = bytearray(new_size)
+            buffer[:self.end] = self.buffer[:self.end]
+            self.buffer = buffer
+
+    def _shift(self, offset):
+        """读指针前移offset时调整子类的扫描状态（子类可重写）"""
+        if offset == self.end:
+            self.start = 0
+            self.end = 0
+
+    def _message(self, start, end):
+        """取出缓冲区中的一条消息（复制为bytes或返回memoryview切片）"""
+        if self.message_views:
+            return memoryview(self.buffer)[start:end]
+        return bytes(self.buffer[start:end])
+
+    def _extract(self):
+        """从缓冲区中取出完整消息（子类必须重写此方法）"""
+        raise NotImplementedError
+
+
+class NewlineFramer(MessageFramer):
+    """换行分隔分帧器 - 每条消息以'\\n'结尾（兼容'\\r\\n'）"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.scan_pos = 0  # 下次查找换行符的起始位置
+
+    def encode(self, message):
+        return super().encode(message) + b'\n'
+
+    def reset(self):
+        super().reset()
+        self.scan_pos = 0
+
+    def _shift(self, offset):
+        self.scan_pos = max(0, self.scan_pos - offset)
+        super()._shift(offset)
+
+    def _extract(self):
+        messages = []
+        buffer = self.buffer
+        while True:
+            idx = buffer.find(b'\n', max(self.scan_pos, self.start), self.end)
+            if idx < 0:
+                self.scan_pos = self.end
+                break
+
+            line_end = idx
+            if line_end > self.start and buffer[line_end - 1] == 0x0D:
+                line_end -= 1
+            if line_end > self.start:
+                messages.append(self._message(self.start, line_end))
+
+            self.start = idx + 1
+            self.scan_pos = self.start
+
+        return messages
+
+
+class LengthPrefixFramer(MessageFramer):
+    """长度前缀分帧器 - 每条消息前带4字节大端无符号长度"""
+
+    HEADER = struct.Struct('!I')
+
+    def encode(self, message):
+        payload = super().encode(message)
+        return self.HEADER.pack(len(payload)) + payload
+
+    def _extract(self):
+        messages = []
+        header_size = self.HEADER.size
+        while self.end - self.start >= header_size:
+            length, = self.HEADER.unpack_from(self.buffer, self.start)
+            if length > self.max_message_size:
+                self.reset()
+                raise FramingError(f"长度字段非法: {length}")
+
+            message_end = self.start + header_size + length
+            if message_end > self.end:
+                break
+
+            messages.append(self._message(self.start + header_size, message_end))
+            self.start = message_end
+
+        return messages
+
+
+class JsonFramer(MessageFramer):
+    """
+    JSON对象分帧器 - 按花括号配对切分连续的JSON对象
+
+    目标机直接连续发送JSON对象（无分隔符）时使用，对象之间的空白和
+    换行会被忽略，因此同样适用于换行分隔的JSON流。
+    """
+
+    _TOKEN = re.compile(rb'[{}"\\]')
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.scan_pos = 0
+        self.depth = 0
+        self.in_string = False
+
+    def reset(self):
+        super().reset()
+        self.scan_pos = 0
+        self.depth = 0
+        self.in_string = False
+
+    def _shift(self, offset):
+        self.scan_pos = max(0, self.scan_pos - offset)
+        super()._shift(offset)
+
+    def _extract(self):
+        messages = []
+        buffer = self.buffer
+        pos = max(self.scan_pos, self.start)
+
+        while pos < self.end:
+            match = self._TOKEN.search(buffer, pos, self.end)
+            if match is None:
+                pos = self.end
+                break
+
+            idx = match.start()
+            char = buffer[idx]
+            pos = idx + 1
+
+            if self.in_string:
+                if char == 0x5C:  # 反斜杠转义，跳过下一个字节
+                    pos = idx + 2
+                elif char == 0x22:
+                    self.in_string = False
+                continue
+
+            if char == 0x7B:  # {
+                if self.depth == 0:
+                    # 丢弃对象之前的空白或无效数据
+                    self.start = idx
+                self.depth += 1
+            elif self.depth == 0:
+                # 对象之外的字符不属于任何消息
+                continue
+            elif char == 0x22:
+                self.in_string = True
+            elif char == 0x7D:  # }
+                self.depth -= 1
+                if self.depth == 0:
+                    messages.append(self._message(self.start, pos))
+                    self.start = pos
+
+        self.scan_pos = pos
+        if self.depth == 0:
+            # 不在对象内部时，已扫描的数据可以全部丢弃
+            self.start = min(pos, self.end)
+
+        return messages
+
+
+FRAMERS = {
+    'newline': NewlineFramer,
+    'length': LengthPrefixFramer,
+    'json': JsonFramer,
+}
+
+
+def create_framer(framing='json', **kwargs):
+    """
+    根据分帧方式创建分帧器
+
+    Args:
+        framing: 分帧方式，'newline'、'length'或'json'
+
+    Returns:
+        MessageFramer: 分帧器实例
+    """
+    try:
+        return FRAMERS[framing](**kwargs)
+    except KeyError:
+        raise ValueError(f"不支持的分帧方式: {framing}")
@@ -0,0 +1,75 @@
+import time
+from collections import deque
+
+
+class SampleBridge:
+    """
+    采样数据批量投递桥 - 连接状态链路工作线程与Tk主线程
+
+    工作线程只做deque追加（线程安全、不加锁），UI线程按固定节拍一次取出
+    所有积压的采样并作为一个批次交给回调处理，Tk事件队列中始终只有一个
+    定时任务，不会因消息速率升高而被大量after回调淹没。
+    """
+
+    def __init__(self, root, batch_callback, tick_hz=30, max_pending=100000):
+        """
+        初始化批量投递桥
+
+        Args:
+            root: Tk根窗口
+            batch_callback: 批处理回调，参数为[(到达时间, 采样数据), ...]
+            tick_hz: UI节拍频率（Hz）
+            max_pending: 最多积压的采样数，超出时丢弃最旧的采样
+        """
+        self.root = root
+        self.batch_callback = batch_callback
+        self.tick_ms = max(1, int(1000 / tick_hz))
+        self.samples = deque(maxlen=max_pending)
+
+        self.after_id = None
+        self.running = False
+
+    def start(self):
+        """启动UI节拍"""
+        if self.running:
+            return
+        self.running = True
+        self.after_id = self.root.after(self.tick_ms, self._tick)
+
+    def stop(self):
+        """停止UI节拍并丢弃积压的采样"""
+        self.running = False
+        if self.after_id is not None:
+            try:
+                self.root.after_cancel(self.after_id)
+            except Exception:
+                pass
+            self.after_id = None
+        self.samples.clear()
+
+    def push(self, sample):
+        """
+        投递一个采样（可在任意线程调用）
+
+        Args:
+            sample: 采样数据
+        """
+        self.samples.append((time.time(), sample))
+
+    def drain(self):
+        """取出当前积压的全部采样"""
+        samples = self.samples
+        return [samples.popleft() for _ in range(len(samples))]
+
+    def _tick(self):
+        """UI节拍：批量处理积压的采样"""
+        if not self.running:
+            return
+
+        try:
+            batch = self.drain()
+            if batch:
+                self.batch_callback(batch)
+        finally:
+            if self.running:
+                self.after_id = self.root.after(self.tick_ms, self._tick)
@@ -0,0 +1,135 @@
+import math
+import logging
+from AsyncTCPMessageHandler import SharedEventLoop
+
+
+class PeriodicJob:
+    """
+    周期任务 - 由PeriodicScheduler创建，在事件循环线程中按固定周期执行
+
+    第N次执行的时刻固定为 起点 + N*周期（单调时钟），不因回调耗时或
+    定时器延迟而累积漂移；落后超过一个周期时跳过错过的时刻，不补发。
+    """
+
+    def __init__(self, scheduler, interval, callback, args, name):
+        self.scheduler = scheduler
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.name = name or getattr(callback, '__name__', 'job')
+
+        self.anchor = None  # 周期起点（事件循环单调时钟）
+        self.ticks = 0  # 下一次执行对应的周期序号
+        self.runs = 0  # 已执行次数
+        self.missed = 0  # 因落后而跳过的次数
+        self.handle = None
+        self.cancelled = False
+
+    def cancel(self):
+        """取消任务（可在任意线程调用）"""
+        self.cancelled = True
+        self.scheduler.event_loop.call_soon(self._cancel_handle)
+
+    def set_interval(self, interval, delay=None):
+        """
+        修改执行周期，从当前时刻重新计算起点（可在任意线程调用）
+
+        Args:
+            interval: 新的执行周期（秒）
+            delay: 距下一次执行的时间（秒），None表示一个周期后
+        """
+        self.scheduler.event_loop.call_soon(self._restart, interval, interval if delay is None else delay)
+
+    def _cancel_handle(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        self.scheduler._discard(self)
+
+    def _restart(self, interval, delay):
+        if self.cancelled:
+            return
+        self.interval = interval
+        if self.handle is not None:
+            self.handle.cancel()
+        loop = self.scheduler.event_loop.loop
+        self.anchor = loop.time() + delay
+        self.ticks = 0
+        self.handle = loop.call_at(self.anchor, self._run)
+
+    def _run(self):
+        self.handle = None
+        if self.cancelled:
+            return
+
+        self.runs += 1
+        try:
+            self.callback(*self.args)
+        except Exception as e:
+            self.scheduler.logger.error(f"周期任务{self.name}执行失败: {e}")
+
+        # 回调中可能取消了任务或修改了周期
+        if self.cancelled or self.handle is not None:
+            return
+
+        loop = self.scheduler.event_loop.loop
+        self.ticks += 1
+        deadline = self.anchor + self.ticks * self.interval
+        now = loop.time()
+        if now - deadline >= self.interval:
+            skipped = math.floor((now - deadline) / self.interval)
+            self.ticks += skipped
+            self.missed += skipped
+            deadline = self.anchor + self.ticks * self.interval
+        self.handle = loop.call_at(deadline, self._run)
+
+
+class PeriodicScheduler:
+    """
+    周期任务调度服务 - 所有心跳、轮询、计时等周期任务共用一个事件循环线程
+
+    定时使用事件循环内部的截止时间堆和单调时钟（loop.call_at），不为周期任务
+    创建线程或threading.Timer；周期可以小于100ms（精度约1ms）。
+    回调在事件循环线程中执行，需要更新界面时应投递到Tk主线程。
+    """
+
+    def __init__(self, event_loop=None):
+        """
+        初始化调度服务
+
+        Args:
+            event_loop: 共享事件循环（SharedEventLoop），None表示使用进程内共享的事件循环
+        """
+        self.event_loop = event_loop or SharedEventLoop.get()
+        self.jobs = set()
+        self.logger = logging.getLogger("Scheduler")
+
+    def schedule(self, interval, callback, *args, delay=0.0, name=None):
+        """
+        添加周期任务（可在任意线程调用）
+
+        Args:
+            interval: 执行周期（秒）
+            callback: 回调函数
+            *args: 回调参数
+            delay: 距第一次执行的时间（秒），0表示立即执行
+            name: 任务名称，用于日志
+
+        Returns:
+            PeriodicJob: 任务对象，可用于取消或修改周期
+        """
+        if interval <= 0:
+            raise ValueError(f"周期必须大于0: {interval}")
+
+        job = PeriodicJob(self, interval, callback, args, name)
+        self.jobs.add(job)
+        self.event_loop.call_soon(job._restart, interval, delay)
+        return job
+
+    def cancel_all(self):
+        """取消所有周期任务"""
+        for job in list(self.jobs):
+            job.cancel()
+
+    def _discard(self, job):
+        self.jobs.discard(job)
@@ -0,0 +1,357 @@
+import tkinter as tk
+import time
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+from WindowStats import WindowStats
+
+
+class ScopeWindow:
+    """
+    多变量示波器窗口 - 多条曲线共用一个画布和时间轴
+
+    所有变量在同一个Figure中绘制（叠加在一个坐标系中，或按变量分层的子图
+    共享X轴），每帧只重绘一次：坐标轴不变时在缓存背景上重绘全部曲线（blit），
+    同时观察多个变量的开销接近观察一个变量。
+    """
+
+    # 曲线颜色（按添加顺序循环使用）
+    COLORS = ['#1f77b4', '#d62728', '#2ca02c', '#ff7f0e', '#9467bd',
+              '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+    def __init__(self, parent, max_points=2000, max_fps=30, layout="overlay", on_close=None):
+        """
+        初始化示波器窗口
+
+        Args:
+            parent: 父窗口
+            max_points: 每条曲线最多保留的点数
+            max_fps: 最大重绘帧率
+            layout: 布局，"overlay"叠加显示，"stacked"分层显示
+            on_close: 窗口关闭（关闭按钮或窗口标题栏）时的回调，None表示直接销毁窗口
+        """
+        self.window = tk.Toplevel(parent)
+        self.window.title("多变量波形")
+        self.window.geometry("1000x700")
+        self.max_points = max_points
+        self.layout = layout
+        self.on_close = on_close
+        self.window_size = 10.0  # 滑动窗口大小（秒）
+
+        # 曲线：变量名 -> {'stats', 'line', 'ax', 'color'}
+        self.traces = {}
+        self.start_time = None  # 所有曲线共同的时间起点
+        self.is_paused = False
+
+        # 渲染控制
+        self.frame_interval = 1.0 / max_fps
+        self.render_pending = False
+        self.last_render_time = 0.0
+        self.background = None
+        self.axes_dirty = True
+        self.out_of_range = False  # 上一帧以来是否有新数据超出Y轴
+
+        self.fig = Figure(figsize=(10, 6), dpi=100)
+        self.axes = []
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.window)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        self._create_control_panel()
+        self._rebuild_axes()
+
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+    def _create_control_panel(self):
+        """创建控制面板"""
+        control_frame = tk.Frame(self.window)
+        control_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+
+        # 布局
+        layout_frame = tk.Frame(control_frame)
+        layout_frame.pack(side=tk.LEFT, padx=(0, 20))
+
+        tk.Label(layout_frame, text="布局:", font=("Arial", 9)).pack(side=tk.LEFT)
+        self.layout_var = tk.StringVar(value=self.layout)
+
+        tk.Radiobutton(layout_frame, text="叠加", variable=self.layout_var,
+                       value="overlay", command=self._on_layout_change).pack(side=tk.LEFT, padx=(5, 0))
+        tk.Radiobutton(layout_frame, text="分层", variable=self.layout_var,
+                       value="stacked", command=self._on_layout_change).pack(side=tk.LEFT, padx=(5, 0))
+
+        # 窗口大小控制
+        window_frame = tk.Frame(control_frame)
+        window_frame.pack(side=tk.LEFT, padx=(0, 20))
+
+        tk.Label(window_frame, text="窗口(秒):", font=("Arial", 9)).pack(side=tk.LEFT)
+        self.window_var = tk.StringVar(value="10.0")
+        window_entry = tk.Entry(window_frame, textvariable=self.window_var, width=8)
+        window_entry.pack(side=tk.LEFT, padx=(5, 0))
+        window_entry.bind("<Return>", lambda e: self._on_window_size_change())
+
+        # 控制按钮
+        button_frame = tk.Frame(control_frame)
+        button_frame.pack(side=tk.LEFT)
+
+        self.pause_button = tk.Button(button_frame, text="暂停", width=8,
+                                      command=self.toggle_pause, bg='#d9d9d9')
+        self.pause_button.pack(side=tk.LEFT, padx=(0, 5))
+
+        tk.Button(button_frame, text="清除", width=8,
+                  command=self.clear_data, bg='#d9d9d9').pack(side=tk.LEFT, padx=(0, 5))
+
+        tk.Button(button_frame, text="关闭", width=8,
+                  command=self.close, bg='#d9d9d9').pack(side=tk.LEFT)
+
+        self.info_label = tk.Label(control_frame, text="变量: 0", font=("Arial", 9))
+        self.info_label.pack(side=tk.RIGHT)
+
+    def add_trace(self, variable_name):
+        """
+        添加一条曲线
+
+        Args:
+            variable_name: 变量名称
+
+        Returns:
+            bool: 是否新添加（已存在时返回False）
+        """
+        if variable_name in self.traces:
+            return False
+
+        color = self.COLORS[len(self.traces) % len(self.COLORS)]
+        self.traces[variable_name] = {
+            'stats': WindowStats(max_points=self.max_points, window_size=self.window_size),
+            'color': color,
+            'line': None,
+            'ax': None,
+        }
+        self._rebuild_axes()
+        return True
+
+    def remove_trace(self, variable_name):
+        """移除一条曲线"""
+        if self.traces.pop(variable_name, None) is not None:
+            self._rebuild_axes()
+
+    def has_trace(self, variable_name):
+        return variable_name in self.traces
+
+    def add_data(self, points_by_name):
+        """
+        批量添加多条曲线的数据点，全部追加后只重绘一帧
+
+        Args:
+            points_by_name: {变量名: [(变量值, 数据到达时间), ...]}
+        """
+        if self.is_paused:
+            return
+
+        appended = False
+        for variable_name, points in points_by_name.items():
+            trace = self.traces.get(variable_name)
+            if trace is None:
+                continue
+
+            stats = trace['stats']
+            for value, timestamp in points:
+                try:
+                    float_value = float(value)
+                except (ValueError, TypeError):
+                    continue
+
+                current_time = time.time() if timestamp is None else timestamp
+                if self.start_time is None:
+                    self.start_time = current_time
+                stats.append(current_time - self.start_time, float_value)
+                appended = True
+
+                # 新数据超出当前Y轴时，下一帧重新计算坐标轴
+                if trace['ax'] is not None and not self.out_of_range:
+                    y_min, y_max = trace['ax'].get_ylim()
+                    if float_value < y_min or float_value > y_max:
+                        self.out_of_range = True
+
+        if appended:
+            self._update_plot()
+
+    def _rebuild_axes(self):
+        """按布局重建坐标系和曲线（添加/移除变量或切换布局时）"""
+        self.fig.clear()
+        self.axes = []
+        names = list(self.traces)
+
+        if self.layout == "stacked" and names:
+            first_ax = None
+            for i, name in enumerate(names):
+                ax = self.fig.add_subplot(len(names), 1, i + 1, sharex=first_ax)
+                first_ax = first_ax or ax
+                ax.set_ylabel(name, fontsize=9)
+                self.axes.append(ax)
+            self.axes[-1].set_xlabel("时间 (秒)", fontsize=10)
+        else:
+            ax = self.fig.add_subplot(111)
+            ax.set_xlabel("时间 (秒)", fontsize=10)
+            ax.set_ylabel("数值", fontsize=10)
+            self.axes.append(ax)
+
+        for i, name in enumerate(names):
+            trace = self.traces[name]
+            ax = self.axes[i] if self.layout == "stacked" else self.axes[0]
+            trace['ax'] = ax
+            trace['line'], = ax.plot([], [], '-', color=trace['color'], linewidth=1.5,
+                                     label=name, animated=True)
+
+        for ax in self.axes:
+            ax.grid(True, alpha=0.3)
+            ax.ticklabel_format(useOffset=False, style='plain')
+            ax.set_xlim(0, self.window_size)
+            ax.set_ylim(0, 1)
+        if self.layout != "stacked" and names:
+            self.axes[0].legend(loc='upper right')
+
+        self.fig.tight_layout()
+        self.info_label.config(text=f"变量: {len(names)}")
+        self.axes_dirty = True
+        self.background = None
+        self._update_plot()
+
+    def _on_layout_change(self):
+        self.layout = self.layout_var.get()
+        self._rebuild_axes()
+
+    def _on_window_size_change(self):
+        try:
+            self.window_size = float(self.window_var.get())
+        except ValueError:
+            self.window_size = 10.0
+        for trace in self.traces.values():
+            trace['stats'].set_window_size(self.window_size)
+        self.axes_dirty = True
+        self._update_plot()
+
+    def _update_plot(self):
+        """请求重绘（按最大帧率合并）"""
+        if self.render_pending:
+            return
+        self.render_pending = True
+        delay = self.last_render_time + self.frame_interval - time.time()
+        try:
+            self.window.after(max(0, int(delay * 1000)), self._render)
+        except tk.TclError:
+            self.render_pending = False
+
+    def _render(self):
+        """绘制一帧：所有曲线一次重绘"""
+        self.render_pending = False
+        self.last_render_time = time.time()
+
+        try:
+            for trace in self.traces.values():
+                stats = trace['stats']
+                trace['line'].set_data(stats.times, stats.values)
+
+            if self._adjust_axes() or self.background is None:
+                self.canvas.draw()
+            else:
+                self.canvas.restore_region(self.background)
+                self._draw_lines()
+                self.canvas.blit(self.fig.bbox)
+        except tk.TclError:
+            pass
+
+    def _on_draw(self, event):
+        """完整重绘后缓存背景，并在其上绘制全部曲线"""
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for trace in self.traces.values():
+            trace['ax'].draw_artist(trace['line'])
+
+    def _adjust_axes(self):
+        """
+        调整坐标轴范围：X轴在数据到达右边界时翻动，Y轴在数据超出时按窗口统计重算
+
+        Returns:
+            bool: 坐标轴范围是否改变
+        """
+        latest = [trace['stats'].times[-1] for trace in self.traces.values() if len(trace['stats'])]
+        if not latest:
+            return False
+
+        current_time = max(latest)
+        x_min, x_max = self.axes[0].get_xlim()
+        changed = self.axes_dirty
+
+        # 共享X轴：数据到达右边界时视图向前翻动1/4窗口
+        if changed or current_time > x_max:
+            window_start = max(0, current_time - self.window_size * 0.75)
+            margin = self.window_size * 0.05
+            for ax in self.axes:
+                ax.set_xlim(window_start - margin, window_start + self.window_size + margin)
+            changed = True
+
+        # Y轴：使用滑动窗口统计的最小值/最大值（O(1)）
+        if changed or self.out_of_range:
+            for ax in self.axes:
+                ranges = [(trace['stats'].min, trace['stats'].max) for trace in self.traces.values()
+                          if trace['ax'] is ax and len(trace['stats'])]
+                if not ranges:
+                    continue
+                y_min = min(low for low, _ in ranges)
+                y_max = max(high for _, high in ranges)
+
+                # 如果所有值相同，设置一个范围
+                if y_max - y_min < 0.001:
+                    y_min -= 0.5
+                    y_max += 0.5
+                else:
+                    # 添加10%的边距
+                    margin = (y_max - y_min) * 0.1
+                    y_min -= margin
+                    y_max += margin
+                ax.set_ylim(y_min, y_max)
+            changed = True
+
+        self.axes_dirty = False
+        self.out_of_range = False
+        return changed
+
+    def toggle_pause(self):
+        """切换暂停状态"""
+        self.is_paused = not self.is_paused
+        self.pause_button.config(text="继续" if self.is_paused else "暂停")
+
+    def clear_data(self):
+        """清除所有曲线的数据"""
+        for trace in self.traces.values():
+            trace['stats'].clear()
+            trace['line'].set_data([], [])
+        self.start_time = None
+        for ax in self.axes:
+            ax.set_xlim(0, self.window_size)
+            ax.set_ylim(0, 1)
+        self.axes_dirty = True
+        self.canvas.draw()
+
+    def is_open(self):
+        """检查窗口是否打开"""
+        try:
+            return self.window.winfo_exists()
+        except:
+            return False
+
+    def close(self):
+        """关闭窗口（关闭按钮和窗口标题栏共用），有回调时交给回调处理"""
+        if self.on_close:
+            self.on_close()
+        else:
+            self.destroy()
+
+    def destroy(self):
+        """销毁窗口"""
+        try:
+            self.window.destroy()
+        except:
+            pass
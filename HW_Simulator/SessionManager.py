@@ -0,0 +1,597 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime
+from AsyncTCPMessageHandler import SharedEventLoop
+from Scheduler import PeriodicScheduler
+from SimulatorMessageHandler import AsyncCtrlMessageHandler, AsyncStatusMessageHandler
+from DataRecorder import RecorderWriter, VariableRecorder
+
+
+class TargetSession:
+    """
+    单个目标机会话 - 控制链路(9001)+状态链路(9000)
+
+    负责心跳、变量采集、参数下发，并保存该目标机的最新变量值和记录器。
+    所有收发都运行在共享事件循环中，心跳、轮询等周期任务由调度服务按无漂移的
+    固定周期执行，不为会话创建线程。
+
+    变量采集有两种方式：轮询（每query_interval发送一次QueryVars）和订阅
+    （发送一次Subscribe，目标机按确认的频率持续推送）。订阅请求发出后先照常
+    轮询，收到Subscribe_ack确认后才停止轮询，目标机不支持订阅时一直使用轮询。
+    """
+
+    # 订阅推送的接收速率检查
+    STREAM_CHECK_INTERVAL = 1.0  # 检查间隔（秒）
+    STREAM_LAG_RATIO = 0.8  # 实际接收速率低于确认频率的此比例时降低推送频率
+    STREAM_RECOVER_CHECKS = 5  # 连续多少次检查正常后尝试提高推送频率
+    MIN_STREAM_RATE = 1.0  # 降低推送频率的下限（Hz）
+
+    def __init__(self, host, watch_variables, event_loop,
+                 ctrl_port=9001, status_port=9000, framing="json", status_format="json",
+                 heartbeat_interval=5.0, heartbeat_timeout=20.0, query_interval=1.0,
+                 acquisition="poll", stream_rate=10.0, subscribe_timeout=2.0,
+                 message_callback=None, variable_callback=None,
+                 status_callback=None, log_callback=None, recorder=None, scheduler=None):
+        """
+        初始化目标机会话
+
+        Args:
+            host: 目标机地址
+            watch_variables: 监视变量列表
+            event_loop: 共享事件循环（SharedEventLoop）
+            ctrl_port: 控制链路端口
+            status_port: 状态链路端口
+            framing: 分帧方式
+            status_format: 状态链路变量格式，"json"或"binary"（二进制变量帧，需要length分帧，
+                目标机不支持时自动回退到JSON）
+            heartbeat_interval: 心跳发送间隔（秒）
+            heartbeat_timeout: 心跳超时时间（秒）
+            query_interval: 变量查询间隔（秒），可以小于0.1秒
+            acquisition: 变量采集方式，"poll"轮询或"stream"订阅推送（目标机不支持时回退到轮询）
+            stream_rate: 订阅推送的期望频率（Hz），目标机可能按更低的频率确认
+            subscribe_timeout: 等待订阅确认的时间（秒），超时后继续轮询
+            message_callback: 控制链路消息回调，参数为消息字符串
+            variable_callback: 变量数据回调，参数为变量数据字典
+            status_callback: 在线状态变化回调，参数为(会话, 是否在线)
+            log_callback: 日志回调，参数为日志字符串
+            recorder: 变量记录器（VariableRecorder），None表示不记录
+            scheduler: 周期任务调度服务（PeriodicScheduler），None表示在event_loop上创建
+        """
+        self.host = host
+        self.watch_variables = watch_variables
+        self.event_loop = event_loop
+        self.scheduler = scheduler or PeriodicScheduler(event_loop)
+
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.query_interval = query_interval
+        self.status_format = status_format
+        self.acquisition = acquisition
+        self.stream_rate = stream_rate
+        self.subscribe_timeout = subscribe_timeout
+
+        self.message_callback = message_callback
+        self.variable_callback = variable_callback
+        self.status_callback = status_callback
+        self.log_callback = log_callback
+        self.recorder = recorder
+
+        # 链路处理器（共享事件循环）
+        self.ctrl_handler = AsyncCtrlMessageHandler(
+            host, ctrl_port, message_callback=self._on_ctrl_message, framing=framing)
+        self.status_handler = AsyncStatusMessageHandler(
+            host, status_port, variable_callback=self._on_variable_data, framing=framing,
+            ack_callback=self._on_status_ack)
+        self.ctrl_handler.event_loop = event_loop
+        self.status_handler.event_loop = event_loop
+
+        # 会话状态
+        self.ctrl_ok = False
+        self.status_ok = False
+        self.online = False
+        self.last_heartbeat_time = None
+        self.variables = {}  # 变量名 -> 最新值
+        self.last_sample_time = None
+        self.sample_count = 0
+
+        # 订阅状态（只在事件循环线程中访问）
+        self.streaming = False  # 是否处于订阅采集方式（等待确认或推送中）
+        self.granted_rate = None  # 目标机确认的推送频率，None表示未在推送
+        self.requested_rate = None  # 最近一次请求的推送频率
+        self.subscribe_pending = False  # 是否有尚未确认的订阅请求
+        self.stream_check = None  # 上次速率检查的(时间, 已接收数量)
+        self.stream_good_checks = 0
+
+        # 周期任务和定时句柄（只在事件循环线程中访问）
+        self.heartbeat_job = None
+        self.query_job = None
+        self.stream_check_job = None
+        self.subscribe_handle = None
+
+        self.logger = logging.getLogger(f"Session_{host}")
+
+    async def open_async(self):
+        """
+        并发连接控制链路和状态链路
+
+        Returns:
+            tuple: (控制链路是否成功, 状态链路是否成功)
+        """
+        self.ctrl_ok, self.status_ok = await asyncio.gather(
+            self.ctrl_handler.start_async(),
+            self.status_handler.start_async()
+        )
+
+        if self.ctrl_ok and self.status_ok:
+            self.last_heartbeat_time = time.time()
+            self.online = True
+            if self.status_format == "binary":
+                names = [var.get("variable", f"var{i}") for i, var in enumerate(self.watch_variables, 1)]
+                self.status_handler.request_binary_schema(names)
+            if self.recorder:
+                self.recorder.start()
+        else:
+            self.close()
+
+        return self.ctrl_ok, self.status_ok
+
+    def close(self):
+        """关闭会话：停止定时任务、断开链路、停止记录器"""
+        self.stop_heartbeat()
+        self.stop_acquisition()
+        self.ctrl_handler.stop()
+        self.status_handler.stop()
+        self.online = False
+        if self.recorder:
+            self.recorder.stop()
+
+    def is_connected(self):
+        """两条链路是否都处于连接状态"""
+        return self.ctrl_handler.is_connected() and self.status_handler.is_connected()
+
+    def start_heartbeat(self):
+        """启动心跳（立即发送第一次心跳，并开始心跳超时检查）"""
+        self.event_loop.call_soon(self._start_heartbeat)
+
+    def stop_heartbeat(self):
+        """停止心跳"""
+        self.event_loop.call_soon(self._cancel_handle, 'heartbeat_job')
+
+    def start_polling(self, query_interval=None):
+        """
+        启动变量轮询（立即发送第一次查询）
+
+        Args:
+            query_interval: 查询间隔（秒），None表示使用当前设置
+        """
+        if query_interval is not None:
+            self.query_interval = query_interval
+        self.event_loop.call_soon(self._start_polling)
+
+    def stop_polling(self):
+        """停止变量轮询"""
+        self.event_loop.call_soon(self._cancel_handle, 'query_job')
+
+    def start_streaming(self, stream_rate=None):
+        """
+        订阅变量推送（收到确认前继续轮询，目标机不支持时一直轮询）
+
+        Args:
+            stream_rate: 期望推送频率（Hz），None表示使用当前设置
+        """
+        if stream_rate is not None:
+            self.stream_rate = stream_rate
+        self.event_loop.call_soon(self._start_streaming)
+
+    def stop_streaming(self):
+        """取消订阅"""
+        self.event_loop.call_soon(self._stop_streaming)
+
+    def start_acquisition(self, query_interval=None, stream_rate=None):
+        """
+        按采集方式启动变量采集（订阅或轮询）
+
+        Args:
+            query_interval: 查询间隔（秒），None表示使用当前设置
+            stream_rate: 期望推送频率（Hz），None表示使用当前设置
+        """
+        if self.acquisition == "stream":
+            if query_interval is not None:
+                self.query_interval = query_interval
+            self.start_streaming(stream_rate)
+        else:
+            self.start_polling(query_interval)
+
+    def stop_acquisition(self):
+        """停止变量采集（订阅和轮询）"""
+        self.stop_streaming()
+        self.stop_polling()
+
+    def send_heartbeat(self):
+        """发送心跳消息"""
+        json_str = json.dumps({"cmd": "Heart"})
+        if self.ctrl_handler.send_message(json_str):
+            self._log(f"发送心跳: {json_str}")
+            return True
+        self._log("心跳发送失败")
+        return False
+
+    def send_query(self):
+        """发送变量查询消息"""
+        json_str = json.dumps({"cmd": "QueryVars", "count": len(self.watch_variables)})
+        if self.status_handler.send_message(json_str):
+            self.logger.debug(f"发送变量查询: {json_str}")
+            return True
+        self._log("变量查询发送失败")
+        return False
+
+    def send_parameters(self, params):
+        """
+        下发参数
+
+        Args:
+            params: 参数名到参数值的字典
+
+        Returns:
+            bool: 是否已加入发送队列
+        """
+        json_str = json.dumps({"cmd": "SetParams", "count": len(params), "params": params},
+                              ensure_ascii=False)
+        self._log(f"发送参数: {json_str}")
+        return self.ctrl_handler.send_message(json_str)
+
+    def _start_heartbeat(self):
+        self._cancel_handle('heartbeat_job')
+        self.heartbeat_job = self.scheduler.schedule(
+            self.heartbeat_interval, self._heartbeat_tick, name=f"heartbeat_{self.host}")
+
+    def _heartbeat_tick(self):
+        """心跳周期任务：检查超时并发送心跳"""
+        if not self.is_connected():
+            self._cancel_handle('heartbeat_job')
+            self._set_online(False)
+            return
+
+        if self.last_heartbeat_time is None or \
+                time.time() - self.last_heartbeat_time > self.heartbeat_timeout:
+            self._log("心跳超时，连接已断开")
+            self._cancel_handle('heartbeat_job')
+            self._set_online(False)
+            return
+
+        self.send_heartbeat()
+
+    def _start_polling(self):
+        self._cancel_handle('query_job')
+        self.query_job = self.scheduler.schedule(
+            self.query_interval, self._query_tick, name=f"query_{self.host}")
+        self._log(f"开始轮询变量: 间隔{self.query_interval * 1000:g}ms")
+
+    def _query_tick(self):
+        """轮询周期任务：发送变量查询"""
+        if not self.status_handler.is_connected():
+            self._cancel_handle('query_job')
+            return
+
+        try:
+            self.send_query()
+        except Exception as e:
+            self._log(f"查询变量失败: {e}")
+
+    def _start_streaming(self):
+        self.streaming = True
+        self.granted_rate = None
+        self.stream_good_checks = 0
+        self._start_polling()
+        self._send_subscribe(self.stream_rate)
+
+    def _stop_streaming(self):
+        if self.streaming and self.status_handler.is_connected():
+            self.status_handler.send_message(json.dumps({"cmd": "Unsubscribe"}))
+        self.streaming = False
+        self.granted_rate = None
+        self.subscribe_pending = False
+        self._cancel_handle('subscribe_handle')
+        self._cancel_handle('stream_check_job')
+
+    def _send_subscribe(self, rate):
+        """发送订阅请求（也用于修改推送频率）"""
+        names = [var.get("variable", f"var{i}") for i, var in enumerate(self.watch_variables, 1)]
+        json_str = json.dumps({"cmd": "Subscribe", "vars": names, "rate": rate}, ensure_ascii=False)
+        if not self.status_handler.send_message(json_str):
+            self._log("订阅请求发送失败，使用轮询")
+            return
+
+        self.requested_rate = rate
+        self.subscribe_pending = True
+        self._log(f"发送订阅请求: {len(names)}个变量, {rate:g}Hz")
+        self._cancel_handle('subscribe_handle')
+        self.subscribe_handle = self.event_loop.loop.call_later(
+            self.subscribe_timeout, self._on_subscribe_timeout)
+
+    def _on_subscribe_timeout(self):
+        self.subscribe_handle = None
+        if self.streaming and self.granted_rate is None:
+            self._log("目标机未确认订阅请求，继续轮询")
+
+    def _on_status_ack(self, data):
+        """状态链路命令应答（在事件循环线程中调用）"""
+        if data.get('cmd') != 'Subscribe_ack' or not self.streaming:
+            return
+
+        self._cancel_handle('subscribe_handle')
+        self.subscribe_pending = False
+        if data.get('ack') != 'OK':
+            self._log(f"目标机不支持订阅（{data.get('ack')}），继续轮询")
+            self.streaming = False
+            if self.granted_rate is not None:
+                self.granted_rate = None
+                self._cancel_handle('stream_check_job')
+                self._start_polling()
+            return
+
+        try:
+            rate = float(data.get('rate', self.requested_rate))
+        except (TypeError, ValueError):
+            rate = self.requested_rate
+        if self.granted_rate is None:
+            self._cancel_handle('query_job')
+        self.granted_rate = rate
+        self._log(f"订阅已确认: {rate:g}Hz")
+
+        self.stream_check = (time.time(), self.sample_count)
+        self._cancel_handle('stream_check_job')
+        self.stream_check_job = self.scheduler.schedule(
+            self.STREAM_CHECK_INTERVAL, self._stream_check_tick,
+            delay=self.STREAM_CHECK_INTERVAL, name=f"stream_check_{self.host}")
+
+    def _stream_check_tick(self):
+        """
+        检查推送的实际接收速率并协商推送频率
+
+        实际接收速率明显低于确认频率，说明目标机因发送缓冲区积压在丢弃采样点
+        （客户端或网络跟不上），按实际速率重新订阅；连续正常一段时间后再逐步
+        提高到期望频率。
+        """
+        if not self.streaming or self.granted_rate is None or not self.status_handler.is_connected():
+            self._cancel_handle('stream_check_job')
+            return
+
+        now = time.time()
+        last_time, last_count = self.stream_check
+        received_rate = (self.sample_count - last_count) / max(now - last_time, 1e-6)
+        self.stream_check = (now, self.sample_count)
+
+        if self.subscribe_pending:
+            pass  # 上一次频率修改尚未确认（应答可能排在积压的数据之后）
+        elif received_rate < self.granted_rate * self.STREAM_LAG_RATIO:
+            self.stream_good_checks = 0
+            new_rate = max(self.MIN_STREAM_RATE, received_rate * 0.9)
+            if new_rate < self.granted_rate:
+                self._log(f"接收速率{received_rate:.1f}Hz低于推送频率{self.granted_rate:g}Hz，"
+                          f"降低到{new_rate:.1f}Hz")
+                self._send_subscribe(round(new_rate, 1))
+        elif self.granted_rate < self.stream_rate:
+            self.stream_good_checks += 1
+            if self.stream_good_checks >= self.STREAM_RECOVER_CHECKS:
+                self.stream_good_checks = 0
+                self._send_subscribe(min(self.stream_rate, self.granted_rate * 2))
+
+    def _cancel_handle(self, attr):
+        handle = getattr(self, attr)
+        if handle is not None:
+            handle.cancel()
+            setattr(self, attr, None)
+
+    def _set_online(self, online):
+        if self.online == online:
+            return
+        self.online = online
+        if self.status_callback:
+            self.status_callback(self, online)
+
+    def _on_ctrl_message(self, message):
+        """控制链路消息：更新心跳时间后转交回调"""
+        if isinstance(message, str):
+            try:
+                data = json.loads(message)
+                if isinstance(data, dict) and data.get('cmd') == 'Heart_ack':
+                    self.last_heartbeat_time = time.time()
+                    self._set_online(True)
+            except ValueError:
+                pass
+
+        if self.message_callback:
+            self.message_callback(message)
+
+    def _on_variable_data(self, data):
+        """状态链路变量数据：更新变量状态、记录后转交回调"""
+        vars_dict = data.get('vars') if isinstance(data, dict) else None
+        if vars_dict:
+            self.variables.update(vars_dict)
+            self.last_sample_time = time.time()
+            self.sample_count += 1
+
+            if self.recorder:
+                timestamp_ms = data.get('time')
+                try:
+                    time_str = datetime.fromtimestamp(timestamp_ms / 1000.0).strftime("%Y-%m-%d %H:%M:%S")
+                except (TypeError, ValueError, OSError):
+                    time_str = None
+                self.recorder.record(vars_dict, time_str)
+
+        if self.variable_callback:
+            self.variable_callback(data)
+
+    def _log(self, message):
+        self.logger.info(message)
+        if self.log_callback:
+            self.log_callback(message)
+
+
+class SessionManager:
+    """
+    多目标机会话管理器 - 在一个进程中同时驱动多个目标机
+
+    所有会话共享一个asyncio事件循环线程，变量记录共享一个写入线程，
+    目标机数量增加时线程数量保持不变。
+    """
+
+    def __init__(self, event_loop=None, record_dir=None):
+        """
+        初始化会话管理器
+
+        Args:
+            event_loop: 共享事件循环，None表示使用进程内默认的共享事件循环
+            record_dir: 变量记录目录，None表示会话默认不记录
+        """
+        self.event_loop = event_loop or SharedEventLoop.get()
+        self.scheduler = PeriodicScheduler(self.event_loop)  # 所有会话共用的周期任务调度服务
+        self.record_dir = record_dir
+        self.sessions = {}  # 目标机地址 -> TargetSession
+        self.recorder_writer = None
+        self.logger = logging.getLogger("SessionManager")
+
+    def create_session(self, host, watch_variables, record=None, **kwargs):
+        """
+        创建会话（不连接）
+
+        Args:
+            host: 目标机地址
+            watch_variables: 监视变量列表
+            record: 是否记录变量数据，None表示设置了record_dir时记录
+            **kwargs: 传给TargetSession的其他参数
+
+        Returns:
+            TargetSession: 会话对象
+        """
+        if host in self.sessions:
+            self.close_session(host)
+
+        if record is None:
+            record = self.record_dir is not None
+
+        if record and 'recorder' not in kwargs:
+            kwargs['recorder'] = self._create_recorder(host, watch_variables)
+
+        kwargs.setdefault('scheduler', self.scheduler)
+        session = TargetSession(host, watch_variables, self.event_loop, **kwargs)
+        self.sessions[host] = session
+        return session
+
+    def open_session(self, host, watch_variables, timeout=10.0, **kwargs):
+        """
+        创建并连接一个会话（阻塞直到连接完成，不能在事件循环线程中调用）
+
+        Returns:
+            TargetSession: 会话对象，连接结果见ctrl_ok/status_ok
+        """
+        session = self.create_session(host, watch_variables, **kwargs)
+        try:
+            self.event_loop.run_coroutine(session.open_async(), timeout)
+        except TimeoutError:
+            self.logger.error(f"连接目标机 {host} 超时（{timeout}秒）")
+        except Exception as e:
+            self.logger.error(f"连接目标机 {host} 失败: {e}")
+
+        if not (session.ctrl_ok and session.status_ok):
+            self._discard_session(session)
+        return session
+
+    def open_sessions(self, hosts, watch_variables, timeout=30.0, **kwargs):
+        """
+        并发创建并连接多个会话
+
+        Args:
+            hosts: 目标机地址列表
+            watch_variables: 监视变量列表（所有目标机相同）
+            timeout: 全部连接的最长等待时间（秒）
+
+        Returns:
+            dict: 目标机地址 -> 是否连接成功
+        """
+        sessions = [self.create_session(host, watch_variables, **kwargs) for host in hosts]
+
+        async def open_all():
+            return await asyncio.gather(*(session.open_async() for session in sessions))
+
+        try:
+            self.event_loop.run_coroutine(open_all(), timeout)
+        except TimeoutError:
+            self.logger.error(f"连接目标机超时（{timeout}秒）")
+        except Exception as e:
+            self.logger.error(f"连接目标机失败: {e}")
+
+        status = {}
+        for session in sessions:
+            status[session.host] = session.ctrl_ok and session.status_ok
+            if not status[session.host]:
+                self._discard_session(session)
+        return status
+
+    def close_session(self, host):
+        """关闭并移除一个会话"""
+        session = self.sessions.pop(host, None)
+        if session:
+            session.close()
+
+    def _discard_session(self, session):
+        """移除并关闭连接失败（或超时）的会话，释放其周期任务、链路和记录器"""
+        if self.sessions.get(session.host) is session:
+            del self.sessions[session.host]
+        session.close()
+
+    def close_all(self):
+        """关闭所有会话"""
+        for host in list(self.sessions.keys()):
+            self.close_session(host)
+        if self.recorder_writer:
+            self.recorder_writer.stop()
+            self.recorder_writer = None
+
+    def start_all(self, heartbeat=True, polling=True, query_interval=None, stream_rate=None):
+        """启动所有会话的心跳和变量采集（按各会话的采集方式轮询或订阅）"""
+        for session in self.sessions.values():
+            if heartbeat:
+                session.start_heartbeat()
+            if polling:
+                session.start_acquisition(query_interval, stream_rate)
+
+    def stop_all(self):
+        """停止所有会话的心跳和变量采集"""
+        for session in self.sessions.values():
+            session.stop_heartbeat()
+            session.stop_acquisition()
+
+    def get_session(self, host):
+        """获取会话"""
+        return self.sessions.get(host)
+
+    def snapshot(self):
+        """
+        获取所有目标机的状态快照
+
+        Returns:
+            dict: 目标机地址 -> {'online', 'samples', 'vars'}
+        """
+        return {
+            host: {
+                'online': session.online,
+                'samples': session.sample_count,
+                'vars': dict(session.variables),
+            }
+            for host, session in self.sessions.items()
+        }
+
+    def _create_recorder(self, host, watch_variables):
+        """为目标机创建变量记录器（所有目标机共享一个写入线程）"""
+        record_dir = self.record_dir or "."
+        os.makedirs(record_dir, exist_ok=True)
+        if self.recorder_writer is None:
+            self.recorder_writer = RecorderWriter("SessionRecorderWriter")
+        journal_file = os.path.join(record_dir, f"{host.replace(':', '_')}_观察变量.csv")
+        return VariableRecorder(journal_file, watch_variables,
+                                name=f"VariableRecorder_{host}", writer=self.recorder_writer)
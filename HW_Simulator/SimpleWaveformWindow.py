@@ -1,6 +1,6 @@
 import tkinter as tk
 import time
-from collections import deque
+from WindowStats import WindowStats
 
 
 class SimpleWaveformWindow:
@@ -21,9 +21,10 @@ class SimpleWaveformWindow:
         self.variable_name = variable_name
         self.max_points = max_points
 
-        # 数据存储
-        self.timestamps = deque(maxlen=max_points)
-        self.values = deque(maxlen=max_points)
+        # 数据存储：窗口内的数据及其统计（最小/最大值为窗口内的值）
+        self.window_stats = WindowStats(max_points=max_points)
+        self.timestamps = self.window_stats.times
+        self.values = self.window_stats.values
         self.start_time = time.time()
 
         # 标题
@@ -100,16 +101,13 @@ class SimpleWaveformWindow:
             if timestamp is None:
                 timestamp = time.time() - self.start_time
 
-            # 添加数据
-            self.timestamps.append(timestamp)
-            self.values.append(float_value)
+            # 添加数据（同时更新窗口统计）
+            self.window_stats.append(timestamp, float_value)
 
             # 更新统计信息
             self.last_value = float_value
-            if self.max_value is None or float_value > self.max_value:
-                self.max_value = float_value
-            if self.min_value is None or float_value < self.min_value:
-                self.min_value = float_value
+            self.max_value = self.window_stats.max
+            self.min_value = self.window_stats.min
 
             # 更新图形
             self._draw_waveform()
@@ -129,11 +127,11 @@ class SimpleWaveformWindow:
                                     text="等待数据...", font=("Arial", 12))
             return
 
-        # 计算数据范围
-        time_min = min(self.timestamps)
-        time_max = max(self.timestamps)
-        value_min = min(self.values)
-        value_max = max(self.values)
+        # 计算数据范围（时间按顺序追加，首尾即范围；数值范围来自窗口统计）
+        time_min = self.timestamps[0]
+        time_max = self.timestamps[-1]
+        value_min = self.window_stats.min
+        value_max = self.window_stats.max
 
         # 防止除零
         if time_max - time_min == 0:
@@ -198,8 +196,7 @@ class SimpleWaveformWindow:
 
     def clear_data(self):
         """清除数据"""
-        self.timestamps.clear()
-        self.values.clear()
+        self.window_stats.clear()
         self.max_value = None
         self.min_value = None
         self._draw_waveform()
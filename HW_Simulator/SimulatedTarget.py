@@ -0,0 +1,390 @@
+import json
+import math
+import time
+import asyncio
+import argparse
+import logging
+import threading
+from datetime import datetime
+from MessageFramer import create_framer, FramingError
+from StatusCodec import BinaryVarsCodec
+
+
+class SimulatedTarget:
+    """
+    本地模拟目标机 - 与真实目标机使用相同协议，用于协议联调和性能测试
+
+    控制链路: Heart -> Heart_ack, SetParams -> SetParams_ack
+    状态链路: QueryVars -> QueryVars_ack（包含vars和time）
+              Schema -> Schema_ack，之后QueryVars_ack改为二进制变量帧（仅length分帧）
+              Subscribe -> Subscribe_ack，之后按确认的频率持续推送QueryVars_ack，Unsubscribe停止推送
+    """
+
+    def __init__(self, host="127.0.0.1", ctrl_port=9001, status_port=9000,
+                 variables=None, var_count=3, sample_rate=1000.0, payload_size=0,
+                 framing="json", max_stream_rate=1000.0, stream_high_water=256 * 1024):
+        """
+        初始化模拟目标机
+
+        Args:
+            host: 监听地址
+            ctrl_port: 控制链路端口，0表示自动分配
+            status_port: 状态链路端口，0表示自动分配
+            variables: 变量列表（watch_variables.json格式），None表示自动生成var1..varN
+            var_count: 自动生成的变量数量
+            sample_rate: 模型采样率（Hz），变量值按此频率更新
+            payload_size: 每条变量应答附加的填充字节数，用于模拟大报文
+            framing: 分帧方式，与客户端保持一致
+            max_stream_rate: 订阅推送的最高频率（Hz），请求频率超过时按此频率确认
+            stream_high_water: 发送缓冲区积压超过此字节数时丢弃推送的采样点（客户端跟不上）
+        """
+        self.host = host
+        self.ctrl_port = ctrl_port
+        self.status_port = status_port
+        self.sample_rate = sample_rate
+        self.payload_size = payload_size
+        self.framing = framing
+        self.max_stream_rate = max_stream_rate
+        self.stream_high_water = stream_high_water
+
+        if variables is None:
+            variables = [{"variable": f"var{i}", "type": "float"} for i in range(1, var_count + 1)]
+        self.variables = variables
+        self.var_names = [var.get("variable", f"var{i}") for i, var in enumerate(variables, 1)]
+        self.var_is_int = [var.get("type", "float") == "int" for var in variables]
+        self.padding = "x" * payload_size
+
+        # 运行状态
+        self.params = {}
+        self.start_time = None
+        self.loop = None
+        self.servers = []
+        self.thread = None
+        self.ready = threading.Event()
+
+        # 统计信息
+        self.stats = {
+            'connections': 0,
+            'heartbeats': 0,
+            'queries': 0,
+            'set_params': 0,
+            'bytes_sent': 0,
+            'subscriptions': 0,
+            'stream_samples': 0,
+            'stream_dropped': 0,
+        }
+
+        self.logger = logging.getLogger("SimulatedTarget")
+
+    def sample(self):
+        """
+        计算当前模型步的变量值
+
+        Returns:
+            tuple: (变量字典, 毫秒时间戳)
+        """
+        elapsed = time.time() - self.start_time
+        step = math.floor(elapsed * self.sample_rate) if self.sample_rate > 0 else 0
+        t = step / self.sample_rate if self.sample_rate > 0 else elapsed
+
+        values = {}
+        for i, name in enumerate(self.var_names):
+            value = (i + 1) * 10.0 * math.sin(2 * math.pi * (0.1 + 0.05 * i) * t) + 100.0 * i
+            values[name] = int(value) if self.var_is_int[i] else round(value, 3)
+
+        return values, int((self.start_time + t) * 1000)
+
+    def build_vars_ack(self, names=None):
+        """
+        构建变量查询应答
+
+        Args:
+            names: 应答包含的变量名列表，None表示全部变量
+        """
+        values, timestamp_ms = self.sample()
+        if names is not None:
+            values = {name: values[name] for name in names if name in values}
+        message = {"cmd": "QueryVars_ack", "ack": "OK", "vars": values, "time": timestamp_ms}
+        if self.padding:
+            message["pad"] = self.padding
+        return message
+
+    def binary_codec(self, names=None, schema_id=1):
+        """
+        按变量名顺序创建二进制变量帧编解码器
+
+        Args:
+            names: 变量名列表（不存在的变量名被忽略），None表示全部变量
+            schema_id: 模式编号
+        """
+        types = dict(zip(self.var_names, ('q' if is_int else 'd' for is_int in self.var_is_int)))
+        names = [name for name in (self.var_names if names is None else names) if name in types]
+        return BinaryVarsCodec(names, ''.join(types[name] for name in names), schema_id)
+
+    def _build_schema_ack(self, request, state):
+        """
+        处理Schema握手：按请求的变量顺序建立二进制编解码器
+
+        二进制帧中可能出现任意字节，只有length分帧时才接受；
+        请求中不存在的变量名被忽略，实际使用的变量和类型在应答中返回。
+        """
+        if request.get('format') != 'binary' or self.framing != 'length':
+            state.pop('codec', None)
+            return {"cmd": "Schema_ack", "ack": "UNSUPPORTED", "format": "json"}
+
+        schema_id = state['codec'].schema_id + 1 if 'codec' in state else 1
+        codec = self.binary_codec(request.get('vars', []), schema_id)
+        state['codec'] = codec
+        names = codec.names
+        self.logger.info(f"状态链路切换为二进制变量帧: {len(names)}个变量, 每帧{codec.frame_size}字节")
+        return codec.schema_ack()
+
+    def _build_sample(self, state):
+        """按连接状态构建一条变量数据（二进制帧或JSON应答）"""
+        codec = state.get('codec')
+        if codec is not None:
+            values, timestamp_ms = self.sample()
+            return codec.encode(values, timestamp_ms)
+        return self.build_vars_ack(state.get('stream_vars'))
+
+    def _subscribe(self, request, state):
+        """
+        处理订阅请求：确认推送频率并（重新）启动推送任务
+
+        请求频率超过模型采样率或max_stream_rate时按上限确认，客户端以应答中的rate为准。
+        """
+        try:
+            rate = float(request.get('rate', 0))
+        except (TypeError, ValueError):
+            rate = 0.0
+        if not rate > 0:
+            return {"cmd": "Subscribe_ack", "ack": "INVALID", "message": "rate必须大于0"}
+
+        limit = min(self.max_stream_rate, self.sample_rate) if self.sample_rate > 0 else self.max_stream_rate
+        rate = min(rate, limit)
+        names = [name for name in request.get('vars') or self.var_names if name in self.var_names]
+
+        self._cancel_stream(state)
+        state['stream_vars'] = names
+        state['stream_task'] = asyncio.get_running_loop().create_task(self._stream(state, rate))
+        self.stats['subscriptions'] += 1
+        self.logger.info(f"状态链路开始推送: {len(names)}个变量, {rate:g}Hz")
+        return {"cmd": "Subscribe_ack", "ack": "OK", "rate": rate, "vars": names}
+
+    def _cancel_stream(self, state):
+        task = state.pop('stream_task', None)
+        if task is not None:
+            task.cancel()
+        state.pop('stream_vars', None)
+
+    async def _stream(self, state, rate):
+        """
+        按固定频率推送变量数据
+
+        发送时刻按起始时间+N个周期计算，不累积定时误差；落后超过一个周期时
+        跳过积压的时刻，只推送最新值。发送缓冲区积压超过stream_high_water时
+        丢弃本次采样点，不在目标机一侧无限排队。
+        """
+        writer, framer = state['writer'], state['framer']
+        transport = writer.transport
+        loop = asyncio.get_running_loop()  # 命令行运行（asyncio.run）时self.loop未设置
+        period = 1.0 / rate
+        next_time = loop.time()
+
+        while not transport.is_closing():
+            next_time += period
+            delay = next_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif -delay > period:
+                skipped = int(-delay / period)
+                next_time += skipped * period
+                self.stats['stream_dropped'] += skipped
+
+            if transport.get_write_buffer_size() > self.stream_high_water:
+                self.stats['stream_dropped'] += 1
+                continue
+
+            sample = self._build_sample(state)
+            if not isinstance(sample, bytes):
+                sample = json.dumps(sample, ensure_ascii=False)
+            payload = framer.encode(sample)
+            self.stats['stream_samples'] += 1
+            self.stats['bytes_sent'] += len(payload)
+            writer.write(payload)
+
+    async def start_async(self):
+        """启动两个链路的监听"""
+        self.start_time = time.time()
+        ctrl_server = await asyncio.start_server(self._handle_ctrl, self.host, self.ctrl_port)
+        status_server = await asyncio.start_server(self._handle_status, self.host, self.status_port)
+        self.servers = [ctrl_server, status_server]
+
+        # 端口为0时回填实际端口
+        self.ctrl_port = ctrl_server.sockets[0].getsockname()[1]
+        self.status_port = status_server.sockets[0].getsockname()[1]
+        self.logger.info(f"模拟目标机已启动: {self.host} 控制链路{self.ctrl_port} 状态链路{self.status_port}, "
+                         f"{len(self.var_names)}个变量, 采样率{self.sample_rate}Hz")
+
+    async def stop_async(self):
+        """停止监听"""
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        self.servers = []
+
+    def start(self):
+        """在后台线程中启动模拟目标机（阻塞直到开始监听）"""
+        self.thread = threading.Thread(target=self._run, name="SimulatedTarget", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        """停止后台线程中的模拟目标机"""
+        if self.loop and self.thread:
+            asyncio.run_coroutine_threadsafe(self.stop_async(), self.loop).result(5.0)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(5.0)
+            self.thread = None
+
+    def run_forever(self):
+        """在当前线程中运行（命令行方式）"""
+        try:
+            asyncio.run(self._serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.start_async())
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _serve_forever(self):
+        await self.start_async()
+        await asyncio.gather(*(server.serve_forever() for server in self.servers))
+
+    async def _handle_ctrl(self, reader, writer):
+        """控制链路连接"""
+        await self._serve_link(reader, writer, self._on_ctrl_message, "控制链路")
+
+    async def _handle_status(self, reader, writer):
+        """状态链路连接"""
+        await self._serve_link(reader, writer, self._on_status_message, "状态链路")
+
+    async def _serve_link(self, reader, writer, on_message, link_name):
+        """读取、分帧并应答一个链路连接上的消息"""
+        peer = writer.get_extra_info('peername')
+        self.stats['connections'] += 1
+        self.logger.info(f"{link_name}客户端已连接: {peer}")
+
+        framer = create_framer(self.framing)
+        state = {'writer': writer, 'framer': framer}  # 连接状态（二进制编解码器、推送任务等）
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+
+                try:
+                    messages = framer.feed(data)
+                except FramingError as e:
+                    self.logger.error(f"{link_name}分帧失败: {e}")
+                    continue
+
+                replies = []
+                for message in messages:
+                    try:
+                        request = json.loads(message)
+                    except ValueError:
+                        self.logger.warning(f"{link_name}收到无法解析的消息: {message[:100]}")
+                        continue
+                    reply = on_message(request, state)
+                    if isinstance(reply, bytes):
+                        replies.append(framer.encode(reply))
+                    elif reply is not None:
+                        replies.append(framer.encode(json.dumps(reply, ensure_ascii=False)))
+
+                if replies:
+                    payload = b''.join(replies)
+                    self.stats['bytes_sent'] += len(payload)
+                    writer.write(payload)
+                    await writer.drain()
+
+        except ConnectionError:
+            pass
+        finally:
+            self._cancel_stream(state)
+            self.logger.info(f"{link_name}客户端已断开: {peer}")
+            writer.close()
+
+    def _on_ctrl_message(self, request, state):
+        """处理控制链路消息"""
+        cmd = request.get('cmd')
+        if cmd == 'Heart':
+            self.stats['heartbeats'] += 1
+            return {"cmd": "Heart_ack", "act": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+        if cmd == 'SetParams':
+            self.stats['set_params'] += 1
+            params = request.get('params', {})
+            self.params.update(params)
+            self.logger.info(f"收到参数: {params}")
+            return {"cmd": "SetParams_ack", "ack": "OK", "count": len(params)}
+
+        return {"cmd": f"{cmd}_ack", "ack": "UNKNOWN"}
+
+    def _on_status_message(self, request, state):
+        """处理状态链路消息"""
+        cmd = request.get('cmd')
+        if cmd == 'QueryVars':
+            self.stats['queries'] += 1
+            return self._build_sample(state)
+
+        if cmd == 'Schema':
+            return self._build_schema_ack(request, state)
+
+        if cmd == 'Subscribe':
+            return self._subscribe(request, state)
+
+        if cmd == 'Unsubscribe':
+            self._cancel_stream(state)
+            return {"cmd": "Unsubscribe_ack", "ack": "OK"}
+
+        return {"cmd": f"{cmd}_ack", "ack": "UNKNOWN"}
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="硬件仿真系统 - 本地模拟目标机")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--ctrl-port", type=int, default=9001, help="控制链路端口")
+    parser.add_argument("--status-port", type=int, default=9000, help="状态链路端口")
+    parser.add_argument("--watch", default=None, help="监视变量文件（watch_variables.json格式），默认自动生成变量")
+    parser.add_argument("--vars", type=int, default=3, help="自动生成的变量数量")
+    parser.add_argument("--rate", type=float, default=1000.0, help="模型采样率（Hz）")
+    parser.add_argument("--payload-size", type=int, default=0, help="每条变量应答附加的填充字节数")
+    parser.add_argument("--framing", default="json", choices=["json", "newline", "length"], help="分帧方式")
+    parser.add_argument("--max-stream-rate", type=float, default=1000.0, help="订阅推送的最高频率（Hz）")
+    parser.add_argument("--log-level", default="INFO", help="日志级别")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    variables = None
+    if args.watch:
+        with open(args.watch, 'r', encoding='utf-8') as f:
+            variables = json.load(f)
+
+    SimulatedTarget(args.host, args.ctrl_port, args.status_port,
+                    variables=variables, var_count=args.vars, sample_rate=args.rate,
+                    payload_size=args.payload_size, framing=args.framing,
+                    max_stream_rate=args.max_stream_rate).run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,25 @@
 import logging
 import json
 from TCPMessageHandler import TCPMessageHandler
+from AsyncTCPMessageHandler import AsyncTCPMessageHandler
+from StatusCodec import BINARY_MAGIC, BinaryVarsCodec, schema_request
+from VarDecoder import create_decoder, sniff_format
+
+# 视为数值型变量的类型（按精确类型判断，比isinstance更快）
+_NUMBER_TYPES = (int, float, bool)
 
 
 class CtrlMessageHandler(TCPMessageHandler):
     """控制链路消息处理器 - 处理系统控制消息"""
 
-    def __init__(self, host, port=9001, message_callback=None):
-        super().__init__(host, port, "CtrlHandler")
+    def __init__(self, host, port=9001, message_callback=None, framing="json"):
+        super().__init__(host, port, "CtrlHandler", framing)
         self.message_callback = message_callback
 
     def _process_received_data(self, data):
         """处理控制链路接收到的数据 - 系统控制消息"""
         try:
-            message = data.decode('utf-8') if isinstance(data, bytes) else str(data)
+            message = data if isinstance(data, str) else str(data, 'utf-8')
             self.logger.info(f"控制链路收到系统消息: {message}")
 
             # 如果有回调函数，传递系统消息
@@ -77,25 +83,54 @@ class CtrlMessageHandler(TCPMessageHandler):
 class StatusMessageHandler(TCPMessageHandler):
     """状态链路消息处理器 - 专门处理变量数据"""
 
-    def __init__(self, host, port=9000, variable_callback=None):
-        super().__init__(host, port, "StatusHandler")
+    def __init__(self, host, port=9000, variable_callback=None, framing="json", ack_callback=None):
+        super().__init__(host, port, "StatusHandler", framing)
         self.variable_callback = variable_callback
+        self.ack_callback = ack_callback  # 状态链路命令应答（如Subscribe_ack）回调，参数为应答字典
+        self.codec = None  # 二进制变量帧编解码器（Schema握手成功后设置）
+        self.decoders = {}  # 消息首字节 -> 解码器（按连接缓存）
+
+    def request_binary_schema(self, names):
+        """
+        请求使用二进制变量帧（发送Schema握手）
+
+        目标机应答Schema_ack后，后续QueryVars_ack改为二进制帧；
+        目标机不支持或应答失败时继续使用JSON。
+
+        Args:
+            names: 变量名列表
+
+        Returns:
+            bool: 是否已发送握手请求
+        """
+        if self.framing != "length":
+            self.logger.warning("二进制变量帧需要length分帧，继续使用JSON格式")
+            return False
+        return self.send_message(json.dumps(schema_request(names), ensure_ascii=False))
 
     def _process_received_data(self, data):
         """处理状态链路接收到的数据 - 专门处理变量数据"""
         try:
-            message = data.decode('utf-8') if isinstance(data, bytes) else str(data)
-            self.logger.info(f"状态链路收到数据: {message[:100]}...")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"状态链路收到数据: {bytes(data[:100])}...")
+
+            decoder, variable_data = self._decode(data)
+            if variable_data is not None and not decoder.validated:
+                # 命令应答（Schema_ack、Subscribe_ack等）不是变量数据
+                cmd = variable_data.get('cmd')
+                if isinstance(cmd, str) and cmd.endswith('_ack') and cmd != 'QueryVars_ack':
+                    self._handle_command_ack(variable_data)
+                    return
+                if not self._is_variable_data(variable_data):
+                    variable_data = None
 
-            # 解析变量数据
-            variable_data = self._parse_variable_data(message)
             if variable_data:
                 # 通过回调函数传递变量数据
                 if self.variable_callback:
                     self.variable_callback(variable_data)
             else:
                 # 如果不是变量数据，记录到日志
-                self.logger.warning(f"无法解析为变量数据: {message[:50]}...")
+                self.logger.warning(f"无法解析为变量数据: {bytes(data[:50])}...")
 
         except Exception as e:
             self.logger.error(f"处理状态链路数据失败: {e}")
@@ -107,43 +142,99 @@ class StatusMessageHandler(TCPMessageHandler):
                     'source': 'status_link'
                 })
 
+    def _decode(self, data):
+        """
+        按消息首字节选择解码器（每种格式每个连接只判断一次）并解码
+
+        Returns:
+            tuple: (解码器, 解码结果)，无法解码时解码结果为None
+        """
+        if not len(data):
+            return None, None
+
+        cached = self.decoders.get(data[0])
+        if cached is not None:
+            result = cached.decode(data)
+            if result is not None:
+                return cached, result
+
+        # 首次出现或缓存的解码器解析失败时重新判断；格式未变说明只是坏帧，保留缓存
+        name = sniff_format(data)
+        if name is None or (cached is not None and name == cached.name):
+            return cached, None
+        decoder = self._select_decoder(data, name)
+        if decoder is None:
+            return cached, None
+        return decoder, decoder.decode(data)
+
+    def _select_decoder(self, data, name):
+        """
+        按判断出的格式创建解码器并按首字节缓存
+
+        Args:
+            data: 消息数据
+            name: sniff_format判断出的格式名
+
+        Returns:
+            解码器，二进制帧未经握手时返回None
+        """
+        if name == 'binary':
+            if self.codec is None:
+                return None
+            decoder = create_decoder(name, codec=self.codec)
+        else:
+            decoder = create_decoder(name)
+
+        previous = self.decoders.get(data[0])
+        self.decoders[data[0]] = decoder
+        if previous is None or previous.name != name:
+            self.logger.info(f"状态链路数据格式: {name}" +
+                             (f" ({decoder.backend})" if name == 'json' else ""))
+        return decoder
+
+    def _handle_command_ack(self, data):
+        """处理状态链路命令应答：Schema_ack在处理器内处理，其余转交ack_callback"""
+        if data.get('cmd') == 'Schema_ack':
+            self._handle_schema_ack(data)
+        elif self.ack_callback:
+            self.ack_callback(data)
+        else:
+            self.logger.info(f"状态链路收到命令应答: {data}")
+
+    def _handle_schema_ack(self, data):
+        """处理Schema握手应答：成功则切换到二进制变量帧，否则保持JSON"""
+        self.decoders.pop(BINARY_MAGIC, None)
+        if data.get('ack') == 'OK' and data.get('format') == 'binary':
+            self.codec = BinaryVarsCodec.from_schema_ack(data)
+            self.logger.info(f"状态链路切换为二进制变量帧: {len(self.codec.names)}个变量, "
+                             f"每帧{self.codec.frame_size}字节")
+        else:
+            self.codec = None
+            self.logger.warning(f"目标机不支持二进制变量帧，继续使用JSON格式: {data.get('ack')}")
+
+    def stop(self):
+        """停止处理器（Schema握手和数据格式只对当前连接有效）"""
+        super().stop()
+        self.codec = None
+        self.decoders.clear()
+
     def _parse_variable_data(self, message):
         """
         解析变量数据
-        期望的消息格式：JSON或键值对
+        期望的消息格式：JSON、键值对或（握手后的）二进制变量帧
+
+        Args:
+            message: 完整消息（str/bytes）
+
+        Returns:
+            dict: 变量数据，不是变量数据时返回None
         """
+        data = message.encode('utf-8') if isinstance(message, str) else message
         try:
-            # 尝试解析为JSON
-            if message.strip().startswith('{') and message.strip().endswith('}'):
-                data = json.loads(message)
-                if isinstance(data, dict):
-                    # 验证是否为变量数据（包含数值型数据）
-                    if self._is_variable_data(data):
-                        return data
-
-            # 尝试解析为键值对
-            elif '=' in message and ';' in message:
-                data = {}
-                pairs = message.split(';')
-                for pair in pairs:
-                    if '=' in pair and pair.strip():
-                        key_value = pair.split('=', 1)
-                        if len(key_value) == 2:
-                            key, value = key_value
-                            key = key.strip()
-                            value = value.strip()
-                            if key:  # 确保key不为空
-                                # 尝试转换为数值
-                                try:
-                                    if '.' in value:
-                                        value = float(value)
-                                    else:
-                                        value = int(value)
-                                except ValueError:
-                                    pass  # 保持为字符串
-                                data[key] = value
-                # 只有包含有效数据时才返回
-                return data if data and self._is_variable_data(data) else None
+            decoder, result = self._decode(data)
+            if result is not None and not decoder.validated and not self._is_variable_data(result):
+                return None
+            return result
 
         except Exception as e:
             self.logger.debug(f"解析变量数据失败: {e}")
@@ -151,20 +242,22 @@ class StatusMessageHandler(TCPMessageHandler):
         return None
 
     def _is_variable_data(self, data):
-        """判断是否为有效的变量数据"""
+        """判断是否为有效的变量数据（包含数值型数据，如温度、压力、转速等）"""
         if not isinstance(data, dict):
             return False
-
-        # 检查是否包含数值型数据（温度、压力、转速等）
-        numeric_count = 0
-        for value in data.values():
-            if isinstance(value, (int, float)):
-                numeric_count += 1
-
-        # 如果包含数值类型数据，认为是变量数据
-        return numeric_count > 0
+        return any(type(value) in _NUMBER_TYPES for value in data.values())
 
     def _get_timestamp(self):
         """获取时间戳"""
         import time
-        return time.strftime("%H:%M:%S", time.localtime())
\ No newline at end of file
+        return time.strftime("%H:%M:%S", time.localtime())
+
+
+class AsyncCtrlMessageHandler(CtrlMessageHandler, AsyncTCPMessageHandler):
+    """控制链路消息处理器（asyncio版本，共享事件循环线程）"""
+    pass
+
+
+class AsyncStatusMessageHandler(StatusMessageHandler, AsyncTCPMessageHandler):
+    """状态链路消息处理器（asyncio版本，共享事件循环线程）"""
+    pass
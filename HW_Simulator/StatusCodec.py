@@ -0,0 +1,112 @@
+import struct
+
+
+# 二进制变量帧的首字节（JSON消息以'{'开头，可以直接区分）
+BINARY_MAGIC = 0xB5
+
+# 变量类型 -> struct格式字符（网络字节序）
+TYPE_CODES = {"int": 'q', "float": 'd'}
+
+
+class BinaryVarsCodec:
+    """
+    状态链路二进制变量帧编解码
+
+    通过Schema握手一次性约定变量名和顺序，之后每个QueryVars_ack只发送
+    时间戳和按约定顺序打包的数值数组，不再重复发送变量名文本：
+
+        帧头: 魔数(1B) + 模式编号(1B) + 变量数(2B) + 毫秒时间戳(8B)，网络字节序
+        数据: 每个变量一个值，int为8字节有符号整数，float为8字节双精度浮点数
+
+    需要使用length分帧（二进制数据中可能出现任意字节）。
+    """
+
+    HEADER = struct.Struct('!BBHQ')
+
+    def __init__(self, names, types, schema_id=1):
+        """
+        初始化编解码器
+
+        Args:
+            names: 变量名列表（帧中数值的顺序）
+            types: 类型字符串，每个变量一个字符（'q'整数，'d'浮点数）
+            schema_id: 模式编号（0~255），用于识别过期的帧
+        """
+        if len(names) != len(types):
+            raise ValueError(f"变量数与类型数不一致: {len(names)} != {len(types)}")
+        if any(code not in TYPE_CODES.values() for code in types):
+            raise ValueError(f"不支持的变量类型: {types}")
+
+        self.names = list(names)
+        self.types = types
+        self.schema_id = schema_id & 0xFF
+        self.values_struct = struct.Struct('!' + types)
+        self.frame_size = self.HEADER.size + self.values_struct.size
+
+    @classmethod
+    def from_schema_ack(cls, data):
+        """
+        根据Schema_ack消息创建编解码器
+
+        Args:
+            data: Schema_ack消息字典（包含vars、types、schema_id）
+        """
+        return cls(data.get('vars', []), data.get('types', ''), data.get('schema_id', 1))
+
+    def schema_ack(self):
+        """构建Schema_ack消息（目标机端）"""
+        return {"cmd": "Schema_ack", "ack": "OK", "format": "binary",
+                "schema_id": self.schema_id, "vars": self.names, "types": self.types}
+
+    def encode(self, values, time_ms):
+        """
+        编码一帧变量数据（目标机端）
+
+        Args:
+            values: 变量名到数值的字典
+            time_ms: 毫秒时间戳
+
+        Returns:
+            bytes: 二进制帧
+        """
+        packed = []
+        for name, code in zip(self.names, self.types):
+            value = values.get(name, 0)
+            packed.append(int(value) if code == 'q' else float(value))
+        return (self.HEADER.pack(BINARY_MAGIC, self.schema_id, len(self.names), int(time_ms)) +
+                self.values_struct.pack(*packed))
+
+    def decode(self, frame):
+        """
+        解码一帧变量数据
+
+        Args:
+            frame: 二进制帧（bytes/bytearray/memoryview）
+
+        Returns:
+            dict: 与JSON格式相同的QueryVars_ack字典
+        """
+        if len(frame) != self.frame_size:
+            raise ValueError(f"二进制帧长度错误: {len(frame)} != {self.frame_size}")
+
+        magic, schema_id, count, time_ms = self.HEADER.unpack_from(frame, 0)
+        if magic != BINARY_MAGIC or schema_id != self.schema_id or count != len(self.names):
+            raise ValueError(f"二进制帧与模式不匹配: 模式{schema_id} 变量数{count}")
+
+        values = self.values_struct.unpack_from(frame, self.HEADER.size)
+        return {"cmd": "QueryVars_ack", "ack": "OK", "vars": dict(zip(self.names, values)), "time": time_ms}
+
+
+def is_binary_frame(data):
+    """判断一条消息是否为二进制变量帧"""
+    return len(data) > 0 and data[0] == BINARY_MAGIC
+
+
+def schema_request(names):
+    """
+    构建Schema握手请求（客户端）
+
+    Args:
+        names: 需要的变量名列表（变量类型由目标机在应答中给出）
+    """
+    return {"cmd": "Schema", "format": "binary", "vars": list(names)}
@@ -165,6 +165,94 @@ class TCPClient:
 
         return None
 
+    def receive_into(self, buffer: Union[bytearray, memoryview], timeout: float = 0.0) -> int:
+        """
+        从服务器接收数据，直接写入调用方提供的缓冲区（recv_into，不分配新的bytes）
+
+        Args:
+            buffer: 可写缓冲区（如分帧器get_buffer()返回的memoryview）
+            timeout: 接收超时时间，0表示不阻塞立即返回，None表示阻塞直到有数据
+
+        Returns:
+            int: 写入的字节数，没有数据或连接已关闭返回0（可通过is_connected区分）
+        """
+        if not self.is_connected or self.socket is None:
+            self.logger.error("未连接到服务器，请先调用connect()方法")
+            return 0
+
+        try:
+            readable, _, exceptional = select.select([self.socket], [], [self.socket], timeout)
+
+            if exceptional:
+                self.logger.error("socket异常")
+                self._cleanup()
+                return 0
+
+            if not readable:
+                return 0  # 没有数据可读
+
+        except (OSError, ValueError) as e:
+            self.logger.error(f"接收数据过程中发生错误: {e}")
+            self._cleanup()
+            return 0
+
+        return self.receive_into_nowait(buffer)
+
+    def receive_into_nowait(self, buffer: Union[bytearray, memoryview]) -> int:
+        """
+        非阻塞接收数据到调用方提供的缓冲区（由调用方的事件循环确认socket可读后调用）
+
+        Args:
+            buffer: 可写缓冲区
+
+        Returns:
+            int: 写入的字节数，暂无数据或连接已关闭返回0（可通过is_connected区分）
+        """
+        if not self.is_connected or self.socket is None:
+            return 0
+
+        try:
+            nbytes = self.socket.recv_into(buffer)
+            if not nbytes:
+                self.logger.info("连接已关闭")
+                self._cleanup()
+            return nbytes
+
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            return 0
+        except ConnectionResetError:
+            self.logger.error("连接被服务器重置")
+        except OSError as e:
+            self.logger.error(f"接收数据过程中发生错误: {e}")
+
+        self._cleanup()
+        return 0
+
+    def send_nowait(self, data: Union[bytes, bytearray, memoryview]) -> int:
+        """
+        非阻塞发送数据，只发送socket当前能接受的部分
+
+        Args:
+            data: 要发送的数据
+
+        Returns:
+            int: 实际发送的字节数，-1表示连接异常
+        """
+        if not self.is_connected or self.socket is None:
+            return -1
+
+        try:
+            return self.socket.send(data)
+        except (BlockingIOError, InterruptedError):
+            return 0
+        except BrokenPipeError:
+            self.logger.error("连接已断开，无法发送数据")
+        except OSError as e:
+            self.logger.error(f"发送数据过程中发生错误: {e}")
+
+        self._cleanup()
+        return -1
+
     def receive_with_timeout(self, timeout: float = 5.0) -> Optional[bytes]:
         """
         带超时接收数据
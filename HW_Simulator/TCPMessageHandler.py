@@ -1,7 +1,10 @@
 import threading
 import queue
 import time
+import socket
+import selectors
 from TCPClient import TCPClient
+from MessageFramer import create_framer, FramingError
 import logging
 
 
@@ -10,7 +13,7 @@ class TCPMessageHandler:
     TCP消息处理器基类，管理TCP连接的消息队列和线程
     """
 
-    def __init__(self, host, port, name="TCPHandler"):
+    def __init__(self, host, port, name="TCPHandler", framing="json"):
         """
         初始化消息处理器
 
@@ -18,10 +21,15 @@ class TCPMessageHandler:
             host: 目标主机
             port: 目标端口
             name: 处理器名称，用于日志标识
+            framing: 分帧方式，'json'（连续JSON对象）、'newline'（换行分隔）或'length'（长度前缀）
         """
         self.host = host
         self.port = port
         self.name = name
+        self.framing = framing
+
+        # 消息分帧器：接收时重组完整消息，发送时添加分帧信息
+        self.framer = create_framer(framing)
 
         # TCP客户端
         self.tcp_client = None
@@ -35,6 +43,12 @@ class TCPMessageHandler:
         self.worker_thread = None
         self.running = False
 
+        # I/O事件循环：selector等待socket可读/可写，唤醒socket通知有新消息待发送
+        self.selector = None
+        self.wakeup_recv = None
+        self.wakeup_send = None
+        self.send_buffer = bytearray()  # 待发送数据（批量合并后一次发送）
+
         # 配置日志
         logging.basicConfig(level=logging.INFO,
                             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -53,6 +67,14 @@ class TCPMessageHandler:
                 self.logger.error(f"{self.name} 连接失败")
                 return False
 
+            # 创建I/O事件循环
+            self.wakeup_recv, self.wakeup_send = socket.socketpair()
+            self.wakeup_recv.setblocking(False)
+            self.wakeup_send.setblocking(False)
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.tcp_client.socket, selectors.EVENT_READ)
+            self.selector.register(self.wakeup_recv, selectors.EVENT_READ)
+
             self.running = True
 
             # 启动处理线程
@@ -85,12 +107,18 @@ class TCPMessageHandler:
 
         self.running = False
 
+        # 唤醒处理线程，等待其退出事件循环
+        self._wakeup()
+        if self.process_thread and self.process_thread is not threading.current_thread():
+            self.process_thread.join(timeout=1.0)
+
         # 停止TCP客户端
         if self.tcp_client:
             self.tcp_client.disconnect()
             self.tcp_client = None
 
-        # 清空队列
+        # 清空分帧缓冲区和队列
+        self.framer.reset()
         while not self.send_queue.empty():
             try:
                 self.send_queue.get_nowait()
@@ -118,48 +146,129 @@ class TCPMessageHandler:
 
         try:
             self.send_queue.put(message)
+            self._wakeup()
             self.logger.debug(f"{self.name} 消息已加入发送队列")
             return True
         except Exception as e:
             self.logger.error(f"{self.name} 加入发送队列失败: {e}")
             return False
 
+    def _wakeup(self):
+        """唤醒处理线程的事件循环"""
+        wakeup_send = self.wakeup_send
+        if wakeup_send is None:
+            return
+        try:
+            wakeup_send.send(b'\0')
+        except (BlockingIOError, OSError):
+            # 唤醒socket缓冲区已满说明处理线程已有待处理的唤醒
+            pass
+
     def _process_thread_func(self):
-        """处理线程函数：负责数据收发"""
+        """处理线程函数：事件驱动的数据收发，空闲时阻塞在selector上"""
         self.logger.info(f"{self.name} 处理线程启动")
 
         while self.running and self.tcp_client and self.tcp_client.is_connected:
             try:
-                # 1. 检查发送队列并发送数据
-                send_processed = False
-                try:
-                    if not self.send_queue.empty():
-                        message = self.send_queue.get_nowait()
-                        if self.tcp_client.send(message):
-                            self.logger.debug(f"{self.name} 发送消息成功")
-                        else:
-                            self.logger.error(f"{self.name} 发送消息失败")
-                        send_processed = True
-                except queue.Empty:
-                    pass
+                # 1. 阻塞等待socket可读、可写或有新消息待发送
+                for key, mask in self.selector.select(timeout=1.0):
+                    if key.fileobj is self.wakeup_recv:
+                        self._drain_wakeup()
+                        continue
 
-                # 2. 接收数据（不阻塞）
-                data = self.tcp_client.receive(timeout=0.0)  # 不阻塞
-                if data is not None:
-                    self.recv_queue.put(data)
-                    self.logger.debug(f"{self.name} 接收到数据，已加入接收队列")
+                    # 2. 接收数据（直接recv_into到分帧器缓冲区）
+                    if mask & selectors.EVENT_READ:
+                        self._receive_into_framer()
 
-                # 3. 如果没有活动，短暂休眠
-                if not send_processed and data is None:
-                    time.sleep(0.001)  # 1ms休眠
+                # 3. 批量发送队列中的全部消息
+                if self.running and self.tcp_client and self.tcp_client.is_connected:
+                    self._flush_send_queue()
 
             except Exception as e:
                 # self.logger.error(f"{self.name} 处理线程异常: {e}")
                 if self.running:
                     time.sleep(0.1)
 
+        self._close_event_loop()
         self.logger.info(f"{self.name} 处理线程退出")
 
+    def _drain_wakeup(self):
+        """读空唤醒socket"""
+        try:
+            while self.wakeup_recv.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _flush_send_queue(self):
+        """取出发送队列中的全部消息合并到发送缓冲区，尽量一次发送完"""
+        while True:
+            try:
+                message = self.send_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.send_buffer += self.framer.encode(message)
+
+        if self.send_buffer:
+            sent = self.tcp_client.send_nowait(self.send_buffer)
+            if sent < 0:
+                self.logger.error(f"{self.name} 发送消息失败")
+                self.send_buffer.clear()
+                return
+            del self.send_buffer[:sent]
+            if sent:
+                self.logger.debug(f"{self.name} 发送 {sent} 字节")
+
+        # 有未发完的数据时等待socket可写
+        events = selectors.EVENT_READ
+        if self.send_buffer:
+            events |= selectors.EVENT_WRITE
+        key = self.selector.get_key(self.tcp_client.socket)
+        if key.events != events:
+            self.selector.modify(self.tcp_client.socket, events)
+
+    def _close_event_loop(self):
+        """关闭事件循环相关资源"""
+        self.send_buffer.clear()
+        if self.selector:
+            self.selector.close()
+            self.selector = None
+        for sock in (self.wakeup_recv, self.wakeup_send):
+            if sock:
+                try:
+                    sock.close()
+                except:
+                    pass
+        self.wakeup_recv = None
+        self.wakeup_send = None
+
+    def _receive_into_framer(self):
+        """socket数据直接写入分帧器缓冲区尾部，不为每次接收分配bytes"""
+        with self.framer.get_buffer() as buffer:
+            nbytes = self.tcp_client.receive_into_nowait(buffer)
+        if nbytes:
+            self._feed_framer(nbytes)
+
+    def _feed_framer(self, nbytes):
+        """
+        分帧器缓冲区中新写入了nbytes字节，完整消息逐条加入接收队列
+
+        消息需要跨线程交给工作线程处理，因此以bytes副本入队（不使用缓冲区切片）。
+
+        Args:
+            nbytes: recv_into写入的字节数
+        """
+        try:
+            messages = self.framer.commit(nbytes)
+        except FramingError as e:
+            self.logger.error(f"{self.name} 分帧失败，已丢弃缓冲数据: {e}")
+            return
+
+        for message in messages:
+            self.recv_queue.put(message)
+        if messages:
+            self.logger.debug(f"{self.name} 接收到{len(messages)}条消息，已加入接收队列")
+
     def _worker_thread_func(self):
         """工作线程函数：处理接收到的数据"""
         self.logger.info(f"{self.name} 工作线程启动")
@@ -185,10 +294,10 @@ class TCPMessageHandler:
         处理接收到的数据（子类必须重写此方法）
 
         Args:
-            data: 接收到的数据
+            data: 接收到的一条完整消息
         """
         # 基类实现，子类应该重写这个方法
-        self.logger.info(f"{self.name} 收到数据: {data[:100]}...")
+        self.logger.info(f"{self.name} 收到数据: {bytes(data[:100])}...")
 
     def is_connected(self):
         """检查是否连接"""
@@ -0,0 +1,195 @@
+import json
+import struct
+from StatusCodec import is_binary_frame
+
+
+def _available_json_backends():
+    """可用的JSON解析库：名称 -> loads函数（orjson/ujson为可选依赖）"""
+    backends = {}
+    try:
+        import orjson
+        backends['orjson'] = orjson.loads
+    except ImportError:
+        pass
+    try:
+        import ujson
+        backends['ujson'] = ujson.loads
+    except ImportError:
+        pass
+    backends['json'] = json.loads
+    return backends
+
+
+JSON_BACKENDS = _available_json_backends()
+
+# 默认使用最快的可用实现
+DEFAULT_JSON_BACKEND = next(iter(JSON_BACKENDS))
+
+
+class JsonDecoder:
+    """JSON变量数据解码器（优先使用orjson/ujson）"""
+
+    name = 'json'
+    validated = False  # 解码结果需要由调用方判断是否为变量数据（也可能是命令应答）
+
+    def __init__(self, backend=None):
+        """
+        初始化JSON解码器
+
+        Args:
+            backend: JSON解析库名称（'orjson'、'ujson'或'json'），None表示最快的可用实现
+        """
+        self.backend = backend or DEFAULT_JSON_BACKEND
+        if self.backend not in JSON_BACKENDS:
+            raise ValueError(f"JSON解析库不可用: {self.backend}")
+        self.loads = JSON_BACKENDS[self.backend]
+        # orjson可以直接解析memoryview，其他实现需要bytes或str
+        self.accepts_buffer = self.backend == 'orjson'
+
+    def decode(self, data):
+        """
+        解码一条消息
+
+        Args:
+            data: 完整消息（bytes/bytearray/memoryview/str）
+
+        Returns:
+            dict: 解码后的字典，不是JSON对象时返回None
+        """
+        if not self.accepts_buffer and not isinstance(data, (bytes, str)):
+            data = bytes(data)
+        try:
+            result = self.loads(data)
+        except ValueError:
+            return None
+        return result if isinstance(result, dict) else None
+
+
+class KeyValueDecoder:
+    """
+    键值对变量数据解码器 - 格式为 key1=value1;key2=value2;
+
+    解析规则与原来的键值对解析相同：含'.'的值转换为浮点数，否则转换为
+    整数，转换失败保留字符串；先按首字符判断是否可能是数值，文本值不再
+    经过try/except转换。
+    """
+
+    name = 'kv'
+    validated = True
+
+    _NUMBER_START = frozenset('+-.0123456789')
+
+    def decode(self, data):
+        """
+        解码一条消息
+
+        Args:
+            data: 完整消息（bytes/bytearray/memoryview/str）
+
+        Returns:
+            dict: 变量字典，不是键值对消息或没有数值型变量时返回None
+        """
+        text = data if isinstance(data, str) else str(data, 'utf-8')
+        if '=' not in text or ';' not in text:
+            return None
+
+        number_start = self._NUMBER_START
+        result = {}
+        has_number = False
+        for pair in text.split(';'):
+            key, sep, value = pair.partition('=')
+            if not sep:
+                continue
+            key = key.strip()
+            if not key:
+                continue
+            value = value.strip()
+            if value and (value[0] in number_start or value[0].isdigit()):
+                try:
+                    value = float(value) if '.' in value else int(value)
+                    has_number = True
+                except ValueError:
+                    pass  # 保持为字符串
+            result[key] = value
+
+        return result if has_number else None
+
+
+class BinaryDecoder:
+    """二进制变量帧解码器（Schema握手后使用）"""
+
+    name = 'binary'
+    validated = True
+
+    def __init__(self, codec):
+        """
+        初始化二进制解码器
+
+        Args:
+            codec: 握手确定的编解码器（BinaryVarsCodec）
+        """
+        self.codec = codec
+
+    def decode(self, data):
+        """
+        解码一条消息
+
+        Args:
+            data: 完整消息（bytes/bytearray/memoryview）
+
+        Returns:
+            dict: QueryVars_ack字典，帧与握手的模式不匹配时返回None
+        """
+        try:
+            return self.codec.decode(data)
+        except (ValueError, struct.error):
+            return None
+
+
+_WHITESPACE = frozenset(b' \t\r\n')
+
+DECODERS = {
+    'json': JsonDecoder,
+    'kv': KeyValueDecoder,
+    'binary': BinaryDecoder,
+}
+
+
+def create_decoder(name, **kwargs):
+    """
+    根据数据格式创建解码器
+
+    Args:
+        name: 数据格式，'json'、'kv'或'binary'
+
+    Returns:
+        解码器实例
+    """
+    try:
+        return DECODERS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"不支持的数据格式: {name}")
+
+
+def sniff_format(data):
+    """
+    根据消息开头判断数据格式（只检查首字节，不复制消息）
+
+    Args:
+        data: 完整消息（bytes/bytearray/memoryview）
+
+    Returns:
+        str: 'json'、'kv'或'binary'，空消息返回None
+    """
+    if not len(data):
+        return None
+
+    if is_binary_frame(data):
+        return 'binary'
+
+    first = data[0]
+    if first in _WHITESPACE:
+        # 少见的前导空白：只取开头一小段判断
+        head = bytes(data[:64]).lstrip()
+        first = head[0] if head else None
+    return 'json' if first == 0x7B else 'kv'  # '{'
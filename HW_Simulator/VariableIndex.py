@@ -0,0 +1,56 @@
+class VariableIndex:
+    """
+    变量名 -> 槽位索引的哈希表
+
+    由watch_variables.json加载的变量列表构建，收到变量数据时按变量名直接定位
+    表格行、记录列和波形窗口，不再逐个扫描变量列表。变量列表结构变化时调用
+    rebuild()重建。
+    """
+
+    def __init__(self, variables=None, name_key="variable", default_prefix="var"):
+        """
+        初始化变量索引
+
+        Args:
+            variables: 变量列表（watch_variables.json格式）
+            name_key: 变量名字段
+            default_prefix: 缺少变量名时的默认名前缀（与表头默认名保持一致）
+        """
+        self.name_key = name_key
+        self.default_prefix = default_prefix
+        self.slots = {}  # 变量名 -> 槽位
+        self.names = []  # 槽位 -> 变量名
+        self.types = []  # 槽位 -> 变量类型
+        self.rebuild(variables or [])
+
+    def rebuild(self, variables):
+        """
+        按新的变量列表重建索引
+
+        Args:
+            variables: 变量列表
+        """
+        self.slots = {}
+        self.names = []
+        self.types = []
+        for i, var in enumerate(variables, 1):
+            var_name = var.get(self.name_key, f"{self.default_prefix}{i}")
+            self.names.append(var_name)
+            self.types.append(var.get("type", "float"))
+            # 变量名重复时以第一个为准（与原来的线性查找一致）
+            self.slots.setdefault(var_name, i - 1)
+
+    def get(self, var_name, default=None):
+        """变量名对应的槽位，未监视的变量返回default"""
+        return self.slots.get(var_name, default)
+
+    def type_of(self, var_name, default=None):
+        """变量名对应的类型"""
+        slot = self.slots.get(var_name)
+        return default if slot is None else self.types[slot]
+
+    def __contains__(self, var_name):
+        return var_name in self.slots
+
+    def __len__(self):
+        return len(self.names)
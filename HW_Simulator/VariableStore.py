@@ -0,0 +1,131 @@
+from array import array
+
+
+class VariableStore:
+    """
+    监视变量当前值的列式存储
+
+    数值按变量索引的槽位保存在定长数组中（int类型用64位整数数组，
+    float类型用双精度数组），不再为每次采样生成格式化字符串；只有表格
+    实际绘制某个单元格时才调用format()格式化。无法转换为数值的值
+    （如字符串状态量）单独保存原文。
+
+    变量列表中的初始值（"val"）按原文显示，与表格原来的显示方式一致，
+    直到该变量收到第一次更新。
+    """
+
+    EMPTY = 0  # 无数据
+    NUMBER = 1  # 数值，保存在数组中
+    TEXT = 2  # 非数值，保存在texts中
+
+    def __init__(self, index, variables=None):
+        """
+        初始化变量存储
+
+        Args:
+            index: 变量索引（VariableIndex），决定槽位和变量类型
+            variables: 变量列表，用其中的"val"作为初始值
+        """
+        self.index = index
+        self.rebuild(variables or [])
+
+    def rebuild(self, variables):
+        """
+        按变量索引重新分配存储（变量列表结构变化后调用）
+
+        Args:
+            variables: 变量列表，用其中的"val"作为初始值
+        """
+        count = len(self.index)
+        self.is_int = array('B', (1 if var_type == "int" else 0 for var_type in self.index.types))
+        self.int_values = array('q', bytes(8 * count))
+        self.float_values = array('d', bytes(8 * count))
+        self.state = array('B', bytes(count))
+        self.texts = {}  # 槽位 -> 非数值原文
+        self.initial_texts = {}  # 槽位 -> 初始值原文（收到更新前按原文显示）
+
+        for slot, var in enumerate(variables[:count]):
+            value = var.get("val", "")
+            self._store(slot, value)
+            if self.state[slot] == self.NUMBER and self.format(slot) != str(value):
+                self.initial_texts[slot] = str(value)
+
+    def set(self, slot, value):
+        """
+        写入一个变量的新值
+
+        int类型取整，float类型保留3位小数，与表格显示精度一致，
+        因此只在显示内容会变化时才报告变化。
+
+        Args:
+            slot: 变量槽位
+            value: 新值（数值、数值字符串或其他）
+
+        Returns:
+            bool: 值是否发生变化
+        """
+        initial_text = self.initial_texts.pop(slot, None) if self.initial_texts else None
+        changed = self._store(slot, value)
+        if initial_text is not None:
+            # 第一次更新时与显示的初始值原文比较
+            return self.format(slot) != initial_text
+        return changed
+
+    def _store(self, slot, value):
+        """按变量类型保存新值，返回值是否发生变化"""
+        if value is None or value == "":
+            return self._set_state(slot, self.EMPTY)
+
+        try:
+            if self.is_int[slot]:
+                number = int(float(value))
+                changed = self.state[slot] != self.NUMBER or self.int_values[slot] != number
+                self.int_values[slot] = number
+            else:
+                number = round(float(value), 3)
+                changed = self.state[slot] != self.NUMBER or self.float_values[slot] != number
+                self.float_values[slot] = number
+        except (ValueError, TypeError, OverflowError):
+            text = str(value)
+            changed = self.state[slot] != self.TEXT or self.texts.get(slot) != text
+            self.texts[slot] = text
+            self.state[slot] = self.TEXT
+            return changed
+
+        if self.state[slot] == self.TEXT:
+            del self.texts[slot]
+        self.state[slot] = self.NUMBER
+        return changed
+
+    def value(self, slot):
+        """变量当前值：数值、非数值原文，无数据时返回None"""
+        state = self.state[slot]
+        if state == self.NUMBER:
+            return self.int_values[slot] if self.is_int[slot] else self.float_values[slot]
+        if state == self.TEXT:
+            return self.texts[slot]
+        return None
+
+    def format(self, slot):
+        """变量当前值的显示文字（只在绘制单元格时调用）"""
+        if self.initial_texts and slot in self.initial_texts:
+            return self.initial_texts[slot]
+        state = self.state[slot]
+        if state == self.NUMBER:
+            if self.is_int[slot]:
+                return str(self.int_values[slot])
+            # 浮点数统一保留3位小数
+            return f"{self.float_values[slot]:.3f}"
+        if state == self.TEXT:
+            return self.texts[slot]
+        return ""
+
+    def _set_state(self, slot, state):
+        changed = self.state[slot] != state
+        if self.state[slot] == self.TEXT:
+            del self.texts[slot]
+        self.state[slot] = state
+        return changed
+
+    def __len__(self):
+        return len(self.state)
@@ -0,0 +1,209 @@
+import tkinter as tk
+
+
+class VirtualTable:
+    """
+    虚拟化表格 - 只创建可见区域的行控件，滚动时复用
+
+    表格不保存数据，显示内容通过get_row_count/get_cell_text回调从
+    后台数据（如watch_variables、input_params）读取。行数再多，控件数量
+    也只与可见行数有关，大模型打开和滚动都不受行数影响。
+    """
+
+    def __init__(self, parent, headers, widths, get_row_count, get_cell_text,
+                 column_styles=None, cell_bindings=None):
+        """
+        初始化虚拟化表格
+
+        Args:
+            parent: 父容器
+            headers: 表头文字列表
+            widths: 各列字符宽度
+            get_row_count: 返回数据行数的回调
+            get_cell_text: 返回单元格文字的回调，参数为(行索引, 列索引)
+            column_styles: 列样式覆盖，{列索引: Label参数字典}
+            cell_bindings: 单元格事件绑定，{列索引: (事件序列, 回调)或其列表}，回调参数为行索引
+        """
+        self.headers = headers
+        self.widths = widths
+        self.get_row_count = get_row_count
+        self.get_cell_text = get_cell_text
+        self.column_styles = column_styles or {}
+        self.cell_bindings = cell_bindings or {}
+
+        self.first_row = 0  # 可见区域第一行对应的数据行
+        self.row_height = None  # 单行像素高度（创建第一行后测得）
+        self.slots = []  # 复用的行控件：{'frame', 'labels', 'row'}
+
+        # 创建带边框的表格框架
+        self.table_frame = tk.Frame(parent, bg='black', bd=1, relief='solid')
+        self.table_frame.pack(fill=tk.BOTH, expand=True)
+
+        # 创建表头
+        header_frame = tk.Frame(self.table_frame, bg='lightgray')
+        header_frame.pack(fill=tk.X)
+
+        for i, (header, width) in enumerate(zip(headers, widths)):
+            label = tk.Label(header_frame, text=header, font=('Arial', 10, 'bold'),
+                             bg='lightgray', width=width, relief='solid', bd=1,
+                             anchor=tk.CENTER)
+            if i == len(headers) - 1:  # 最后一列填充剩余空间
+                label.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            else:
+                label.pack(side=tk.LEFT, fill=tk.BOTH)
+
+        # 表格内容区域（带滚动条）
+        content_frame = tk.Frame(self.table_frame, bg='white')
+        content_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.body = tk.Frame(content_frame, bg='white')
+        self.scrollbar = tk.Scrollbar(content_frame, orient=tk.VERTICAL, command=self._on_scrollbar, width=3)
+
+        self.body.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.body.bind("<Configure>", lambda e: self.refresh())
+        self._bind_mousewheel(self.body)
+
+    def refresh(self):
+        """行数或整体数据变化时重绘可见区域"""
+        visible = self._ensure_slots()
+        self._clamp_first_row(visible)
+        for i, slot in enumerate(self.slots):
+            self._bind_slot(slot, self.first_row + i, i)
+        self._update_scrollbar(visible)
+
+    def refresh_rows(self, rows):
+        """
+        只刷新指定数据行的单元格（不可见的行直接跳过）
+
+        Args:
+            rows: 数据行索引集合
+        """
+        first = self.first_row
+        count = len(self.slots)
+        for row in rows:
+            i = row - first
+            if 0 <= i < count:
+                slot = self.slots[i]
+                if slot['row'] == row:
+                    self._update_slot_text(slot)
+
+    def scroll_to(self, row):
+        """滚动使指定行可见"""
+        visible = self._visible_rows()
+        if row < self.first_row:
+            self.first_row = row
+        elif row >= self.first_row + visible:
+            self.first_row = row - visible + 1
+        self.refresh()
+
+    def _visible_rows(self):
+        """可完整显示的行数"""
+        if not self.row_height:
+            return 1
+        return max(1, self.body.winfo_height() // self.row_height)
+
+    def _ensure_slots(self):
+        """按可见区域高度准备足够的行控件，返回可完整显示的行数"""
+        if self.row_height is None:
+            self._create_slot()
+            self.body.update_idletasks()
+            self.row_height = max(1, self.slots[0]['frame'].winfo_reqheight())
+
+        visible = self._visible_rows()
+        # 多准备一行用于显示底部不完整的行
+        while len(self.slots) < visible + 1:
+            self._create_slot()
+        return visible
+
+    def _create_slot(self):
+        """创建一行可复用的控件"""
+        frame = tk.Frame(self.body, bg='white')
+        slot = {'frame': frame, 'labels': [], 'row': None}
+
+        for col, width in enumerate(self.widths):
+            options = dict(font=('Arial', 10), bg='white', width=width,
+                           height=2, relief='solid', bd=1, anchor=tk.CENTER)
+            options.update(self.column_styles.get(col, {}))
+            label = tk.Label(frame, **options)
+            if col == len(self.widths) - 1:  # 最后一列填充剩余空间
+                label.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            else:
+                label.pack(side=tk.LEFT, fill=tk.BOTH)
+
+            bindings = self.cell_bindings.get(col, [])
+            if isinstance(bindings, tuple):
+                bindings = [bindings]
+            for sequence, callback in bindings:
+                label.bind(sequence, lambda e, s=slot, cb=callback: s['row'] is not None and cb(s['row']))
+            self._bind_mousewheel(label)
+            slot['labels'].append(label)
+
+        self._bind_mousewheel(frame)
+        self.slots.append(slot)
+        return slot
+
+    def _bind_slot(self, slot, row, position):
+        """把行控件绑定到数据行"""
+        if row >= self.get_row_count():
+            if slot['row'] is not None:
+                slot['frame'].place_forget()
+                slot['row'] = None
+            return
+
+        if slot['row'] is None:
+            slot['frame'].place(x=0, y=position * self.row_height, relwidth=1.0)
+        slot['row'] = row
+        self._update_slot_text(slot)
+
+    def _update_slot_text(self, slot):
+        """刷新一行的文字（只更新变化的单元格）"""
+        row = slot['row']
+        for col, label in enumerate(slot['labels']):
+            text = self.get_cell_text(row, col)
+            if label.cget("text") != text:
+                label.config(text=text)
+
+    def _clamp_first_row(self, visible):
+        max_first = max(0, self.get_row_count() - visible)
+        self.first_row = min(max(0, self.first_row), max_first)
+
+    def _update_scrollbar(self, visible):
+        total = self.get_row_count()
+        if total <= visible:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.first_row / total, (self.first_row + visible) / total)
+
+    def _scroll(self, rows):
+        """滚动指定行数"""
+        old_first = self.first_row
+        self.first_row += rows
+        self._clamp_first_row(self._visible_rows())
+        if self.first_row != old_first:
+            self.refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        """滚动条回调"""
+        if action == tk.MOVETO:
+            self.first_row = int(float(value) * self.get_row_count())
+            self.refresh()
+        elif action == tk.SCROLL:
+            step = int(value)
+            if unit == tk.PAGES:
+                step *= self._visible_rows()
+            self._scroll(step)
+
+    def _on_mousewheel(self, event):
+        if getattr(event, 'num', None) == 4:
+            self._scroll(-1)
+        elif getattr(event, 'num', None) == 5:
+            self._scroll(1)
+        elif event.delta:
+            self._scroll(int(-1 * (event.delta / 120)) or (-1 if event.delta > 0 else 1))
+
+    def _bind_mousewheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_mousewheel)
+        widget.bind("<Button-4>", self._on_mousewheel)
+        widget.bind("<Button-5>", self._on_mousewheel)
@@ -0,0 +1,285 @@
+from array import array
+
+
+class MinMaxHistory:
+    """
+    长时间波形历史 - 大容量环形缓冲 + 逐级最小/最大值金字塔
+
+    第0级保存原始采样（时间、数值）；第k级每个桶汇总fanout**k个原始采样，
+    保存桶内最小值、最大值及其出现的时间。采样按时间顺序追加，每个采样只
+    更新各级的累加器，桶满时写入对应级别。查询时选择桶数不少于需要点数
+    的最粗级别，再把相邻的桶合并到max_points个点，桶内的峰值（毛刺）不会丢失。
+
+    存储按需分配：初始只分配initial_capacity个采样，写满后按倍数扩容，
+    直到capacity后开始循环覆盖最旧的采样。
+    """
+
+    def __init__(self, capacity=1000000, fanout=16, initial_capacity=4096):
+        """
+        初始化历史存储
+
+        Args:
+            capacity: 最多保留的原始采样数量
+            fanout: 每级汇总的下级桶数量
+            initial_capacity: 初始分配的采样数量
+        """
+        self.capacity = capacity
+        self.fanout = fanout
+        self.initial_capacity = max(1, min(initial_capacity, capacity))
+
+        # 各级桶大小（原始采样数）：1, fanout, fanout**2, ...
+        self.bucket_sizes = [1]
+        while self.bucket_sizes[-1] * fanout <= capacity:
+            self.bucket_sizes.append(self.bucket_sizes[-1] * fanout)
+
+        self.clear()
+
+    def clear(self):
+        """清空历史"""
+        allocated = self.initial_capacity
+        self.allocated = allocated  # 已分配的原始采样数量（不超过capacity）
+        self.count = 0  # 累计追加的采样数（全局序号）
+
+        # 第0级：原始采样
+        self.times = array('d', bytes(8 * allocated))
+        self.values = array('d', bytes(8 * allocated))
+
+        # 第1级及以上：每级保存最小值/最大值及其时间
+        self.levels = []
+        for size in self.bucket_sizes[1:]:
+            slots = allocated // size + 2  # 比原始采样多保留一点，覆盖被淘汰的边界桶
+            self.levels.append({
+                'slots': slots,
+                'min': array('d', bytes(8 * slots)),
+                'min_time': array('d', bytes(8 * slots)),
+                'max': array('d', bytes(8 * slots)),
+                'max_time': array('d', bytes(8 * slots)),
+            })
+
+        # 各级正在累加的桶：[最小值, 最小值时间, 最大值, 最大值时间]
+        self.accumulators = [None] * len(self.levels)
+
+    def __len__(self):
+        """当前保留的原始采样数"""
+        return min(self.count, self.capacity)
+
+    def first_index(self):
+        """最旧的保留采样的全局序号"""
+        return max(0, self.count - self.capacity)
+
+    def first_time(self):
+        """最旧的保留采样的时间"""
+        return self.times[self.first_index() % self.capacity] if self.count else None
+
+    def last_time(self):
+        """最新采样的时间"""
+        return self.times[(self.count - 1) % self.capacity] if self.count else None
+
+    def append(self, timestamp, value):
+        """
+        追加一个采样（时间必须不减）
+
+        Args:
+            timestamp: 采样时间
+            value: 数值
+        """
+        if self.count == self.allocated < self.capacity:
+            self._grow()
+
+        slot = self.count % self.capacity
+        self.times[slot] = timestamp
+        self.values[slot] = value
+        self.count += 1
+
+        # 逐级累加，桶满时写入该级并并入上一级
+        bucket = [value, timestamp, value, timestamp]
+        for level, size in enumerate(self.bucket_sizes[1:]):
+            acc = self.accumulators[level]
+            if acc is None:
+                acc = self.accumulators[level] = list(bucket)
+            else:
+                self._merge(acc, bucket)
+
+            if self.count % size:
+                break
+
+            self._store(level, self.count // size - 1, acc)
+            self.accumulators[level] = None
+            bucket = acc
+
+    def query(self, max_points, start_time=None, end_time=None):
+        """
+        取出时间范围内用于绘制的点
+
+        Args:
+            max_points: 期望的最大点数（约等于屏幕宽度像素数）
+            start_time: 起始时间，None表示最旧的采样
+            end_time: 结束时间，None表示最新的采样
+
+        Returns:
+            tuple: (时间列表, 数值列表)，按时间排序
+        """
+        if not self.count:
+            return [], []
+
+        first = self.first_index()
+        start = first if start_time is None else self._index_for_time(start_time)
+        end = self.count if end_time is None else self._index_for_time(end_time, right=True)
+        if end <= start:
+            return [], []
+
+        total = end - start
+        if total <= max_points:
+            return self._raw_points(start, end)
+
+        # 每个输出桶给出最小值和最大值两个点
+        target = max(1, max_points // 2)
+
+        # 选择桶数不少于target的最粗级别（第0级为原始采样），再合并相邻桶
+        level = 0
+        while (level + 1 < len(self.bucket_sizes) and
+               self._bucket_count(level + 1, start, end) >= target):
+            level += 1
+
+        return self._merged_points(level, start, end, target)
+
+    def _bucket_count(self, level, start, end):
+        size = self.bucket_sizes[level]
+        return (end - 1) // size - start // size + 1
+
+    def _raw_points(self, start, end):
+        capacity = self.capacity
+        times, values = self.times, self.values
+        xs, ys = [], []
+        for index in range(start, end):
+            slot = index % capacity
+            xs.append(times[slot])
+            ys.append(values[slot])
+        return xs, ys
+
+    def _buckets(self, level, start, end):
+        """
+        逐个取出覆盖[start, end)的桶：完整落在范围内的桶取level级汇总，
+        范围两端不完整的桶改用更细的级别（循环覆盖后最旧的桶中包含已淘汰
+        的采样，不能直接使用）
+
+        Yields:
+            tuple: (桶内第一个采样的全局序号, [最小值, 最小值时间, 最大值, 最大值时间])
+        """
+        if level == 0:
+            capacity = self.capacity
+            times, values = self.times, self.values
+            for index in range(start, end):
+                slot = index % capacity
+                value, timestamp = values[slot], times[slot]
+                yield index, [value, timestamp, value, timestamp]
+            return
+
+        size = self.bucket_sizes[level]
+        first = -(-start // size)  # 第一个完整落在范围内的桶
+        last = end // size  # 最后一个完整落在范围内的桶之后的桶
+
+        # 开头不完整的桶
+        if start < first * size:
+            yield from self._buckets(level - 1, start, min(first * size, end))
+            if first * size >= end:
+                return
+
+        data = self.levels[level - 1]
+        slots = data['slots']
+        for bucket in range(first, last):
+            slot = bucket % slots
+            yield bucket * size, [data['min'][slot], data['min_time'][slot],
+                                  data['max'][slot], data['max_time'][slot]]
+
+        # 结尾不完整的桶：到最新采样为止时就是各级累加器合并成的未满桶
+        tail = last * size
+        if tail < end:
+            if end == self.count:
+                acc = self._open_bucket(level - 1)
+                if acc is not None:
+                    yield tail, acc
+            else:
+                yield from self._buckets(level - 1, tail, end)
+
+    def _merged_points(self, level, start, end, target):
+        """把相邻的桶按采样位置均匀合并为target个，每个输出其最小值和最大值两个点（按时间排序）"""
+        total = end - start
+        xs, ys = [], []
+        merged = None
+        current = 0  # 当前输出桶序号
+        for index, bucket in self._buckets(level, start, end):
+            group = (index - start) * target // total
+            if merged is not None and group != current:
+                self._emit(merged, xs, ys)
+                merged = None
+            current = group
+            if merged is None:
+                merged = list(bucket)
+            else:
+                self._merge(merged, bucket)
+
+        if merged is not None:
+            self._emit(merged, xs, ys)
+        return xs, ys
+
+    def _emit(self, bucket, xs, ys):
+        low = (bucket[1], bucket[0])
+        high = (bucket[3], bucket[2])
+        for x, y in sorted((low, high)):
+            xs.append(x)
+            ys.append(y)
+
+    def _grow(self):
+        """原始采样写满已分配空间时按倍数扩容（尚未循环覆盖，槽位不需要移动）"""
+        allocated = min(self.allocated * 2, self.capacity)
+        extra = allocated - self.allocated
+        self.times.extend(array('d', bytes(8 * extra)))
+        self.values.extend(array('d', bytes(8 * extra)))
+
+        for data, size in zip(self.levels, self.bucket_sizes[1:]):
+            slots = allocated // size + 2
+            extra = slots - data['slots']
+            if extra > 0:
+                for key in ('min', 'min_time', 'max', 'max_time'):
+                    data[key].extend(array('d', bytes(8 * extra)))
+                data['slots'] = slots
+
+        self.allocated = allocated
+
+    def _open_bucket(self, level):
+        """合并第0级到level级累加器，得到该级当前未满的桶"""
+        result = None
+        for acc in self.accumulators[:level + 1]:
+            if acc is None:
+                continue
+            if result is None:
+                result = list(acc)
+            else:
+                self._merge(result, acc)
+        return result
+
+    def _store(self, level, bucket, acc):
+        data = self.levels[level]
+        slot = bucket % data['slots']
+        data['min'][slot], data['min_time'][slot], data['max'][slot], data['max_time'][slot] = acc
+
+    def _merge(self, acc, other):
+        if other[0] < acc[0]:
+            acc[0], acc[1] = other[0], other[1]
+        if other[2] > acc[2]:
+            acc[2], acc[3] = other[2], other[3]
+
+    def _index_for_time(self, timestamp, right=False):
+        """二分查找时间对应的全局序号"""
+        capacity = self.capacity
+        times = self.times
+        low, high = self.first_index(), self.count
+        while low < high:
+            mid = (low + high) // 2
+            value = times[mid % capacity]
+            if value < timestamp or (right and value == timestamp):
+                low = mid + 1
+            else:
+                high = mid
+        return low
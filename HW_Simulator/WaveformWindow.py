@@ -2,7 +2,6 @@ import tkinter as tk
 import time
 import os
 import sys
-from collections import deque
 import matplotlib
 
 matplotlib.use('TkAgg')
@@ -10,6 +9,8 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 import matplotlib.font_manager as fm
+from WaveformHistory import MinMaxHistory
+from WindowStats import WindowStats
 
 
 def get_system_chinese_font():
@@ -70,7 +71,8 @@ setup_matplotlib_chinese_font()
 class WaveformWindow:
     """波形显示窗口 - 内部计时版本"""
 
-    def __init__(self, parent, variable_name, max_points=500):
+    def __init__(self, parent, variable_name, max_points=500, max_fps=30, max_render_points=2000,
+                 history_points=1000000):
         """
         初始化波形窗口
 
@@ -78,6 +80,9 @@ class WaveformWindow:
             parent: 父窗口
             variable_name: 变量名称
             max_points: 最大显示点数
+            max_fps: 最大重绘帧率，与数据速率无关
+            max_render_points: 单帧绘制的最大点数，超过时按最小/最大值抽取
+            history_points: 全部显示模式最多保留的历史采样数（按需扩容，不预先分配）
         """
         self.window = tk.Toplevel(parent)
         self.window.title(f"波形显示 - {variable_name}")
@@ -85,15 +90,30 @@ class WaveformWindow:
         self.variable_name = variable_name
         self.max_points = max_points
 
-        # 数据存储
-        self.timestamps = deque(maxlen=max_points)  # 相对时间，从0开始
-        self.values = deque(maxlen=max_points)
-        self.window_start_time = None  # 第一个数据点到达的时间
-
         # 显示模式
         self.display_mode = "sliding"
         self.window_size = 10.0  # 滑动窗口大小（秒）
 
+        # 数据存储：滑动窗口内的数据及其统计（最小/最大值、均值、有效值、频率）
+        self.window_stats = WindowStats(max_points=max_points, window_size=self.window_size)
+        self.timestamps = self.window_stats.times  # 相对时间，从0开始
+        self.values = self.window_stats.values
+        self.window_start_time = None  # 第一个数据点到达的时间
+
+        # 长时间历史（全部显示模式按屏幕宽度从最小/最大值金字塔取点），
+        # 初始只分配一帧的绘制点数，随数据增长扩容
+        self.history = MinMaxHistory(history_points, initial_capacity=max(max_points, max_render_points))
+
+        # 渲染控制：按固定帧率合并重绘，坐标轴不变时只重绘曲线（blit）
+        self.frame_interval = 1.0 / max_fps
+        self.max_render_points = max_render_points
+        self.render_pending = False  # 是否已安排下一帧
+        self.last_render_time = 0.0
+        self.background = None  # 缓存的背景（坐标轴、网格、图例）
+        self.axes_dirty = True  # 坐标轴范围是否需要重新计算
+        self.pending_min = None  # 上一帧以来新数据的最小值/最大值
+        self.pending_max = None
+
         # 创建matplotlib图形
         self.fig = Figure(figsize=(8, 5), dpi=100)
         self.ax = self.fig.add_subplot(111)
@@ -105,7 +125,7 @@ class WaveformWindow:
         self.ax.grid(True, alpha=0.3)
 
         # 创建初始线条
-        self.line, = self.ax.plot([], [], 'b-', linewidth=2, label=variable_name)
+        self.line, = self.ax.plot([], [], 'b-', linewidth=2, label=variable_name, animated=True)
         self.ax.legend(loc='upper right')
 
         # 禁用科学计数法
@@ -117,6 +137,8 @@ class WaveformWindow:
 
         # 创建画布
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.window)
+        # 每次完整重绘（包括窗口缩放）后重新缓存背景
+        self.canvas.mpl_connect('draw_event', self._on_draw)
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
@@ -189,6 +211,12 @@ class WaveformWindow:
         self.min_value_label = tk.Label(info_frame, text="最小值: --", font=("Arial", 10))
         self.min_value_label.pack(side=tk.LEFT, padx=(0, 20))
 
+        self.mean_value_label = tk.Label(info_frame, text="平均值: --", font=("Arial", 10))
+        self.mean_value_label.pack(side=tk.LEFT, padx=(0, 20))
+
+        self.rms_value_label = tk.Label(info_frame, text="有效值: --", font=("Arial", 10))
+        self.rms_value_label.pack(side=tk.LEFT, padx=(0, 20))
+
         self.points_label = tk.Label(info_frame, text="点数: 0", font=("Arial", 10))
         self.points_label.pack(side=tk.LEFT)
 
@@ -210,89 +238,197 @@ class WaveformWindow:
                 self.window_size = float(self.window_var.get())
             except:
                 self.window_size = 10.0
+            self.window_stats.set_window_size(self.window_size)
+        self.axes_dirty = True
         self._update_plot()
 
-    def add_data_point(self, value):
+    def add_data_point(self, value, timestamp=None):
         """
         添加数据点
 
         Args:
             value: 变量值
+            timestamp: 数据到达时间，None表示使用当前时间
+        """
+        if self.is_paused:
+            return
+
+        if self._append_point(value, timestamp):
+            # 更新图形
+            self._update_plot()
+
+    def add_data_points(self, points):
+        """
+        批量添加数据点，全部追加后只重绘一次
+
+        Args:
+            points: [(变量值, 数据到达时间), ...]
         """
         if self.is_paused:
             return
 
+        appended = False
+        for value, timestamp in points:
+            appended = self._append_point(value, timestamp) or appended
+
+        if appended:
+            self._update_plot()
+
+    def _append_point(self, value, timestamp=None):
+        """追加一个数据点并更新统计信息，非数值返回False"""
         try:
             # 尝试转换为浮点数
             float_value = float(value)
+        except (ValueError, TypeError):
+            # 如果不是数值，忽略
+            return False
 
-            # 如果是第一个数据点，记录开始时间
-            if self.window_start_time is None:
-                self.window_start_time = time.time()
+        current_time = time.time() if timestamp is None else timestamp
 
-            # 计算相对时间（从第一个数据点开始）
-            current_time = time.time()
-            elapsed_time = current_time - self.window_start_time
+        # 如果是第一个数据点，记录开始时间
+        if self.window_start_time is None:
+            self.window_start_time = current_time
 
-            # 记录最后数据时间
-            self.last_data_time = current_time
+        # 计算相对时间（从第一个数据点开始）
+        elapsed_time = current_time - self.window_start_time
 
-            # 添加数据
-            self.timestamps.append(elapsed_time)
-            self.values.append(float_value)
-            self.data_count += 1
+        # 记录最后数据时间
+        self.last_data_time = current_time
 
-            # 更新统计信息
-            self.last_value = float_value
-            if self.max_value is None or float_value > self.max_value:
-                self.max_value = float_value
-            if self.min_value is None or float_value < self.min_value:
-                self.min_value = float_value
+        # 添加数据
+        self.window_stats.append(elapsed_time, float_value)
+        self.history.append(elapsed_time, float_value)
+        self.data_count += 1
 
-            # 更新图形
-            self._update_plot()
+        # 记录新数据的范围，用于判断是否超出当前Y轴
+        if self.pending_min is None or float_value < self.pending_min:
+            self.pending_min = float_value
+        if self.pending_max is None or float_value > self.pending_max:
+            self.pending_max = float_value
 
-        except (ValueError, TypeError):
-            # 如果不是数值，忽略
-            pass
+        # 更新统计信息
+        self.last_value = float_value
+        if self.max_value is None or float_value > self.max_value:
+            self.max_value = float_value
+        if self.min_value is None or float_value < self.min_value:
+            self.min_value = float_value
+
+        return True
 
     def _update_plot(self):
-        """更新绘图"""
-        if len(self.timestamps) > 0:
-            # 更新线条数据
-            self.line.set_data(self.timestamps, self.values)
+        """请求重绘（按最大帧率合并，多次请求只重绘一次）"""
+        if self.render_pending:
+            return
+        self.render_pending = True
+        delay = self.last_render_time + self.frame_interval - time.time()
+        try:
+            self.window.after(max(0, int(delay * 1000)), self._render)
+        except tk.TclError:
+            self.render_pending = False
+
+    def _render(self):
+        """绘制一帧：坐标轴变化时完整重绘，否则只在缓存背景上重绘曲线"""
+        self.render_pending = False
+        self.last_render_time = time.time()
+        if len(self.timestamps) == 0:
+            return
 
-            # 调整坐标轴
-            self._adjust_axes()
+        try:
+            # 更新线条数据
+            xs, ys = self._decimate()
+            self.line.set_data(xs, ys)
 
             # 更新标签
             self._update_labels()
 
-            # 重绘画布
-            self.canvas.draw()
+            if self._adjust_axes(ys) or self.background is None:
+                # 坐标轴范围变化：完整重绘（draw_event中重新缓存背景并绘制曲线）
+                self.canvas.draw()
+            else:
+                self._blit()
+        except tk.TclError:
+            # 窗口已关闭
+            pass
+
+    def _on_draw(self, event):
+        """完整重绘后缓存背景，并在其上绘制曲线"""
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.ax.draw_artist(self.line)
+
+    def _blit(self):
+        """恢复缓存的背景，只重绘曲线"""
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.line)
+        self.canvas.blit(self.fig.bbox)
+
+    def _decimate(self):
+        """
+        生成绘制用的数据：点数超过max_render_points时按桶取最小值和最大值，
+        保留峰值的同时限制每帧的绘制量
+
+        全部显示模式从历史金字塔中按画布宽度取点，显示时长与绘制量无关
+
+        Returns:
+            tuple: (时间列表, 数值列表)
+        """
+        if self.display_mode != "sliding":
+            width = self.canvas.get_tk_widget().winfo_width()
+            return self.history.query(max(2 * width, 200))
+
+        count = len(self.values)
+        if count <= self.max_render_points:
+            return self.timestamps, self.values
+
+        timestamps = list(self.timestamps)
+        values = list(self.values)
+        bucket = -(-count * 2 // self.max_render_points)  # 向上取整
+        xs, ys = [], []
+        for start in range(0, count, bucket):
+            chunk = values[start:start + bucket]
+            low = min(range(len(chunk)), key=chunk.__getitem__)
+            high = max(range(len(chunk)), key=chunk.__getitem__)
+            for i in sorted((low, high)):
+                xs.append(timestamps[start + i])
+                ys.append(chunk[i])
+        return xs, ys
+
+    def _adjust_axes(self, drawn_values):
+        """
+        调整坐标轴范围，只在数据超出当前视图时才改变
+
+        Args:
+            drawn_values: 本帧绘制的数值（全部显示模式下用于计算Y轴范围）
+
+        Returns:
+            bool: 坐标轴范围是否改变
+        """
+        pending_min, pending_max = self.pending_min, self.pending_max
+        self.pending_min = self.pending_max = None
 
-    def _adjust_axes(self):
-        """调整坐标轴范围"""
         if len(self.timestamps) < 2:
-            return
+            return False
+
+        x_min, x_max = self.ax.get_xlim()
+        y_min, y_max = self.ax.get_ylim()
+        current_time = self.timestamps[-1]
+        changed = self.axes_dirty
 
         if self.display_mode == "sliding":
-            # 滑动窗口模式
-            if len(self.timestamps) > 0:
-                current_time = self.timestamps[-1]
-                window_start = max(0, current_time - self.window_size)
-                window_end = current_time
+            # 滑动窗口模式：数据到达右边界时视图向前翻动1/4窗口
+            if changed or current_time > x_max:
+                window_start = max(0, current_time - self.window_size * 0.75)
+                window_end = window_start + self.window_size
 
                 # 添加5%的边距
                 margin = (window_end - window_start) * 0.05
                 x_min = window_start - margin
                 x_max = window_end + margin
-                self.ax.set_xlim(x_min, x_max)
+                changed = True
         else:
-            # 全部显示模式
-            if len(self.timestamps) > 1:
-                x_min = min(self.timestamps)
-                x_max = max(self.timestamps)
+            # 全部显示模式：数据超出右边界时扩展到当前时长的1.25倍
+            if changed or current_time > x_max:
+                x_min = self.history.first_time()
+                x_max = max(current_time, x_min + (current_time - x_min) * 1.25)
 
                 # 如果只有一个点，设置一个范围
                 if x_max - x_min < 0.001:
@@ -304,13 +440,17 @@ class WaveformWindow:
                 margin = (x_max - x_min) * 0.05
                 x_min -= margin
                 x_max += margin
-
-                self.ax.set_xlim(x_min, x_max)
-
-        # 调整Y轴范围
-        if len(self.values) > 0:
-            y_min = min(self.values)
-            y_max = max(self.values)
+                changed = True
+
+        # X轴变化或新数据超出Y轴时重新计算Y轴范围
+        if changed or (pending_min is not None and (pending_min < y_min or pending_max > y_max)):
+            # 全部显示模式的绘制数据包含每个桶的最小/最大值，范围与完整历史一致
+            if self.display_mode == "sliding":
+                y_min = self.window_stats.min
+                y_max = self.window_stats.max
+            else:
+                y_min = min(drawn_values)
+                y_max = max(drawn_values)
 
             # 如果所有值相同，设置一个范围
             if y_max - y_min < 0.001:
@@ -323,29 +463,50 @@ class WaveformWindow:
                 margin = y_range * 0.1
                 y_min -= margin
                 y_max += margin
+            changed = True
 
+        if changed:
+            self.ax.set_xlim(x_min, x_max)
             self.ax.set_ylim(y_min, y_max)
+            self.axes_dirty = False
+        return changed
 
     def _update_labels(self):
         """更新信息标签"""
         if self.last_value is not None:
             self.current_value_label.config(text=f"当前值: {self.last_value:.3f}")
 
-        if self.max_value is not None:
-            self.max_value_label.config(text=f"最大值: {self.max_value:.3f}")
+        stats = self.window_stats
+        if self.display_mode == "sliding":
+            # 滑动窗口模式：显示窗口内的统计
+            max_value, min_value = stats.max, stats.min
+            points = len(stats)
+        else:
+            # 全部显示模式：显示全程极值
+            max_value, min_value = self.max_value, self.min_value
+            points = len(self.history)
+
+        if max_value is not None:
+            self.max_value_label.config(text=f"最大值: {max_value:.3f}")
+
+        if min_value is not None:
+            self.min_value_label.config(text=f"最小值: {min_value:.3f}")
 
-        if self.min_value is not None:
-            self.min_value_label.config(text=f"最小值: {self.min_value:.3f}")
+        if stats.mean is not None:
+            self.mean_value_label.config(text=f"平均值: {stats.mean:.3f}")
+            self.rms_value_label.config(text=f"有效值: {stats.rms:.3f}")
 
-        self.points_label.config(text=f"点数: {len(self.timestamps)}")
+        self.points_label.config(text=f"点数: {points}")
 
         # 更新时间信息
         if self.last_data_time is not None and self.window_start_time is not None:
             elapsed = self.last_data_time - self.window_start_time
             self.elapsed_label.config(text=f"波形时间: {elapsed:.1f}s")
 
-            # 计算数据频率
-            if elapsed > 0 and self.data_count > 1:
+            # 计算数据频率（滑动窗口模式按窗口内的采样计算）
+            if self.display_mode == "sliding":
+                self.rate_label.config(text=f"频率: {stats.rate:.2f} Hz")
+            elif elapsed > 0 and self.data_count > 1:
                 frequency = self.data_count / elapsed
                 self.rate_label.config(text=f"频率: {frequency:.2f} Hz")
 
@@ -360,14 +521,17 @@ class WaveformWindow:
 
     def clear_data(self):
         """清除数据"""
-        self.timestamps.clear()
-        self.values.clear()
+        self.window_stats.clear()
+        self.history.clear()
         self.max_value = None
         self.min_value = None
         self.last_value = None
         self.window_start_time = None
         self.last_data_time = None
         self.data_count = 0
+        self.pending_min = None
+        self.pending_max = None
+        self.axes_dirty = True
 
         # 清除图形
         self.line.set_data([], [])
@@ -380,6 +544,8 @@ class WaveformWindow:
         self.current_value_label.config(text="当前值: --")
         self.max_value_label.config(text="最大值: --")
         self.min_value_label.config(text="最小值: --")
+        self.mean_value_label.config(text="平均值: --")
+        self.rms_value_label.config(text="有效值: --")
         self.points_label.config(text="点数: 0")
         self.elapsed_label.config(text="波形时间: 0.0s")
         self.rate_label.config(text="频率: 0.0 Hz")
@@ -0,0 +1,135 @@
+import math
+from collections import deque
+
+
+class WindowStats:
+    """
+    滑动窗口统计 - 窗口内数据及其最小值、最大值、均值、有效值和采样频率
+
+    窗口按点数和/或时长限定。最小值/最大值用单调队列维护，均值/有效值用
+    累加和维护，每个采样的追加和淘汰均摊O(1)，查询O(1)，不再对整个窗口
+    调用min()/max()。
+    """
+
+    def __init__(self, max_points=None, window_size=None):
+        """
+        初始化滑动窗口统计
+
+        Args:
+            max_points: 窗口最多保留的点数，None表示不限
+            window_size: 窗口时长（秒），None表示不限
+        """
+        self.max_points = max_points
+        self.window_size = window_size
+
+        # 窗口内的数据（可直接用于绘制）
+        self.times = deque()
+        self.values = deque()
+        self.clear()
+
+    def clear(self):
+        """清空窗口"""
+        self.times.clear()
+        self.values.clear()
+        self.first_index = 0  # 窗口内第一个点的全局序号
+        self.next_index = 0  # 下一个点的全局序号
+
+        # 单调队列：(序号, 数值)，min_queue数值递增，max_queue数值递减
+        self.min_queue = deque()
+        self.max_queue = deque()
+
+        # 累加和（淘汰一个窗口长度的点后重新精确求和，避免浮点误差积累）
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.evicted_since_resync = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, timestamp, value):
+        """
+        追加一个采样并淘汰超出窗口的旧采样
+
+        Args:
+            timestamp: 采样时间（不减）
+            value: 数值
+        """
+        index = self.next_index
+        self.next_index += 1
+
+        self.times.append(timestamp)
+        self.values.append(value)
+        self.sum += value
+        self.sum_sq += value * value
+
+        min_queue = self.min_queue
+        while min_queue and min_queue[-1][1] >= value:
+            min_queue.pop()
+        min_queue.append((index, value))
+
+        max_queue = self.max_queue
+        while max_queue and max_queue[-1][1] <= value:
+            max_queue.pop()
+        max_queue.append((index, value))
+
+        self._evict(timestamp)
+
+    def set_window_size(self, window_size):
+        """修改窗口时长并立即淘汰超出的采样"""
+        self.window_size = window_size
+        if self.times:
+            self._evict(self.times[-1])
+
+    @property
+    def min(self):
+        """窗口内最小值"""
+        return self.min_queue[0][1] if self.min_queue else None
+
+    @property
+    def max(self):
+        """窗口内最大值"""
+        return self.max_queue[0][1] if self.max_queue else None
+
+    @property
+    def mean(self):
+        """窗口内均值"""
+        return self.sum / len(self.values) if self.values else None
+
+    @property
+    def rms(self):
+        """窗口内有效值（均方根）"""
+        return math.sqrt(max(0.0, self.sum_sq / len(self.values))) if self.values else None
+
+    @property
+    def rate(self):
+        """窗口内的采样频率（Hz）"""
+        if len(self.times) < 2:
+            return 0.0
+        span = self.times[-1] - self.times[0]
+        return (len(self.times) - 1) / span if span > 0 else 0.0
+
+    def _evict(self, now):
+        """淘汰超出点数或时长的旧采样"""
+        times = self.times
+        while times and ((self.max_points is not None and len(times) > self.max_points) or
+                         (self.window_size is not None and now - times[0] > self.window_size)):
+            self._pop_oldest()
+
+    def _pop_oldest(self):
+        self.times.popleft()
+        value = self.values.popleft()
+        index = self.first_index
+        self.first_index += 1
+
+        if self.min_queue[0][0] == index:
+            self.min_queue.popleft()
+        if self.max_queue[0][0] == index:
+            self.max_queue.popleft()
+
+        self.sum -= value
+        self.sum_sq -= value * value
+        self.evicted_since_resync += 1
+        if self.evicted_since_resync >= max(len(self.values), 1):
+            self.sum = math.fsum(self.values)
+            self.sum_sq = math.fsum(v * v for v in self.values)
+            self.evicted_since_resync = 0
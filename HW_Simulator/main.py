@@ -2,11 +2,19 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import json
 import time
+import argparse
 import threading
 from datetime import datetime
 from TCPClient import TCPClient
-from SimulatorMessageHandler import CtrlMessageHandler, StatusMessageHandler
+from SessionManager import SessionManager
 from WaveformWindow import WaveformWindow
+from ScopeWindow import ScopeWindow
+from DataRecorder import VariableRecorder, ParameterRecorder
+from SampleBridge import SampleBridge
+from LogSink import LogSink
+from VirtualTable import VirtualTable
+from VariableIndex import VariableIndex
+from VariableStore import VariableStore
 import pandas as pd
 import openpyxl
 from openpyxl import Workbook
@@ -15,7 +23,19 @@ import os
 
 
 class HardwareSimulator:
-    def __init__(self, root):
+    # 日志级别过滤选项：显示名称 -> 最低级别
+    LOG_LEVEL_NAMES = {"全部": "DEBUG", "信息": "INFO", "警告": "WARNING", "错误": "ERROR"}
+
+    def __init__(self, root, query_interval=1.0, acquisition="poll", stream_rate=10.0):
+        """
+        初始化主界面
+
+        Args:
+            root: Tk根窗口
+            query_interval: 变量查询间隔（秒）
+            acquisition: 变量采集方式，"poll"轮询，"stream"订阅推送（目标机不支持时回退到轮询）
+            stream_rate: 订阅推送的期望频率（Hz）
+        """
         self.root = root
         self.root.title("硬件仿真系统 v1.0.0")
         # 获取屏幕尺寸并设置窗口大小
@@ -28,35 +48,43 @@ class HardwareSimulator:
 
         # 设置整体背景色为灰色
         self.root.configure(bg='#d9d9d9')
-        self.query_index = 1
 
         # 状态变量
         self.model_file = None
         self.is_running = False
         self.start_time = None
-        self.timer_thread = None
-        self.stop_timer = False
+        self.run_timer_job = None  # 运行时间显示的周期任务
+        self.data_update_job = None  # 模拟数据更新的周期任务
         self.is_connected = False
 
         # 心跳控制
         self.use_heartbeat = True  # 是否使用心跳机制
         self.last_heartbeat_time = None  # 最后收到心跳的时间
-        self.heartbeat_timer = None  # 心跳定时器
         self.heartbeat_interval = 5  # 心跳发送间隔（秒）
         self.heartbeat_timeout = 20  # 心跳超时时间（秒）
-        self.status_check_timer = None  # 状态检查定时器
 
-        # 消息处理器
+        # 系统日志
+        self.log_max_lines = 2000  # 日志文本框最多保留的行数（更早的日志只保存在日志文件中）
+        self.log_file = "仿真日志.log"  # 完整日志历史（滚动文件，可在界面中检索），None表示不写文件
+
+        # 目标机会话（界面是会话管理器中一个会话的视图）
+        self.session_manager = SessionManager()
+        self.session = None
+        self.scheduler = self.session_manager.scheduler  # 周期任务调度服务（与会话的心跳、轮询共用）
+
+        # 消息处理器（当前会话的链路）
         self.ctrl_handler = None
         self.status_handler = None
 
-        # 查询定时器控制变量
-        self.query_timer = None
+        # 查询控制变量
         self.is_querying = False
-        self.query_interval = 1.0  # 查询间隔1秒
+        self.query_interval = query_interval  # 查询间隔（秒），订阅不可用时按此周期轮询
+        self.acquisition = acquisition  # 变量采集方式："poll"轮询，"stream"订阅推送
+        self.stream_rate = stream_rate  # 订阅推送的期望频率（Hz）
 
         # 波形窗口管理
         self.waveform_windows = {}  # 存储打开的波形窗口
+        self.scope_window = None  # 多变量波形窗口（右键波形按钮添加/移除变量）
 
         # 创建示例JSON文件（如果不存在）
         self.create_sample_json_files()
@@ -64,23 +92,33 @@ class HardwareSimulator:
         # 加载参数和变量数据
         self.input_params = self.load_json_file("input_params.json")
         self.watch_variables = self.load_json_file("watch_variables.json")
+        self.watch_index = VariableIndex(self.watch_variables, default_prefix="变量")  # 变量名 -> 表格行
+        self.watch_store = VariableStore(self.watch_index, self.watch_variables)  # 监视变量当前值（按行保存数值）
 
         # 保存原始参数值（用于比较修改）
         self.original_input_params = [param.copy() for param in self.input_params]
 
-        # 存储表格行引用
-        self.param_rows = []
-        self.watch_rows = []
+        self.watch_dirty = set()  # 数值已变化、待刷新显示的监视变量索引
 
         self.create_widgets()
         self.add_log("系统启动成功...")
 
+        # 变量数据批量投递到UI线程（约30Hz）
+        self.sample_bridge = SampleBridge(self.root, self._handle_variable_batch_ui)
+        self.sample_bridge.start()
+
         # 数据记录相关
         self.data_record_file = "仿真数据记录.xlsx"
         self.param_record_count = 0
         self.var_record_count = 0
         self.save_data_excel = True  # 数据保存开关，True时保存到Excel，False时不保存
+        self.export_count = 0  # 正在进行的导出线程数
+        self.close_pending = False  # 是否在等待导出完成后关闭窗口
         self.init_data_record_file()  # 初始化Excel文件
+        self.init_data_recorders()  # 初始化流式记录器
+
+        # 窗口关闭时停止记录器
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # 初始化修改状态显示
         if hasattr(self, '_update_modified_status'):
@@ -197,112 +235,125 @@ class HardwareSimulator:
             self.add_log(f"已创建数据记录文件: {self.data_record_file}")
 
         except Exception as e:
-            self.add_log(f"初始化数据记录文件失败: {e}")
+            self.add_log(f"初始化数据记录文件失败: {e}", "ERROR")
 
     def record_parameters(self, params_data, timestamp=None):
-        """记录参数数据到Excel文件"""
+        """记录参数数据（追加到参数日志，导出时转换为Excel）"""
         try:
             # 检查数据保存开关
             if not self.save_data_excel:
                 return
 
-            if timestamp is None:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.param_record_count = self.param_recorder.record(params_data, timestamp)
+
+            self.add_log(f"已记录参数数据，编号: {self.param_record_count}")
 
-            # 构建数据行
-            self.param_record_count += 1
-            row_data = [self.param_record_count]
+        except Exception as e:
+            self.add_log(f"记录参数数据失败: {e}", "ERROR")
 
-            # 按参数顺序添加值
-            for param in self.input_params:
-                param_name = param.get("param", "")
-                param_value = params_data.get(param_name, "")
-                row_data.append(param_value)
+    def init_data_recorders(self):
+        """初始化流式数据记录器，上次未导出的数据先合并到Excel文件"""
+        base_name = os.path.splitext(self.data_record_file)[0]
+        self.param_recorder = ParameterRecorder(f"{base_name}_输入参数.csv", self.input_params)
+        self.var_recorder = VariableRecorder(f"{base_name}_观察变量.csv", self.watch_variables)
 
-            row_data.append(timestamp)
+        for recorder in (self.param_recorder, self.var_recorder):
+            if recorder.has_pending_rows():
+                try:
+                    count = recorder.export_to_excel(self.data_record_file)
+                    self.add_log(f"已合并上次未导出的{recorder.SHEET_NAME}数据: {count}行")
+                except Exception as e:
+                    self.add_log(f"合并上次{recorder.SHEET_NAME}数据失败: {e}", "ERROR")
 
-            # 读取现有数据
-            try:
-                existing_df = pd.read_excel(self.data_record_file, sheet_name='输入参数')
-            except:
-                existing_df = pd.DataFrame()
+            recorder.start()
 
-            # 添加新行
-            headers = ["编号"]
-            for param in self.input_params:
-                headers.append(param.get("param", ""))
-            headers.append("时间")
+    def export_data_records(self):
+        """将流式记录的数据导出到Excel文件（后台线程执行）"""
+        if not self.save_data_excel:
+            return
 
-            new_row = pd.DataFrame([row_data], columns=headers)
-            updated_df = pd.concat([existing_df, new_row], ignore_index=True)
+        self.add_log("开始导出数据记录...")
 
-            # 保存到Excel
-            with pd.ExcelWriter(self.data_record_file, engine='openpyxl', mode='a',
-                                if_sheet_exists='replace') as writer:
-                updated_df.to_excel(writer, sheet_name='输入参数', index=False)
+        # 导出期间禁用导出按钮（同一工作簿的导出由workbook_lock串行执行）
+        self.export_count += 1
+        self.export_button.config(state="disabled")
 
-            self.add_log(f"已记录参数数据，编号: {self.param_record_count}")
+        def export_thread():
+            try:
+                param_count = self.param_recorder.export_to_excel(self.data_record_file)
+                var_count = self.var_recorder.export_to_excel(self.data_record_file)
+                self.add_log(f"数据记录导出完成，参数数据: {param_count}行，变量数据: {var_count}行")
+            except Exception as e:
+                self.add_log(f"数据记录导出失败: {e}", "ERROR")
+            finally:
+                self.root.after(0, self._on_export_finished)
 
-        except Exception as e:
-            self.add_log(f"记录参数数据失败: {e}")
+        threading.Thread(target=export_thread, daemon=True).start()
+
+    def _on_export_finished(self):
+        """导出线程结束（Tk主线程），全部导出完成后恢复导出按钮"""
+        self.export_count -= 1
+        if self.export_count == 0:
+            if self.close_pending:
+                self.on_close()
+                return
+            self.export_button.config(state="normal")
 
     def record_variables(self, vars_data, timestamp=None):
-        """记录变量数据到Excel文件"""
+        """记录变量数据（追加到流式记录器，导出时转换为Excel）"""
         try:
             # 检查数据保存开关
             if not self.save_data_excel:
                 return
 
-            if timestamp is None:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            # 使用openpyxl直接写入，保持格式
-            from openpyxl import load_workbook
-
-            # 加载工作簿
-            workbook = load_workbook(self.data_record_file)
-            worksheet = workbook['观察变量']
-
-            # 找到最后一行
-            last_row = worksheet.max_row + 1
-            self.var_record_count += 1
-
-            # 写入编号
-            worksheet.cell(row=last_row, column=1, value=self.var_record_count)
-
-            # 按变量顺序写入值
-            for i, var in enumerate(self.watch_variables, 2):  # 从第2列开始
-                var_name = var.get("variable", "")
-                var_value = vars_data.get(var_name, "")
-
-                if var_value is not None and var_value != "":
-                    try:
-                        # 尝试转换为数值
-                        num_value = float(var_value)
-                        var_type = var.get("type", "float")
-
-                        if var_type == "int":
-                            worksheet.cell(row=last_row, column=i, value=int(num_value))
-                        else:
-                            # 浮点数保留3位小数
-                            worksheet.cell(row=last_row, column=i, value=round(num_value, 3))
-                    except (ValueError, TypeError):
-                        # 如果转换失败，使用原始字符串
-                        worksheet.cell(row=last_row, column=i, value=str(var_value))
-                else:
-                    worksheet.cell(row=last_row, column=i, value="")
+            self.var_record_count = self.var_recorder.record(vars_data, timestamp)
 
-            # 写入时间
-            time_col = len(self.watch_variables) + 2
-            worksheet.cell(row=last_row, column=time_col, value=timestamp)
+            self.add_log(f"已记录变量数据，编号: {self.var_record_count}", "DEBUG")
 
-            # 保存工作簿
-            workbook.save(self.data_record_file)
+        except Exception as e:
+            self.add_log(f"记录变量数据失败: {e}", "ERROR")
+
+    def record_variables_batch(self, records):
+        """
+        批量记录变量数据
+
+        Args:
+            records: [(变量字典, 时间字符串), ...]
+        """
+        try:
+            if not self.save_data_excel or not records:
+                return
 
-            self.add_log(f"已记录变量数据，编号: {self.var_record_count}")
+            first_count = self.var_recorder.record_count + 1
+            for vars_data, timestamp in records:
+                self.var_record_count = self.var_recorder.record(vars_data, timestamp)
+
+            if self.var_record_count == first_count:
+                self.add_log(f"已记录变量数据，编号: {self.var_record_count}", "DEBUG")
+            else:
+                self.add_log(f"已记录变量数据，编号: {first_count}-{self.var_record_count}", "DEBUG")
 
         except Exception as e:
-            self.add_log(f"记录变量数据失败: {e}")
+            self.add_log(f"记录变量数据失败: {e}", "ERROR")
+
+    def on_close(self):
+        """关闭主窗口（有导出线程在运行时等导出完成后再关闭，避免Excel文件保存到一半）"""
+        if self.export_count > 0:
+            if not self.close_pending:
+                self.close_pending = True
+                self.add_log("正在导出数据，导出完成后关闭窗口...")
+            return
+
+        self._cancel_job('run_timer_job')
+        self._cancel_job('data_update_job')
+        self.sample_bridge.stop()
+        self.session_manager.close_all()
+
+        # 未导出的数据保留在日志文件中，下次启动时合并到Excel
+        self.param_recorder.stop()
+        self.var_recorder.stop()
+        self.log_sink.stop()
+        self.root.destroy()
 
     def create_widgets(self):
         # 主标题
@@ -392,6 +443,20 @@ class HardwareSimulator:
                                    bg='#d9d9d9', width=10, anchor='center')
         self.time_label.pack(side=tk.LEFT)
 
+        # 数据导出按钮
+        self.export_button = tk.Button(model_ops_frame, text="数据导出", width=10, font=("Arial", 10),
+                                       command=self.export_data_records, bg='#d9d9d9',
+                                       highlightthickness=0, bd=0, relief='flat',
+                                       highlightbackground='#d9d9d9', highlightcolor='#d9d9d9')
+        self.export_button.pack(side=tk.LEFT, padx=(20, 0))
+
+        # 多变量波形按钮
+        self.scope_button = tk.Button(model_ops_frame, text="多变量波形", width=10, font=("Arial", 10),
+                                      command=self.open_scope_window, bg='#d9d9d9',
+                                      highlightthickness=0, bd=0, relief='flat',
+                                      highlightbackground='#d9d9d9', highlightcolor='#d9d9d9')
+        self.scope_button.pack(side=tk.LEFT, padx=(20, 0))
+
         # 2. 参数变量区域
         params_vars_frame = tk.LabelFrame(main_container, text="参数变量", font=("Arial", 11, "bold"),
                                           bg='#d9d9d9', fg='#333333', bd=2, relief=tk.GROOVE)
@@ -457,6 +522,31 @@ class HardwareSimulator:
         log_container = tk.Frame(system_log_frame, bg='#d9d9d9')
         log_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
+        # 日志工具栏：级别过滤和历史检索
+        log_toolbar = tk.Frame(log_container, bg='#d9d9d9')
+        log_toolbar.pack(fill=tk.X, pady=(0, 5))
+
+        tk.Label(log_toolbar, text="日志级别:", font=("Arial", 10), bg='#d9d9d9').pack(side=tk.LEFT, padx=(0, 5))
+
+        self.log_level_combo = ttk.Combobox(log_toolbar, values=list(self.LOG_LEVEL_NAMES), width=8,
+                                            state="readonly", font=("Arial", 10))
+        self.log_level_combo.current(0)
+        self.log_level_combo.bind("<<ComboboxSelected>>", self.on_log_level_change)
+        self.log_level_combo.pack(side=tk.LEFT, padx=(0, 20))
+
+        tk.Label(log_toolbar, text="检索历史:", font=("Arial", 10), bg='#d9d9d9').pack(side=tk.LEFT, padx=(0, 5))
+
+        self.log_search_entry = tk.Entry(log_toolbar, width=30, font=("Arial", 10), bg='white',
+                                         highlightthickness=0, bd=3, relief='flat',
+                                         highlightbackground='#d9d9d9', highlightcolor='#d9d9d9')
+        self.log_search_entry.pack(side=tk.LEFT, padx=(0, 10))
+        self.log_search_entry.bind("<Return>", lambda e: self.search_log_history())
+
+        tk.Button(log_toolbar, text="检索", width=8, font=("Arial", 10),
+                  command=self.search_log_history, bg='#d9d9d9',
+                  highlightthickness=0, bd=0, relief='flat',
+                  highlightbackground='#d9d9d9', highlightcolor='#d9d9d9').pack(side=tk.LEFT)
+
         # 日志文本框
         log_frame = tk.Frame(log_container, bg='#d9d9d9')
         log_frame.pack(fill=tk.BOTH, expand=True)
@@ -468,247 +558,86 @@ class HardwareSimulator:
         self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         log_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-    def setup_params_table(self, parent):
-        """设置参数输入表格 - 使用Frame和Label创建真实表格"""
-        # 创建带边框的表格框架
-        table_frame = tk.Frame(parent, bg='black', bd=1, relief='solid')
-        table_frame.pack(fill=tk.BOTH, expand=True)
-
-        # 创建表头
-        header_frame = tk.Frame(table_frame, bg='lightgray')
-        header_frame.pack(fill=tk.X)
-
-        # 表头标签 - 使用固定宽度
-        headers = ["索引", "输入参数", "参数数值"]
-        widths = [10, 48, 48]  # 字符宽度
-
-        header_labels = []
-        for i, (header, width) in enumerate(zip(headers, widths)):
-            label = tk.Label(header_frame, text=header, font=('Arial', 10, 'bold'),
-                             bg='lightgray', width=width, relief='solid', bd=1,
-                             anchor=tk.CENTER)
-            if i == len(headers) - 1:  # 最后一列填充剩余空间
-                label.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            else:
-                label.pack(side=tk.LEFT, fill=tk.BOTH)
-            header_labels.append(label)
+        # 日志缓冲输出（任意线程写入，UI节拍批量追加）
+        self.log_sink = LogSink(self.root, self.log_text, max_lines=self.log_max_lines, log_file=self.log_file)
+        self.log_sink.start()
 
-        # 存储表头宽度信息
-        self.param_header_widths = widths
-
-        # 创建表格内容框架（带滚动条）
-        content_frame = tk.Frame(table_frame, bg='white')
-        content_frame.pack(fill=tk.BOTH, expand=True)
-
-        # 创建Canvas和Scrollbar用于滚动
-        canvas = tk.Canvas(content_frame, bg='white', highlightthickness=0)
-        scrollbar = tk.Scrollbar(content_frame, orient=tk.VERTICAL, command=canvas.yview, width=3)
-        scrollable_frame = tk.Frame(canvas, bg='white')
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+    def setup_params_table(self, parent):
+        """设置参数输入表格 - 虚拟化表格，只为可见行创建控件"""
+        self.params_table = VirtualTable(
+            parent,
+            headers=["索引", "输入参数", "参数数值"],
+            widths=[10, 48, 48],  # 字符宽度
+            get_row_count=lambda: len(self.input_params),
+            get_cell_text=self._get_param_cell_text,
+            column_styles={2: {'cursor': "hand2"}},
+            # 绑定双击编辑事件
+            cell_bindings={2: ("<Double-1>", self.edit_param_value)}
         )
 
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # 存储表格行引用
-        self.param_rows = []
-
-        # 配置画布滚动
-        def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-
-        canvas.bind("<MouseWheel>", _on_mousewheel)
-        scrollable_frame.bind("<MouseWheel>", _on_mousewheel)
-
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.params_content_frame = scrollable_frame
-        self.params_canvas = canvas
-
-        # 填充数据
-        self.update_params_table()
-
     def setup_watch_table(self, parent):
-        """设置变量监视表格 - 使用Frame和Label创建真实表格"""
-        # 创建带边框的表格框架
-        table_frame = tk.Frame(parent, bg='black', bd=1, relief='solid')
-        table_frame.pack(fill=tk.BOTH, expand=True)
-
-        # 创建表头
-        header_frame = tk.Frame(table_frame, bg='lightgray')
-        header_frame.pack(fill=tk.X)
-
-        # 表头标签 - 使用固定宽度
-        headers = ["索引", "变量名称", "参数数值", "波形"]
-        widths = [10, 50, 50, 7]  # 字符宽度
-
-        header_labels = []
-        for i, (header, width) in enumerate(zip(headers, widths)):
-            label = tk.Label(header_frame, text=header, font=('Arial', 10, 'bold'),
-                             bg='lightgray', width=width, relief='solid', bd=1,
-                             anchor=tk.CENTER)
-            if i == len(headers) - 1:  # 最后一列填充剩余空间
-                label.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            else:
-                label.pack(side=tk.LEFT, fill=tk.BOTH)
-            header_labels.append(label)
-
-        # 存储表头宽度信息
-        self.watch_header_widths = widths
-
-        # 创建表格内容框架（带滚动条）
-        content_frame = tk.Frame(table_frame, bg='white')
-        content_frame.pack(fill=tk.BOTH, expand=True)
-
-        # 创建Canvas和Scrollbar用于滚动
-        canvas = tk.Canvas(content_frame, bg='white', highlightthickness=0)
-        scrollbar = tk.Scrollbar(content_frame, orient=tk.VERTICAL, command=canvas.yview, width=3)
-        scrollable_frame = tk.Frame(canvas, bg='white')
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        """设置变量监视表格 - 虚拟化表格，只为可见行创建控件"""
+        self.watch_table = VirtualTable(
+            parent,
+            headers=["索引", "变量名称", "参数数值", "波形"],
+            widths=[10, 50, 50, 7],  # 字符宽度
+            get_row_count=lambda: len(self.watch_variables),
+            get_cell_text=self._get_watch_cell_text,
+            column_styles={3: {'font': ('Arial', 8), 'bg': 'lightblue', 'relief': 'raised', 'cursor': "hand2"}},
+            # 绑定波形按钮点击事件（左键单独窗口，右键添加到多变量波形）
+            cell_bindings={3: [("<Button-1>", self._on_watch_wave_click),
+                               ("<Button-3>", self._on_watch_wave_right_click)]}
         )
 
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # 存储表格行引用
-        self.watch_rows = []
-
-        # 配置画布滚动
-        def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-
-        canvas.bind("<MouseWheel>", _on_mousewheel)
-        scrollable_frame.bind("<MouseWheel>", _on_mousewheel)
-
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.watch_content_frame = scrollable_frame
-        self.watch_canvas = canvas
-
-        # 填充数据
-        self.update_watch_table()
+    def _get_param_cell_text(self, idx, col):
+        """参数表格单元格文字"""
+        if col == 0:
+            return str(idx + 1)
+        param = self.input_params[idx]
+        if col == 1:
+            return param.get("param", f"参数{idx + 1}")
+        return param.get("val", "")
+
+    def _get_watch_cell_text(self, idx, col):
+        """监视表格单元格文字"""
+        if col == 0:
+            return str(idx + 1)
+        if col == 3:
+            return "＿/￣"
+        if col == 1:
+            return self.watch_index.names[idx]
+        # 数值只在单元格绘制时格式化
+        return self.watch_store.format(idx)
+
+    def _on_watch_wave_click(self, idx):
+        """监视表格波形按钮点击"""
+        self.on_waveform_click_new(self.watch_index.names[idx])
+
+    def _on_watch_wave_right_click(self, idx):
+        """监视表格波形按钮右键：在多变量波形中添加/移除该变量"""
+        self.toggle_scope_trace(self.watch_index.names[idx])
 
     def update_params_table(self):
         """更新参数表格"""
-        # 清空现有行
-        for widget in self.params_content_frame.winfo_children():
-            widget.destroy()
-
-        self.param_rows = []
-
-        # 添加数据行
-        for idx, param in enumerate(self.input_params, 1):
-            param_name = param.get("param", f"参数{idx}")
-            param_value = param.get("val", "")
-
-            # 创建一行
-            row_frame = tk.Frame(self.params_content_frame, bg='white')
-            row_frame.pack(fill=tk.X)
-
-            # 索引列
-            index_label = tk.Label(row_frame, text=str(idx), font=('Arial', 10),
-                                   bg='white', width=self.param_header_widths[0],
-                                   height=2, relief='solid', bd=1, anchor=tk.CENTER)
-            index_label.pack(side=tk.LEFT, fill=tk.BOTH)
-
-            # 参数名列
-            name_label = tk.Label(row_frame, text=param_name, font=('Arial', 10),
-                                  bg='white', width=self.param_header_widths[1],
-                                  height=2, relief='solid', bd=1, anchor=tk.CENTER)
-            name_label.pack(side=tk.LEFT, fill=tk.BOTH)
-
-            # 参数值列
-            value_label = tk.Label(row_frame, text=param_value, font=('Arial', 10),
-                                   bg='white', width=self.param_header_widths[2],
-                                   height=2, relief='solid', bd=1, anchor=tk.CENTER, cursor="hand2")
-            value_label.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-            # 绑定双击编辑事件
-            value_label.bind("<Double-1>",
-                             lambda e, idx=idx - 1, label=value_label:
-                             self.edit_param_value(idx, label))
-
-            # 存储行引用
-            self.param_rows.append({
-                'frame': row_frame,
-                'index': index_label,
-                'name': name_label,
-                'value': value_label
-            })
-
-        # 更新滚动区域
-        self.params_content_frame.update_idletasks()
-        self.params_canvas.configure(scrollregion=self.params_canvas.bbox("all"))
+        self.params_table.refresh()
 
     def update_watch_table(self):
-        """更新监视变量表格"""
-        # 清空现有行
-        for widget in self.watch_content_frame.winfo_children():
-            widget.destroy()
-
-        self.watch_rows = []
-
-        # 添加数据行
-        for idx, var in enumerate(self.watch_variables, 1):
-            var_name = var.get("variable", f"变量{idx}")
-            var_value = var.get("val", "")
-
-            # 创建一行
-            row_frame = tk.Frame(self.watch_content_frame, bg='white')
-            row_frame.pack(fill=tk.X)
-
-            # 索引列
-            index_label = tk.Label(row_frame, text=str(idx), font=('Arial', 10),
-                                   bg='white', width=self.watch_header_widths[0],
-                                   height=2, relief='solid', bd=1, anchor=tk.CENTER)
-            index_label.pack(side=tk.LEFT, fill=tk.BOTH)
-
-            # 变量名列
-            name_label = tk.Label(row_frame, text=var_name, font=('Arial', 10),
-                                  bg='white', width=self.watch_header_widths[1],
-                                  height=2, relief='solid', bd=1, anchor=tk.CENTER)
-            name_label.pack(side=tk.LEFT, fill=tk.BOTH)
-
-            # 变量值列
-            value_label = tk.Label(row_frame, text=var_value, font=('Arial', 10),
-                                   bg='white', width=self.watch_header_widths[2],
-                                   height=2, relief='solid', bd=1, anchor=tk.CENTER)
-            value_label.pack(side=tk.LEFT, fill=tk.BOTH)
-
-            # 波形按钮列
-            wave_button = tk.Label(row_frame, text="＿/￣", font=('Arial', 8),
-                                   bg='lightblue', width=self.watch_header_widths[3],
-                                   height=2, relief='raised', bd=1, anchor=tk.CENTER, cursor="hand2")
-            wave_button.pack(side=tk.LEFT, fill=tk.BOTH)
-
-            # 绑定波形按钮点击事件
-            wave_button.bind("<Button-1>",
-                             lambda e, name=var_name: self.on_waveform_click_new(name))
-
-            # 存储行引用
-            self.watch_rows.append({
-                'frame': row_frame,
-                'index': index_label,
-                'name': name_label,
-                'value': value_label,
-                'wave': wave_button
-            })
-
-        # 更新滚动区域
-        self.watch_content_frame.update_idletasks()
-        self.watch_canvas.configure(scrollregion=self.watch_canvas.bbox("all"))
-
-    def edit_param_value(self, idx, label):
+        """更新监视变量表格（变量列表结构变化时同时重建变量索引）"""
+        self.watch_index.rebuild(self.watch_variables)
+        self.watch_store.rebuild(self.watch_variables)
+        self.watch_table.refresh()
+
+    def refresh_watch_values(self):
+        """只刷新数值发生变化且在可见区域内的监视表格单元格"""
+        if not self.watch_dirty:
+            return
+
+        self.watch_table.refresh_rows(self.watch_dirty)
+        self.watch_dirty.clear()
+
+    def edit_param_value(self, idx):
         """编辑参数值"""
-        current_value = label.cget("text")
+        current_value = self.input_params[idx].get("val", "")
 
         # 记录原始值用于比较
         original_value = self.input_params[idx].get("val", "")
@@ -737,7 +666,6 @@ class HardwareSimulator:
 
         def save_edit():
             new_value = entry.get()
-            label.config(text=new_value)
 
             # 更新内存中的数据
             if 0 <= idx < len(self.input_params):
@@ -753,6 +681,9 @@ class HardwareSimulator:
                 else:
                     self.add_log(f"参数 '{param_name}' 值未改变: {new_value}")
 
+                # 更新表格显示
+                self.params_table.refresh_rows([idx])
+
             # 更新修改状态显示
             self._update_modified_status()
 
@@ -789,9 +720,44 @@ class HardwareSimulator:
                                         lambda v=variable_name: self._on_waveform_window_close(v))
 
         except Exception as e:
-            self.add_log(f"创建波形窗口失败: {e}")
+            self.add_log(f"创建波形窗口失败: {e}", "ERROR")
             messagebox.showerror("错误", f"无法创建波形窗口: {e}")
 
+    def open_scope_window(self):
+        """打开多变量波形窗口（已打开时提到前台）"""
+        if self.scope_window and self.scope_window.is_open():
+            self.scope_window.window.lift()
+            self.scope_window.window.focus_force()
+            return self.scope_window
+
+        try:
+            self.scope_window = ScopeWindow(self.root, on_close=self._on_scope_window_close)
+            self.add_log("已打开多变量波形窗口，右键点击变量的波形按钮添加/移除曲线")
+        except Exception as e:
+            self.scope_window = None
+            self.add_log(f"创建多变量波形窗口失败: {e}", "ERROR")
+            messagebox.showerror("错误", f"无法创建多变量波形窗口: {e}")
+        return self.scope_window
+
+    def toggle_scope_trace(self, variable_name):
+        """在多变量波形中添加或移除变量"""
+        scope = self.open_scope_window()
+        if scope is None:
+            return
+
+        if scope.has_trace(variable_name):
+            scope.remove_trace(variable_name)
+            self.add_log(f"多变量波形已移除变量 '{variable_name}'")
+        else:
+            scope.add_trace(variable_name)
+            self.add_log(f"多变量波形已添加变量 '{variable_name}'")
+
+    def _on_scope_window_close(self):
+        """多变量波形窗口关闭时的处理"""
+        if self.scope_window:
+            self.scope_window.destroy()
+            self.scope_window = None
+
     def _on_waveform_window_close(self, variable_name):
         """波形窗口关闭时的处理"""
         if variable_name in self.waveform_windows:
@@ -806,13 +772,19 @@ class HardwareSimulator:
                 # 从字典中移除
                 del self.waveform_windows[variable_name]
 
-    def _update_waveform_data(self, variable_name, value):
-        """更新波形窗口数据"""
+    def _update_waveform_data(self, variable_name, points):
+        """
+        更新波形窗口数据
+
+        Args:
+            variable_name: 变量名称
+            points: [(变量值, 时间戳), ...]
+        """
         try:
             if variable_name in self.waveform_windows:
                 window = self.waveform_windows[variable_name]
                 if window.is_open():
-                    window.add_data_point(value)
+                    window.add_data_points(points)
         except Exception as e:
             # 静默处理错误，避免影响主程序
             pass
@@ -829,25 +801,29 @@ class HardwareSimulator:
 
             def connect_thread():
                 try:
-                    # 创建消息处理器，使用新的回调设计
-                    self.ctrl_handler = CtrlMessageHandler(
-                        target, 9001,
-                        message_callback=self.on_system_message
-                    )
-                    self.status_handler = StatusMessageHandler(
-                        target, 9000,
-                        variable_callback=self.on_variable_data
+                    # 通过会话管理器连接目标机（心跳、轮询由会话在共享事件循环中执行）
+                    self.session = self.session_manager.open_session(
+                        target, self.watch_variables,
+                        heartbeat_interval=self.heartbeat_interval,
+                        heartbeat_timeout=self.heartbeat_timeout,
+                        query_interval=self.query_interval,
+                        acquisition=self.acquisition,
+                        stream_rate=self.stream_rate,
+                        message_callback=self.on_system_message,
+                        variable_callback=self.on_variable_data,
+                        status_callback=self.on_session_status,
+                        log_callback=self.on_session_log
                     )
-
-                    # 启动处理器
-                    ctrl_success = self.ctrl_handler.start()
-                    status_success = self.status_handler.start()
+                    self.ctrl_handler = self.session.ctrl_handler
+                    self.status_handler = self.session.status_handler
+                    ctrl_success = self.session.ctrl_ok
+                    status_success = self.session.status_ok
 
                     # 更新UI
                     self.root.after(0, self._update_connection_status, target, ctrl_success, status_success)
 
                 except Exception as e:
-                    self.root.after(0, lambda: self.add_log(f"连接过程中发生错误: {e}"))
+                    self.add_log(f"连接过程中发生错误: {e}", "ERROR")
                     self.root.after(0, lambda: self.connect_button.config(text="连接", state="normal"))
                     self.root.after(0, lambda: self._update_connection_status_display(False, force_disconnect=True))
 
@@ -866,14 +842,30 @@ class HardwareSimulator:
         # 在UI线程中处理系统消息
         self.root.after(0, lambda: self._handle_system_message_ui(message_info))
 
+    def on_session_status(self, session, is_online):
+        """
+        会话在线状态变化（来自事件循环线程）
+        Args:
+            session: 目标机会话
+            is_online: 是否在线
+        """
+        if not is_online:
+            # 心跳超时，连接断开
+            self.root.after(0, lambda: self._update_connection_status_display(False, force_disconnect=True))
+            self.root.after(0, lambda: self.connect_button.config(text="连接", state="normal"))
+
+    def on_session_log(self, message):
+        """会话日志（来自事件循环线程）"""
+        self.add_log(message)
+
     def on_variable_data(self, variable_info):
         """
         处理变量数据（来自状态链路）
         Args:
             variable_info: 包含变量数据的字典
         """
-        # 在UI线程中更新变量显示
-        self.root.after(0, lambda: self._handle_variable_data_ui(variable_info))
+        # 交给批量投递桥，由UI节拍统一处理
+        self.sample_bridge.push(variable_info)
 
     def _handle_system_message_ui(self, message_info):
         """在UI线程中处理系统消息"""
@@ -884,46 +876,69 @@ class HardwareSimulator:
                 self._handle_heartbeat_message(data)
 
         except Exception as e:
-            self.add_log(f"处理系统消息UI错误: {e}")
+            self.add_log(f"处理系统消息UI错误: {e}", "ERROR")
+
+    def _handle_variable_batch_ui(self, batch):
+        """
+        在UI线程中批量处理变量数据：表格、记录器、波形每个节拍各更新一次
 
-    def _handle_variable_data_ui(self, variable_info):
-        """在UI线程中处理变量数据"""
+        Args:
+            batch: [(到达时间, 变量数据), ...]
+        """
         try:
-            # 应该判断cmd类型
-            self._update_variables_from_data(variable_info)
-
-            # 检查是否需要更新波形窗口
-            vars_dict = variable_info.get('vars', {})
-            if vars_dict:
-                # 获取时间戳
-                timestamp_ms = variable_info.get('time', None)
-                if timestamp_ms:
-                    # 将毫秒时间戳转换为日期时间
-                    try:
-                        timestamp_sec = timestamp_ms / 1000.0
-                        dt = datetime.fromtimestamp(timestamp_sec)
-                        time_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-                    except:
-                        time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                else:
-                    time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            latest_vars = {}
+            records = []
+            waveform_points = {}
+            waveform_names = set(name for name in self.waveform_windows if name in self.watch_index)
+            if self.scope_window:
+                waveform_names.update(name for name in self.scope_window.traces if name in self.watch_index)
+
+            for arrival_time, variable_info in batch:
+                if variable_info.get('type') == 'error':
+                    self.add_log(variable_info.get('message', '状态链路错误'), "ERROR")
+                    continue
+
+                vars_dict = variable_info.get('vars', {})
+                if not vars_dict:
+                    continue
+
+                latest_vars.update(vars_dict)
+                records.append((vars_dict, self._format_sample_time(variable_info.get('time', None))))
+
+                # 只查找已打开波形窗口的变量
+                for var_name in waveform_names:
+                    var_value = vars_dict.get(var_name)
+                    if var_value is not None:
+                        waveform_points.setdefault(var_name, []).append((var_value, arrival_time))
+
+            if not latest_vars:
+                return
 
-                # 记录变量数据到Excel
-                try:
-                    self.record_variables(vars_dict, time_str)
-                except Exception as e:
-                    self.add_log(f"记录变量数据失败: {e}")
+            # 表格只按最新值刷新一次
+            self._update_variables_from_data({'vars': latest_vars})
+
+            # 记录全部采样
+            self.record_variables_batch(records)
+
+            # 每个波形窗口一次性追加本批次数据点
+            for var_name, points in waveform_points.items():
+                self._update_waveform_data(var_name, points)
 
-                for var_name, var_value in vars_dict.items():
-                    if var_name in self.waveform_windows:
-                        window = self.waveform_windows[var_name]
-                        if window.is_open():
-                            # 在UI线程中更新波形
-                            self.root.after(0, lambda vn=var_name, vv=var_value:
-                            self._update_waveform_data(vn, vv))
+            # 多变量波形一次追加全部曲线的数据点，只重绘一帧
+            if waveform_points and self.scope_window and self.scope_window.is_open():
+                self.scope_window.add_data(waveform_points)
 
         except Exception as e:
-            self.add_log(f"处理变量数据UI错误: {e}")
+            self.add_log(f"处理变量数据UI错误: {e}", "ERROR")
+
+    def _format_sample_time(self, timestamp_ms):
+        """将毫秒时间戳转换为记录用的时间字符串"""
+        if timestamp_ms:
+            try:
+                return datetime.fromtimestamp(timestamp_ms / 1000.0).strftime("%Y-%m-%d %H:%M:%S")
+            except:
+                pass
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     def _parse_query_var_message(self, message):
         try:
@@ -937,15 +952,15 @@ class HardwareSimulator:
                 if ack == 'OK':
                     return data
                 else:
-                    self.add_log(f"查询变量响应失败: {ack}")
+                    self.add_log(f"查询变量响应失败: {ack}", "ERROR")
             else:
                 # 如果不是QueryVars_ack，记录日志但不处理
                 self.add_log(f"收到非查询变量响应: {data.get('cmd')}")
 
         except json.JSONDecodeError as e:
-            self.add_log(f"解析JSON失败: {e}, 消息: {message[:100]}...")
+            self.add_log(f"解析JSON失败: {e}, 消息: {message[:100]}...", "ERROR")
         except Exception as e:
-            self.add_log(f"解析查询变量消息失败: {e}")
+            self.add_log(f"解析查询变量消息失败: {e}", "ERROR")
 
         return None
 
@@ -958,42 +973,24 @@ class HardwareSimulator:
 
             updated = False
             for var_name, var_value in vars_dict.items():
-                # 在监视变量列表中查找匹配的变量
-                for var in self.watch_variables:
-                    if var.get('variable') == var_name:
-                        # 统一处理数值格式
-                        old_value = var.get('val', '')
-
-                        # 确保新值格式统一
-                        if var_value is not None:
-                            try:
-                                # 根据变量类型决定格式
-                                var_type = var.get("type", "float")
-                                if var_type == "int":
-                                    new_value = str(int(float(var_value)))
-                                else:
-                                    # 浮点数统一保留3位小数
-                                    new_value = f"{float(var_value):.3f}"
-                            except (ValueError, TypeError):
-                                new_value = str(var_value)
-                        else:
-                            new_value = ""
-
-                        var['val'] = new_value
-
-                        # 记录变化
-                        if old_value != new_value:
-                            self.add_log(f"变量更新: {var_name} = {new_value}")
-                            updated = True
-                        break
-
-            # 如果有变量被更新，刷新表格显示
+                # 通过变量索引直接定位监视变量
+                idx = self.watch_index.get(var_name)
+                if idx is None:
+                    continue
+
+                # 按变量类型保存为数值，值未变化时不刷新
+                if self.watch_store.set(idx, var_value):
+                    self.add_log(f"变量更新: {var_name} = {self.watch_store.format(idx)}", "DEBUG")
+                    self.watch_dirty.add(idx)
+                    updated = True
+
+            # 如果有变量被更新，只刷新变化的单元格
             if updated:
-                self.update_watch_table()
-                self.add_log(f"已更新{len(vars_dict)}个变量")
+                self.refresh_watch_values()
+                self.add_log(f"已更新{len(vars_dict)}个变量", "DEBUG")
 
         except Exception as e:
-            self.add_log(f"更新变量失败: {e}")
+            self.add_log(f"更新变量失败: {e}", "ERROR")
 
     def _handle_heartbeat_message(self, data):
         """处理心跳响应消息"""
@@ -1005,15 +1002,15 @@ class HardwareSimulator:
             # 获取心跳时间戳
             act_time = data.get('act', '')
             if act_time:
-                self.add_log(f"收到心跳响应，服务器时间: {act_time}")
+                self.add_log(f"收到心跳响应，服务器时间: {act_time}", "DEBUG")
             else:
-                self.add_log("收到心跳响应")
+                self.add_log("收到心跳响应", "DEBUG")
 
             # 更新连接状态显示
             self._update_connection_status_display(True)
 
         except Exception as e:
-            self.add_log(f"处理心跳消息失败: {e}")
+            self.add_log(f"处理心跳消息失败: {e}", "ERROR")
 
     def _handle_connected_message(self):
         """处理连接成功消息"""
@@ -1029,7 +1026,7 @@ class HardwareSimulator:
 
     def _handle_error_message(self, message):
         """处理错误消息"""
-        self.add_log(f"连接错误: {message}")
+        self.add_log(f"连接错误: {message}", "ERROR")
         self._update_connection_status_display(False)
 
     def _update_connection_status(self, target, ctrl_success, status_success):
@@ -1062,17 +1059,15 @@ class HardwareSimulator:
             self._stop_heartbeat_mechanism()
 
             if not ctrl_success and not status_success:
-                self.add_log(f"连接失败: 控制链路(9001)和状态链路(9000)都无法连接到目标机 {target}")
+                self.add_log(f"连接失败: 控制链路(9001)和状态链路(9000)都无法连接到目标机 {target}", "ERROR")
             elif not ctrl_success:
-                self.add_log(f"连接失败: 控制链路(9001)无法连接到目标机 {target}")
-                if self.status_handler:
-                    self.status_handler.stop()
+                self.add_log(f"连接失败: 控制链路(9001)无法连接到目标机 {target}", "ERROR")
             else:
                 self.add_log(f"控制链路(9001)连接成功 - 目标机: {target}")
-                self.add_log(f"连接失败: 状态链路(9000)无法连接到目标机 {target}")
-                if self.ctrl_handler:
-                    self.ctrl_handler.stop()
+                self.add_log(f"连接失败: 状态链路(9000)无法连接到目标机 {target}", "ERROR")
 
+            # 连接失败的会话已由会话管理器关闭
+            self.session = None
             self.ctrl_handler = None
             self.status_handler = None
 
@@ -1091,13 +1086,13 @@ class HardwareSimulator:
         # 关闭所有波形窗口
         for variable_name in list(self.waveform_windows.keys()):
             self._on_waveform_window_close(variable_name)
+        self._on_scope_window_close()
 
-        if self.ctrl_handler:
-            self.ctrl_handler.stop()
-            self.ctrl_handler = None
-        if self.status_handler:
-            self.status_handler.stop()
-            self.status_handler = None
+        if self.session:
+            self.session_manager.close_session(self.session.host)
+            self.session = None
+        self.ctrl_handler = None
+        self.status_handler = None
 
         # 重置连接状态
         self.is_connected = False
@@ -1109,55 +1104,15 @@ class HardwareSimulator:
         # 更新按钮状态
         self.root.after(0, lambda: self.connect_button.config(text="连接", bg="SystemButtonFace", state="normal"))
 
-    def _send_query_var_message(self):
-        """发送查询变量消息"""
-        print('_send_query_var_message');
-        if self.status_handler and self.status_handler.is_connected():
-            # 构建查询消息
-            query_data = {
-                "cmd": "QueryVars",
-                "count": len(self.watch_variables)
-            }
-            json_str = json.dumps(query_data)
-
-            if self.status_handler.send_message(json_str):
-                self.add_log(f"发送变量查询: {json_str}")
-            else:
-                self.add_log("变量查询发送失败")
-            self.query_index += 1
-
     def _start_var_query_timer(self):
-        """启动变量查询定时器"""
-        print('_start_var_query_timer')
-        if self.is_querying and self.status_handler and self.status_handler.is_connected():
-            # 立即发送第一次查询
-            self._send_query_var_message()
-
-            # 设置定时器，每秒查询一次
-            self.query_timer = threading.Timer(self.query_interval, self._query_var_periodically)
-            self.query_timer.daemon = True
-            self.query_timer.start()
+        """启动变量采集（订阅推送，或立即发送第一次查询后按query_interval周期查询）"""
+        if self.is_querying and self.session and self.status_handler.is_connected():
+            self.session.start_acquisition(self.query_interval, self.stream_rate)
 
     def _stop_var_query_timer(self):
-        """停止变量查询定时器"""
-        if self.query_timer:
-            self.query_timer.cancel()
-            self.query_timer = None
-
-    def _query_var_periodically(self):
-        """定时查询变量"""
-        if self.is_querying and self.is_connected:
-            try:
-                # 发送查询消息
-                self._send_query_var_message()
-            except Exception as e:
-                self.add_log(f"查询变量失败: {e}")
-
-            # 重新设置定时器
-            if self.is_querying:
-                self.query_timer = threading.Timer(self.query_interval, self._query_var_periodically)
-                self.query_timer.daemon = True
-                self.query_timer.start()
+        """停止变量采集"""
+        if self.session:
+            self.session.stop_acquisition()
 
     def select_model(self):
         """选择模型文件"""
@@ -1183,7 +1138,7 @@ class HardwareSimulator:
         def simulate_download():
             time.sleep(2)
             self.root.after(0, lambda: self.download_status_label.config(text="已完成"))
-            self.root.after(0, lambda: self.add_log("模型下载完成"))
+            self.add_log("模型下载完成")
 
         threading.Thread(target=simulate_download, daemon=True).start()
 
@@ -1242,19 +1197,9 @@ class HardwareSimulator:
         else:
             self.add_log(f"发送修改过的参数... 共{param_count}个参数")
 
-        # 构建JSON消息
-        json_data = {
-            "cmd": "SetParams",
-            "count": param_count,
-            "params": param_data
-        }
-
         try:
-            json_str = json.dumps(json_data, ensure_ascii=False)
-            self.add_log(f"发送参数: {json_str}")
-
-            # 通过控制链路发送参数
-            if self.ctrl_handler.send_message(json_str):
+            # 通过控制链路发送参数（发送内容由会话写入日志）
+            if self.session.send_parameters(param_data):
                 self.add_log(f"参数消息已发送 ({param_count}个参数)")
 
                 # 记录参数数据
@@ -1269,7 +1214,7 @@ class HardwareSimulator:
                     # 记录到Excel文件
                     self.record_parameters(current_params)
                 except Exception as e:
-                    self.add_log(f"记录参数数据失败: {e}")
+                    self.add_log(f"记录参数数据失败: {e}", "ERROR")
 
                 # 发送成功后，更新原始参数值
                 self.original_input_params = [param.copy() for param in self.input_params]
@@ -1279,10 +1224,10 @@ class HardwareSimulator:
                     self._update_modified_status()
 
             else:
-                self.add_log("参数发送失败")
+                self.add_log("参数发送失败", "ERROR")
 
         except Exception as e:
-            self.add_log(f"参数发送失败: {e}")
+            self.add_log(f"参数发送失败: {e}", "ERROR")
 
     def _update_original_params(self):
         """更新原始参数值为当前值"""
@@ -1355,10 +1300,6 @@ class HardwareSimulator:
                     param["val"] = original_value
                     reset_count += 1
 
-                    # 更新表格显示
-                    if i < len(self.param_rows):
-                        self.param_rows[i]['value'].config(text=original_value)
-
         if reset_count > 0:
             # 更新表格显示
             self.update_params_table()
@@ -1385,7 +1326,6 @@ class HardwareSimulator:
             self.is_querying = True
             self.run_button.config(text="模型停止", bg="lightcoral")
             self.start_time = time.time()
-            self.stop_timer = False
             self.add_log("模型开始运行")
             # 记录初始参数
             try:
@@ -1400,25 +1340,25 @@ class HardwareSimulator:
                 self.record_parameters(init_params, "初始参数")
                 self.add_log("已记录初始参数")
             except Exception as e:
-                self.add_log(f"记录初始参数失败: {e}")
+                self.add_log(f"记录初始参数失败: {e}", "ERROR")
 
             # 启动变量查询定时器
             self._start_var_query_timer()
 
-            # 启动计时器线程
-            self.timer_thread = threading.Thread(target=self.update_timer, daemon=True)
-            self.timer_thread.start()
+            # 启动运行时间显示
+            self._cancel_job('run_timer_job')
+            self.run_timer_job = self.scheduler.schedule(1.0, self.update_timer, name="run_timer")
 
-            # 启动模拟数据更新线程
-            # self.data_update_thread = threading.Thread(target=self.simulate_data_update, daemon=True)
-            # self.data_update_thread.start()
+            # 启动模拟数据更新
+            # self.data_update_job = self.scheduler.schedule(2.0, self.simulate_data_update, name="simulate_data")
 
         else:
             # 停止运行
             self.is_running = False
             self.is_querying = False
             self.run_button.config(text="模型运行", bg="SystemButtonFace")
-            self.stop_timer = True
+            self._cancel_job('run_timer_job')
+            self._cancel_job('data_update_job')
             self.time_label.config(text="00:00:00")
 
             # 停止查询定时器
@@ -1426,64 +1366,96 @@ class HardwareSimulator:
 
             self.add_log("模型停止运行")
 
+            # 模型停止时将记录数据导出到Excel
+            self.export_data_records()
+
+    def _cancel_job(self, attr):
+        """取消周期任务"""
+        job = getattr(self, attr)
+        if job is not None:
+            job.cancel()
+            setattr(self, attr, None)
+
     def update_timer(self):
-        """更新运行时间"""
-        while self.is_running and not self.stop_timer:
-            elapsed_time = int(time.time() - self.start_time)
-            hours = elapsed_time // 3600
-            minutes = (elapsed_time % 3600) // 60
-            seconds = elapsed_time % 60
-            time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        """更新运行时间（周期任务，每秒执行一次）"""
+        if not self.is_running:
+            return
+        elapsed_time = int(time.time() - self.start_time)
+        hours = elapsed_time // 3600
+        minutes = (elapsed_time % 3600) // 60
+        seconds = elapsed_time % 60
+        time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
-            self.root.after(0, lambda ts=time_str: self.time_label.config(text=ts))
-            time.sleep(1)
+        self.root.after(0, lambda ts=time_str: self.time_label.config(text=ts))
 
     def simulate_data_update(self):
-        """模拟数据更新 - 如果收到真实数据，可以注释掉这部分"""
+        """模拟数据更新（周期任务）- 如果收到真实数据，可以注释掉这部分"""
         import random
 
-        while self.is_running and not self.stop_timer:
-            # 这里可以保留模拟数据更新，或者注释掉以便接收真实数据
-            if not self.is_connected:  # 只有在没有连接时使用模拟数据
-                if self.watch_variables:
-                    # 随机更新一个变量的值
-                    idx = random.randint(0, len(self.watch_variables) - 1)
-                    var_type = self.watch_variables[idx].get("type", "int")
+        # 这里可以保留模拟数据更新，或者注释掉以便接收真实数据
+        if self.is_running and not self.is_connected:  # 只有在没有连接时使用模拟数据
+            if self.watch_variables:
+                # 随机更新一个变量的值
+                idx = random.randint(0, len(self.watch_variables) - 1)
+                var_type = self.watch_variables[idx].get("type", "int")
+
+                if var_type == "int":
+                    new_val = random.randint(0, 100)
+                elif var_type == "float":
+                    new_val = round(random.uniform(0, 100), 2)
+                else:
+                    new_val = f"val_{random.randint(100, 999)}"
 
-                    if var_type == "int":
-                        new_val = str(random.randint(0, 100))
-                    elif var_type == "float":
-                        new_val = f"{random.uniform(0, 100):.2f}"
-                    else:
-                        new_val = f"val_{random.randint(100, 999)}"
+                self.watch_store.set(idx, new_val)
+                self.watch_dirty.add(idx)
+                self.root.after(0, self.refresh_watch_values)
 
-                    self.watch_variables[idx]["val"] = new_val
-                    self.root.after(0, self.update_watch_table)
+    def add_log(self, message, level="INFO"):
+        """
+        添加日志信息（可在任意线程调用，由日志输出在UI节拍中批量显示）
 
-            time.sleep(2)
+        Args:
+            message: 日志内容
+            level: 日志级别（DEBUG/INFO/WARNING/ERROR），高频的变量数据日志使用DEBUG
+        """
+        self.log_sink.write(message, level)
 
-    def add_log(self, message):
-        """添加日志信息"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-
-        self.log_text.insert(tk.END, log_message)
-        self.log_text.see(tk.END)
-        self.log_text.update()
-
-    def _send_heartbeat_message(self):
-        if self.ctrl_handler and self.ctrl_handler.is_connected():
-            # 构建心跳消息
-            heartbeat_data = {
-                "cmd": "Heart"
-            }
-            json_str = json.dumps(heartbeat_data)
-            if self.ctrl_handler.send_message(json_str):
-                self.add_log(f"发送心跳: {json_str}")
-            else:
-                self.add_log("心跳发送失败")
-                # 发送失败，更新连接状态
-                self._update_connection_status_display(False)
+    def on_log_level_change(self, event=None):
+        """切换日志显示级别"""
+        level = self.LOG_LEVEL_NAMES[self.log_level_combo.get()]
+        self.log_sink.set_level(level)
+
+    def search_log_history(self):
+        """在日志文件中检索历史日志，结果显示在单独的窗口中"""
+        pattern = self.log_search_entry.get().strip()
+        if not pattern:
+            return
+        if not self.log_file:
+            messagebox.showinfo("提示", "未启用日志文件，无法检索历史日志")
+            return
+
+        def search_thread():
+            results = self.log_sink.search(pattern)
+            self.root.after(0, lambda: self._show_log_search_results(pattern, results))
+
+        threading.Thread(target=search_thread, daemon=True).start()
+
+    def _show_log_search_results(self, pattern, results):
+        """显示日志检索结果"""
+        result_win = tk.Toplevel(self.root)
+        result_win.title(f"日志检索: {pattern}（{len(results)}条）")
+        result_win.geometry("900x500")
+
+        result_text = tk.Text(result_win, wrap=tk.WORD, font=("Arial", 10), bg='white')
+        result_scrollbar = tk.Scrollbar(result_win, orient=tk.VERTICAL, command=result_text.yview, width=3)
+        result_text.configure(yscrollcommand=result_scrollbar.set)
+
+        result_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        result_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        result_text.insert(tk.END, "\n".join(results) if results else "没有匹配的日志")
+        result_text.see(tk.END)
+        result_text.config(state=tk.DISABLED)
 
     def _update_connection_status_display(self, is_online, force_disconnect=False):
         """更新连接状态显示
@@ -1507,84 +1479,33 @@ class HardwareSimulator:
                 self._disconnect_connections(force_status_update=True)
 
     def _start_heartbeat_mechanism(self):
-        """启动心跳机制"""
+        """启动心跳机制（发送第一次心跳，之后由会话周期发送并检查超时）"""
         if not self.use_heartbeat:
             return
 
-        # 停止现有的心跳定时器
-        self._stop_heartbeat_mechanism()
-
-        # 发送第一次心跳
-        if self.is_connected and self.ctrl_handler and self.ctrl_handler.is_connected():
-            self._send_heartbeat_message()
-
-        # 启动心跳定时器
-        if self.is_connected:
-            self.heartbeat_timer = threading.Timer(self.heartbeat_interval, self._heartbeat_periodically)
-            self.heartbeat_timer.daemon = True
-            self.heartbeat_timer.start()
-
-            # 启动状态检查定时器
-            self._start_status_check_timer()
+        if self.is_connected and self.session:
+            self.session.start_heartbeat()
 
     def _stop_heartbeat_mechanism(self):
         """停止心跳机制"""
-        if self.heartbeat_timer:
-            self.heartbeat_timer.cancel()
-            self.heartbeat_timer = None
-
-        if self.status_check_timer:
-            self.status_check_timer.cancel()
-            self.status_check_timer = None
+        if self.session:
+            self.session.stop_heartbeat()
 
-    def _heartbeat_periodically(self):
-        """定时发送心跳"""
-        if self.is_connected and self.use_heartbeat:
-            try:
-                if self.ctrl_handler and self.ctrl_handler.is_connected():
-                    self._send_heartbeat_message()
-            except Exception as e:
-                self.add_log(f"发送心跳失败: {e}")
 
-            # 重新设置定时器
-            if self.is_connected and self.use_heartbeat:
-                self.heartbeat_timer = threading.Timer(self.heartbeat_interval, self._heartbeat_periodically)
-                self.heartbeat_timer.daemon = True
-                self.heartbeat_timer.start()
+def main(argv=None):
+    """命令行入口：默认每秒轮询一次，更快的轮询或订阅推送通过参数开启"""
+    parser = argparse.ArgumentParser(description="硬件仿真系统")
+    parser.add_argument("--query-interval", type=float, default=1.0, help="变量查询间隔（秒）")
+    parser.add_argument("--acquisition", default="poll", choices=["poll", "stream"],
+                        help="变量采集方式：poll轮询，stream订阅推送（目标机不支持时回退到轮询）")
+    parser.add_argument("--stream-rate", type=float, default=10.0, help="订阅推送的期望频率（Hz）")
+    args = parser.parse_args(argv)
 
-    def _start_status_check_timer(self):
-        """启动状态检查定时器"""
-        if not self.use_heartbeat:
-            return
-
-        # 停止现有的状态检查定时器
-        if self.status_check_timer:
-            self.status_check_timer.cancel()
-
-        # 启动新的状态检查定时器
-        self.status_check_timer = threading.Timer(self.heartbeat_timeout, self._check_connection_status)
-        self.status_check_timer.daemon = True
-        self.status_check_timer.start()
-
-    def _check_connection_status(self):
-        """检查连接状态"""
-        if not self.use_heartbeat or not self.is_connected:
-            return
-
-        current_time = time.time()
-
-        # 检查是否超时
-        if self.last_heartbeat_time is None or (current_time - self.last_heartbeat_time) > self.heartbeat_timeout:
-            # 心跳超时，连接断开
-            self.add_log("心跳超时，连接已断开")
-            self.root.after(0, lambda: self._update_connection_status_display(False, force_disconnect=True))
-            self.root.after(0, lambda: self.connect_button.config(text="连接", state="normal"))
-        else:
-            # 连接正常，继续检查
-            self._start_status_check_timer()
+    root = tk.Tk()
+    app = HardwareSimulator(root, query_interval=args.query_interval,
+                            acquisition=args.acquisition, stream_rate=args.stream_rate)
+    root.mainloop()
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = HardwareSimulator(root)
-    root.mainloop()
+    main()